@@ -0,0 +1,124 @@
+"""
+File: load_generator.py
+Description: Load generation harness for the pricing service
+    - Starts a service in-process (or targets a running one with
+      --connect) and fires single-contract requests from many concurrent
+      clients
+    - Reports request latency percentiles, throughput and the average
+      batch size, so batch size and wait limits can be tuned against
+      each other
+Usage:
+    python benchmarks/load_generator.py --clients 64 --requests 200
+    python benchmarks/load_generator.py --max-wait-ms 0.5 1 2 5
+Created by: Renesh Ravi
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+import pricing_service  # noqa: E402
+
+
+async def run_client(client, requests, rng, latencies):
+    """
+    Sends requests one after the other, as a caller waiting on each
+    reply would
+    :param client: pricing_service.PricingClient object
+    :param requests: number of requests to send
+    :param rng: numpy.random.Generator for the contract inputs
+    :param latencies: list the latencies (seconds) are appended to
+    """
+    for _ in range(requests):
+        S, K = rng.uniform(50, 150, 2)
+        start = time.perf_counter()
+        await client.price(S, K, rng.uniform(0.1, 2), 0.05,
+                           rng.uniform(0.1, 0.5),
+                           "call" if rng.random() < 0.5 else "put")
+        latencies.append(time.perf_counter() - start)
+
+
+async def generate_load(host, port, clients, requests, seed=0):
+    """
+    Runs the clients concurrently against a service
+    :return: dictionary of latency percentiles (ms) and throughput
+    """
+    rng = np.random.default_rng(seed)
+    connections = [await pricing_service.PricingClient.connect(host, port)
+                   for _ in range(clients)]
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(client, requests, rng, latencies)
+                           for client in connections))
+    elapsed = time.perf_counter() - start
+    for client in connections:
+        await client.close()
+
+    latencies = np.array(latencies) * 1000
+    return {"requests": len(latencies),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p90_ms": float(np.percentile(latencies, 90)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "throughput": len(latencies) / elapsed}
+
+
+async def benchmark(args, max_wait_ms):
+    """
+    Measures one configuration, starting an in-process service unless
+    --connect is given
+    :return: dictionary from generate_load with the average batch size
+    """
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        return await generate_load(host, int(port), args.clients,
+                                   args.requests)
+
+    service = pricing_service.PricingService(args.max_batch_size,
+                                             max_wait_ms)
+    host, port = await service.start(port=0)
+    try:
+        result = await generate_load(host, port, args.clients, args.requests)
+    finally:
+        await service.stop()
+    batcher = service.batcher
+    result["mean_batch"] = batcher.contracts / max(batcher.batches, 1)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate load against the pricing service")
+    parser.add_argument("--connect", default=None,
+                        help="host:port of a running service; default "
+                             "starts one in-process")
+    parser.add_argument("--clients", type=int, default=64,
+                        help="concurrent connections")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="sequential requests per connection")
+    parser.add_argument("--max-batch-size", type=int,
+                        default=pricing_service.MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, nargs="+",
+                        default=[pricing_service.MAX_WAIT_MS],
+                        help="batch wait limits to compare")
+    args = parser.parse_args(argv)
+
+    print(f"{'max wait ms':>12}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+          f"{'req/s':>12}{'mean batch':>12}")
+    for max_wait_ms in args.max_wait_ms:
+        result = asyncio.run(benchmark(args, max_wait_ms))
+        print(f"{max_wait_ms:>12.2f}{result['p50_ms']:>10.2f}"
+              f"{result['p90_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['throughput']:>12.0f}"
+              f"{result.get('mean_batch', float('nan')):>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
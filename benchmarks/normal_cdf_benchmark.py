@@ -0,0 +1,106 @@
+"""
+File: normal_cdf_benchmark.py
+Description: Benchmark of the array backends of normal_dist
+    - Times the normal cdf of each backend (scipy ndtr, element-wise
+      math.erfc, interpolated tables at several error guarantees) and a
+      full 500x500 pair of price surfaces
+    - Measures each backend's largest cdf error against scipy on a dense
+      grid, next to the table's guaranteed maximum error
+Usage:
+    python benchmarks/normal_cdf_benchmark.py
+    python benchmarks/normal_cdf_benchmark.py --size 100000 --errors 1e-6 1e-9
+Created by: Renesh Ravi
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+import normal_dist  # noqa: E402
+import surface  # noqa: E402
+
+TABLE_ERRORS = (1e-6, 1e-8, 1e-10)
+SURFACE_SIZE = 500
+
+
+def best_time(func, repeats):
+    """
+    :return: fastest of several timed calls, in milliseconds
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def benchmark_backend(x, grid, reference, repeats):
+    """
+    Times and checks the selected backend
+    :param x: numpy.ndarray of inputs for the timings
+    :param grid: dense numpy.ndarray of inputs for the error check
+    :param reference: numpy.ndarray of exact cdf values on grid
+    :param repeats: timed calls per measurement
+    :return: dictionary of timings (ms) and the largest error
+    """
+    normal_dist.norm_cdf_array(x[:10])  # builds the backend
+    S_range = np.linspace(50, 150, SURFACE_SIZE)
+    return {
+        "cdf_ms": best_time(lambda: normal_dist.norm_cdf_array(x), repeats),
+        "surface_ms": best_time(lambda: surface.price_surfaces(
+            S_range, S_range, 1.0, 0.05, 0.2), repeats),
+        "cdf_error": float(np.abs(normal_dist.norm_cdf_array(grid)
+                                  - reference).max()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare the normal cdf backends of normal_dist")
+    parser.add_argument("--size", type=int, default=1_000_000,
+                        help="elements per cdf evaluation")
+    parser.add_argument("--errors", type=float, nargs="+",
+                        default=list(TABLE_ERRORS),
+                        help="max_error guarantees of the tables to test")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    x = np.random.default_rng(0).normal(0, 2, args.size)
+    grid = np.linspace(-12, 12, 2_400_001)
+    normal_dist.set_array_backend("scipy")
+    reference = normal_dist.norm_cdf_array(grid)
+
+    configs = [("scipy", "scipy", None), ("erf", "erf", None)]
+    configs += [(f"table {error:g}", "table", error) for error in args.errors]
+    results = {}
+    for name, backend, error in configs:
+        normal_dist.set_array_backend(
+            backend, error or normal_dist.DEFAULT_TABLE_ERROR)
+        # the element-wise erf path is slow, a single timed call is enough
+        repeats = 1 if backend == "erf" else args.repeats
+        results[name] = benchmark_backend(x, grid, reference, repeats)
+    normal_dist.set_array_backend("auto")
+
+    scipy = results["scipy"]
+    print(f"{args.size} elements per call; surfaces are "
+          f"{SURFACE_SIZE}x{SURFACE_SIZE} calls and puts\n")
+    erf = results["erf"]
+    print(f"{'backend':<14}{'cdf ms':>10}{'vs scipy':>10}{'vs erf':>10}"
+          f"{'surface ms':>12}{'max error':>12}")
+    for name, result in results.items():
+        print(f"{name:<14}{result['cdf_ms']:>10.2f}"
+              f"{scipy['cdf_ms'] / result['cdf_ms']:>9.1f}x"
+              f"{erf['cdf_ms'] / result['cdf_ms']:>9.1f}x"
+              f"{result['surface_ms']:>12.2f}{result['cdf_error']:>12.1e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
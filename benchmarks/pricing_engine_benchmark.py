@@ -0,0 +1,116 @@
+"""
+File: pricing_engine_benchmark.py
+Description: Benchmark and validation of the pricing engines
+    - Times the Monte Carlo engine in paths per second, with and without
+      variance reduction and on a process pool, and checks its prices
+      against the closed form in units of their standard error
+    - Times the binomial engine in tree nodes per second and reports its
+      European error against the closed form, plus the American premium
+Usage:
+    python benchmarks/pricing_engine_benchmark.py
+    python benchmarks/pricing_engine_benchmark.py --paths 1000000 --workers 4
+Created by: Renesh Ravi
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+import batch_pricer  # noqa: E402
+from pricing_engines import BinomialEngine, MonteCarloEngine  # noqa: E402
+
+CONTRACT = (100.0, 1.0, 0.05, 0.2)  # S, T, r, vol
+STRIKES = np.linspace(80, 120, 9)
+
+
+def timed(func):
+    """
+    :return: tuple (result of func, elapsed seconds)
+    """
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def benchmark_monte_carlo(paths, workers):
+    """
+    Prices the strikes with several Monte Carlo settings
+    :return: dictionary of setting name to (paths per second, largest
+    |error| / standard error, largest standard error)
+    """
+    S, T, r, vol = CONTRACT
+    exact = batch_pricer.black_scholes_price(S, STRIKES, T, r, vol)
+    configs = {
+        "plain": dict(antithetic=False, control_variate=False),
+        "antithetic": dict(control_variate=False),
+        "antithetic+control": {},
+        f"pool x{workers}": dict(max_workers=workers),
+    }
+    results = {}
+    for name, settings in configs.items():
+        engine = MonteCarloEngine(num_paths=paths, seed=0, **settings)
+        (prices, errors), elapsed = timed(lambda: engine.price_and_error(
+            S, STRIKES, T, r, vol))
+        results[name] = (paths * STRIKES.size / elapsed,
+                         float(np.max(np.abs(prices - exact) / errors)),
+                         float(errors.max()))
+    return results
+
+
+def benchmark_binomial(steps_list):
+    """
+    Prices the strikes on trees of several sizes
+    :return: dictionary of steps to (nodes per second, largest European
+    error, American premium of the at-the-money put)
+    """
+    S, T, r, vol = CONTRACT
+    exact = batch_pricer.black_scholes_price(S, STRIKES, T, r, vol, "put")
+    results = {}
+    for steps in steps_list:
+        european = BinomialEngine(steps)
+        american = BinomialEngine(steps, exercise="american")
+        prices, elapsed = timed(lambda: american.price(S, STRIKES, T, r, vol,
+                                                       "put"))
+        errors = european.price(S, STRIKES, T, r, vol, "put") - exact
+        nodes = STRIKES.size * (steps + 1) * (steps + 2) / 2
+        results[steps] = (nodes / elapsed, float(np.abs(errors).max()),
+                          float(prices[4] - exact[4]))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pricing engines against the closed form")
+    parser.add_argument("--paths", type=int, default=200_000,
+                        help="Monte Carlo paths per strike")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes of the pool setting")
+    parser.add_argument("--steps", type=int, nargs="+",
+                        default=[100, 500, 2000],
+                        help="binomial tree sizes")
+    args = parser.parse_args(argv)
+
+    print(f"{STRIKES.size} strikes, S={CONTRACT[0]}, T={CONTRACT[1]}, "
+          f"r={CONTRACT[2]}, vol={CONTRACT[3]}\n")
+    print(f"{'monte carlo':<20}{'paths/s':>14}{'max |z|':>10}"
+          f"{'max stderr':>12}")
+    for name, (rate, z, error) in benchmark_monte_carlo(
+            args.paths, args.workers).items():
+        print(f"{name:<20}{rate:>14,.0f}{z:>10.2f}{error:>12.5f}")
+
+    print(f"\n{'binomial steps':<20}{'nodes/s':>14}{'max error':>12}"
+          f"{'ATM premium':>13}")
+    for steps, (rate, error, premium) in benchmark_binomial(
+            args.steps).items():
+        print(f"{steps:<20}{rate:>14,.0f}{error:>12.5f}{premium:>13.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+"""
+File: run_benchmarks.py
+Description: Offline benchmark suite for the pricer, surfaces and heatmap
+rendering
+    - Records per-call latency percentiles and peak memory of each case
+    - Records the cold import time of the main modules, each in a fresh
+      interpreter, and enforces the import budget of the scalar pricer
+    - Compares the results against a stored baseline JSON and exits with
+      an error when any case regresses
+Usage:
+    python benchmarks/run_benchmarks.py                    # compare
+    python benchmarks/run_benchmarks.py --update-baseline  # re-record
+Created by: Renesh Ravi
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "baseline.json")
+LATENCY_TOLERANCE = 2.0  # allowed slowdown of the median vs the baseline
+MEMORY_TOLERANCE = 1.5  # allowed growth of peak memory vs the baseline
+SURFACE_SIZES = (11, 100, 500)
+IMPORT_MODULES = ("option", "batch_pricer", "heatmap_funcs")
+IMPORT_RUNS = 7
+# cold import limits (ms) that hold regardless of the baseline
+IMPORT_BUDGETS_MS = {"import_option": 100.0}
+IMPORT_SCRIPT = """
+import sys, time, tracemalloc
+sys.path.insert(0, {src_dir!r})
+if {traced}:
+    tracemalloc.start()
+start = time.perf_counter_ns()
+import {module}
+print(time.perf_counter_ns() - start, tracemalloc.get_traced_memory()[1])
+"""
+
+
+def option_cases():
+    """
+    Benchmarks of the scalar Option class; every call works on a fresh
+    option so cached terms don't hide the cost
+    :return: dictionary of case name to (function, number of calls)
+    """
+    from option import Option
+
+    calls = 2000
+    params = (100.0, 100.0, 1.0, 0.05, 0.2, "call")
+    fresh_options = lambda: itertools.cycle(
+        [Option(*params) for _ in range(calls)])
+    prices, greeks = fresh_options(), fresh_options()
+    return {
+        "option_construction": (lambda: Option(*params), calls),
+        "black_scholes_price": (lambda: next(prices).black_scholes_price(),
+                                calls),
+        "get_greeks": (lambda: next(greeks).get_greeks(), calls),
+    }
+
+
+def surface_cases():
+    """
+    Benchmarks of call and put PnL surface generation at several sizes,
+    with flat volatility and with a volatility surface
+    :return: dictionary of case name to (function, number of calls)
+    """
+    import surface
+
+    cases = {}
+    for size in SURFACE_SIZES:
+        S_range = np.linspace(50, 150, size)
+        K_range = np.linspace(50, 150, size)
+        cases[f"pnl_surfaces_{size}x{size}"] = (
+            lambda S_range=S_range, K_range=K_range:
+            surface.generate_pnl_surfaces(S_range, K_range, 1.0, 0.05, 0.2,
+                                          1, 10.0),
+            max(5, 20_000 // size))
+
+    # prices and all five greeks of both option types in one pass
+    S_range = K_range = np.linspace(50, 150, 500)
+    cases["greeks_surfaces_500x500"] = (
+        lambda: surface.greeks_surfaces(S_range, K_range, 1.0, 0.05, 0.2), 20)
+
+    # a time decay sweep of 100 frames on a 100x100 grid
+    grid = np.linspace(50, 150, 100)
+    cases["time_decay_100x100x100"] = (
+        lambda: surface.time_decay_surfaces(grid, grid, 1.0, 0.05, 0.2, 100),
+        20)
+
+    # the same 500x500 surfaces with a volatility smile, which should cost
+    # about as much as the flat volatility ones
+    from vol_surface import VolSurface
+
+    strikes = np.linspace(50, 150, 21)
+    expiries = np.array([0.25, 0.5, 1.0, 2.0])
+    smile = VolSurface(strikes, expiries, 0.2 + 0.1 * (
+        np.log(strikes[None, :] / 100) ** 2 + 0.02 * expiries[:, None]))
+    S_range = K_range = np.linspace(50, 150, 500)
+    cases["smile_pnl_surfaces_500x500"] = (
+        lambda: surface.generate_pnl_surfaces(S_range, K_range, 1.0, 0.05,
+                                              smile, 1, 10.0), 40)
+    rng = np.random.default_rng(0)
+    K, T = rng.uniform(40, 160, 1_000_000), rng.uniform(0.1, 3, 1_000_000)
+    cases["vol_lookup_1m"] = (lambda: smile(K, T), 20)
+    return cases
+
+
+def tick_cases():
+    """
+    Benchmarks of tick-to-greeks latency on a 100k contract book, for a
+    whole-book spot tick and for a tick on 1% of the contracts
+    :return: dictionary of case name to (function, number of calls)
+    """
+    from tick_repricer import TickRepricer
+
+    size = 100_000
+    rng = np.random.default_rng(0)
+    repricer = TickRepricer(rng.random(size) < 0.5, 100.0,
+                            rng.uniform(50, 150, size),
+                            rng.uniform(0.1, 2, size),
+                            rng.uniform(0.1, 0.5, size))
+    spots = itertools.cycle(np.linspace(95, 105, 101))
+    moved = np.arange(0, size, 100)
+    return {
+        "tick_100k_book": (lambda: repricer.tick(S=next(spots)), 50),
+        "tick_100k_1pct": (lambda: repricer.tick(S=next(spots), index=moved),
+                           500),
+    }
+
+
+def engine_cases():
+    """
+    Benchmarks of the tree and Monte Carlo pricing engines on a strip of
+    strikes
+    :return: dictionary of case name to (function, number of calls)
+    """
+    from pricing_engines import BinomialEngine, MonteCarloEngine
+
+    K = np.linspace(80, 120, 100)
+    tree = BinomialEngine(steps=500, exercise="american")
+    paths = MonteCarloEngine(num_paths=100_000, seed=0)
+    return {
+        "binomial_american_100x500": (
+            lambda: tree.price(100.0, K, 1.0, 0.05, 0.2, "put"), 10),
+        "monte_carlo_100k_paths": (
+            lambda: paths.price(100.0, 100.0, 1.0, 0.05, 0.2), 20),
+    }
+
+
+def heatmap_cases():
+    """
+    Benchmarks of generate_heatmap rendering; the image cache is cleared
+    before each call so every call really renders
+    :return: dictionary of case name to (function, number of calls)
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    # streamlit warns about running without a script context on every call
+    logging.disable(logging.WARNING)
+    import heatmap_funcs
+
+    cmap = sns.diverging_palette(0, 145, as_cmap=True)
+
+    def render(size, backend):
+        labels = np.linspace(50, 150, size)
+        surface_matrix = np.outer(labels - 100, np.ones(size))
+
+        def run():
+            heatmap_funcs.render_heatmap_image.clear()
+            heatmap_funcs.generate_heatmap(
+                "Benchmark", surface_matrix, labels, labels, cmap,
+                heatmap_funcs.dynamic_annotation_format, backend=backend)
+            plt.close("all")
+        return run
+
+    return {
+        "heatmap_seaborn_11x11": (render(11, "seaborn"), 5),
+        "heatmap_image_11x11": (render(11, "image"), 5),
+        "heatmap_image_200x200": (render(200, "image"), 5),
+    }
+
+
+def measure(func, calls):
+    """
+    Times a benchmark call by call, then measures its peak memory in a
+    separate traced call
+    :param func: function to benchmark
+    :param calls: number of timed calls
+    :return: dictionary of latency percentiles (microseconds) and peak
+    memory (KiB)
+    """
+    func()  # warm up imports and caches
+    latencies = np.empty(calls)
+    for i in range(calls):
+        start = time.perf_counter_ns()
+        func()
+        latencies[i] = time.perf_counter_ns() - start
+    latencies /= 1000
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"calls": calls,
+            "p50_us": float(np.percentile(latencies, 50)),
+            "p90_us": float(np.percentile(latencies, 90)),
+            "p99_us": float(np.percentile(latencies, 99)),
+            "peak_kib": peak / 1024,
+            }
+
+
+def measure_import(module, runs=IMPORT_RUNS):
+    """
+    Times the cold import of a module, each run in a fresh interpreter,
+    then measures its peak memory in a separate traced run
+    :param module: name of the module in src
+    :param runs: number of timed imports
+    :return: dictionary in the layout of measure()
+    """
+    def run(traced):
+        script = IMPORT_SCRIPT.format(src_dir=SRC_DIR, traced=traced,
+                                      module=module)
+        output = subprocess.run([sys.executable, "-c", script],
+                                capture_output=True, text=True, check=True)
+        elapsed_ns, peak = output.stdout.split()
+        return int(elapsed_ns) / 1000, int(peak)
+
+    latencies = np.array([run(False)[0] for _ in range(runs)])
+    return {"calls": runs,
+            "p50_us": float(np.percentile(latencies, 50)),
+            "p90_us": float(np.percentile(latencies, 90)),
+            "p99_us": float(np.percentile(latencies, 99)),
+            "peak_kib": run(True)[1] / 1024,
+            }
+
+
+def check_budgets(results, budgets=IMPORT_BUDGETS_MS):
+    """
+    Finds the cases whose median latency is above their absolute budget
+    :param results: dictionary of case name to measure() output
+    :param budgets: dictionary of case name to budget in milliseconds
+    :return: list of budget violation messages
+    """
+    return [f"{name}: median {results[name]['p50_us'] / 1000:.1f}ms over "
+            f"the {budget:.0f}ms budget"
+            for name, budget in budgets.items()
+            if name in results and results[name]["p50_us"] > budget * 1000]
+
+
+def compare(results, baseline, latency_tolerance, memory_tolerance):
+    """
+    Finds the cases that are slower or use more memory than the baseline
+    allows
+    :param results: dictionary of case name to measure() output
+    :param baseline: dictionary in the same layout
+    :param latency_tolerance: allowed ratio of median latencies
+    :param memory_tolerance: allowed ratio of peak memory
+    :return: list of regression messages
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        if result["p50_us"] > base["p50_us"] * latency_tolerance:
+            regressions.append(
+                f"{name}: median {result['p50_us']:.1f}us vs baseline "
+                f"{base['p50_us']:.1f}us")
+        # small allocations are noise, only compare above 64 KiB
+        if result["peak_kib"] > max(base["peak_kib"], 64) * memory_tolerance:
+            regressions.append(
+                f"{name}: peak memory {result['peak_kib']:.0f}KiB vs "
+                f"baseline {base['peak_kib']:.0f}KiB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pricer, surfaces and heatmap rendering "
+                    "against a stored baseline")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="record the results as the new baseline")
+    parser.add_argument("--latency-tolerance", type=float,
+                        default=LATENCY_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float,
+                        default=MEMORY_TOLERANCE)
+    parser.add_argument("-k", dest="pattern", default="",
+                        help="only run cases whose name contains this")
+    args = parser.parse_args(argv)
+
+    cases = {}
+    for group in (option_cases, surface_cases, tick_cases, engine_cases,
+                  heatmap_cases):
+        cases.update(group())
+    imports = {f"import_{module}": module for module in IMPORT_MODULES}
+
+    results = {}
+    print(f"{'case':<26}{'p50 us':>12}{'p90 us':>12}{'p99 us':>12}"
+          f"{'peak KiB':>12}")
+    for name in list(cases) + list(imports):
+        if args.pattern not in name:
+            continue
+        if name in imports:
+            result = measure_import(imports[name])
+        else:
+            result = measure(*cases[name])
+        results[name] = result
+        print(f"{name:<26}{result['p50_us']:>12.1f}{result['p90_us']:>12.1f}"
+              f"{result['p99_us']:>12.1f}{result['peak_kib']:>12.0f}")
+
+    violations = check_budgets(results)
+    if violations:
+        print("\nIMPORT BUDGET EXCEEDED:")
+        for message in violations:
+            print(f"  {message}")
+        return 1
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as baseline_file:
+                baseline = json.load(baseline_file)
+        baseline.update(results)
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline")
+        return 1
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = compare(results, baseline, args.latency_tolerance,
+                          args.memory_tolerance)
+    if regressions:
+        print("\nPERFORMANCE REGRESSIONS:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
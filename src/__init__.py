@@ -0,0 +1,6 @@
+"""
+The modules import each other relative to this package when it is imported
+as src (e.g. from src.option import Option), and as top-level modules when
+src itself is on the path, as it is for streamlit run src/streamlit_app.py
+and python src/batch_cli.py
+"""
@@ -0,0 +1,201 @@
+"""
+File: app_cache.py
+Description: Cached stages of the streamlit app. Each stage is keyed only
+on the inputs it depends on and keeps a bounded number of entries (least
+recently used are evicted first), so a rerun only recomputes the stages
+whose inputs changed
+Created by: Renesh Ravi
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+if __package__:
+    from . import batch_pricer
+    from . import option
+    from . import portfolio
+    from . import result_store
+    from . import surface
+    from . import taylor_approx
+    from . import vol_surface
+else:
+    import batch_pricer
+    import option
+    import portfolio
+    import result_store
+    import surface
+    import taylor_approx
+    import vol_surface
+
+MAX_ENTRIES = 32
+MAX_BOOKS = 4
+MAX_SWEEPS = 4  # cached time decay sweeps
+MAX_SWEEP_FRAMES = 500
+# frames x grid points of a sweep: 80 MB of call and put prices
+MAX_SWEEP_POINTS = 5_000_000
+# smallest surfaces (grid points) kept in the result store; smaller ones are
+# repriced faster than they are written and mapped back from disk
+STORE_MIN_POINTS = 250_000
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def option_values(S, K, T, r, vol, option_type):
+    """
+    Price and greeks of a single option
+    :return: dictionary from Option.price_and_greeks
+    """
+    return option.Option(S, K, T, r, vol, option_type).price_and_greeks()
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def price_surfaces(S_range, K_range, T, r, vol, vol_csv=None):
+    """
+    Call and put price surfaces; they don't depend on the position size or
+    purchase price, which only rescale them into PnL (see pnl_surface).
+    Surfaces of at least STORE_MIN_POINTS points are kept in the shared
+    result store as well, so those computed before (e.g. before a restart)
+    are mapped from disk
+    :param vol_csv: optional bytes of a volatility surface CSV, used
+    instead of vol
+    :return: tuple of numpy.ndarray (call prices, put prices)
+    """
+    if vol_csv is not None:
+        vol = load_vol_surface(vol_csv)
+    store = None
+    if len(S_range) * len(K_range) * np.size(T) >= STORE_MIN_POINTS:
+        store = result_store.get_result_store()
+    return surface.price_surfaces(S_range, K_range, T, r, vol, store=store)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def approximate_price_surfaces(S_range, K_range, T, r, vol, tolerance,
+                               vol_csv=None):
+    """
+    Call and put price surfaces from the greeks' expansion around the
+    middle of S_range
+    :param vol_csv: optional bytes of a volatility surface CSV, used
+    instead of vol
+    :return: tuple (call prices, put prices, error report) from
+    taylor_approx.price_surfaces
+    """
+    if vol_csv is not None:
+        vol = load_vol_surface(vol_csv)
+    return taylor_approx.price_surfaces(S_range, K_range, T, r, vol,
+                                        tolerance)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def greeks_surfaces(S_range, K_range, T, r, vol, vol_csv=None):
+    """
+    Call and put price and greeks surfaces from one batched evaluation
+    :param vol_csv: optional bytes of a volatility surface CSV, used
+    instead of vol
+    :return: tuple of dictionaries (call values, put values) from
+    surface.greeks_surfaces
+    """
+    if vol_csv is not None:
+        vol = load_vol_surface(vol_csv)
+    return surface.greeks_surfaces(S_range, K_range, T, r, vol)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def greeks_check(S_range, K_range, T, r, vol, vol_csv=None):
+    """
+    Largest differences between the analytic and finite-difference greeks
+    surfaces
+    :param vol_csv: optional bytes of a volatility surface CSV, used
+    instead of vol
+    :return: pandas.DataFrame with Greek and Max Difference columns
+    """
+    if vol_csv is not None:
+        vol = load_vol_surface(vol_csv)
+    differences = surface.check_greeks(S_range, K_range, T, r, vol)
+    return pd.DataFrame({"Greek": list(differences),
+                         "Max Difference": [f"{value:.2e}" for value in
+                                            differences.values()]})
+
+
+def max_sweep_frames(num_points):
+    """
+    Most frames of a time decay sweep over a num_points x num_points grid,
+    so that a cached sweep stays within MAX_SWEEP_POINTS prices
+    :param num_points: grid points along each axis of the heatmaps
+    :return: int number of frames, at least 2
+    """
+    return max(2, min(MAX_SWEEP_FRAMES, MAX_SWEEP_POINTS // num_points ** 2))
+
+
+@st.cache_data(max_entries=MAX_SWEEPS, show_spinner=False)
+def time_decay_surfaces(S_range, K_range, T, r, vol, num_frames,
+                        vol_csv=None):
+    """
+    Call and put price surfaces at every frame of a time decay sweep,
+    computed at once so moving through the frames never reprices
+    :param vol_csv: optional bytes of a volatility surface CSV, used
+    instead of vol
+    :return: tuple (maturities, call prices, put prices) from
+    surface.time_decay_surfaces
+    """
+    max_frames = max_sweep_frames(max(len(S_range), len(K_range)))
+    if num_frames > max_frames:
+        raise ValueError(f"Invalid number of frames. Choose at most "
+                         f"{max_frames} frames for this grid.")
+    if vol_csv is not None:
+        vol = load_vol_surface(vol_csv)
+    return surface.time_decay_surfaces(S_range, K_range, T, r, vol,
+                                       num_frames)
+
+
+@st.cache_resource(max_entries=MAX_BOOKS, show_spinner=False)
+def load_vol_surface(vol_csv):
+    """
+    Volatility surface built from the bytes of an uploaded CSV of K, T and
+    vol quotes
+    :return: vol_surface.VolSurface object
+    """
+    return vol_surface.VolSurface.from_csv(io.BytesIO(vol_csv))
+
+
+def pnl_surface(price_surface, num_contracts, purchase_price):
+    """
+    Rescales a cached price surface into a PnL surface
+    :param price_surface: numpy.ndarray from price_surfaces
+    :param num_contracts: number of contracts held
+    :param purchase_price: price paid per contract
+    :return: numpy.ndarray PnL surface
+    """
+    return num_contracts * (price_surface - purchase_price)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def greeks_table(values):
+    """
+    Table of the greeks shown in the app
+    :param values: dictionary with the option greeks as keys
+    :return: pandas.DataFrame with Greek and Values columns
+    """
+    return pd.DataFrame({
+        "Greek": list(batch_pricer.GREEK_NAMES),
+        "Values": [f"{values[name]:.4f}" for name in batch_pricer.GREEK_NAMES]})
+
+
+@st.cache_resource(max_entries=MAX_BOOKS, show_spinner=False)
+def load_portfolio(legs_csv, r):
+    """
+    Portfolio built from the bytes of an uploaded legs CSV; kept as a
+    shared resource rather than copied on every hit since books can be
+    large
+    :return: portfolio.Portfolio object, which must not be modified
+    """
+    return portfolio.Portfolio.from_csv(io.BytesIO(legs_csv), r=r)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def portfolio_pnl_surface(legs_csv, r, spot_moves, vol_moves):
+    """
+    Book PnL over spot and volatility moves
+    :return: numpy.ndarray from Portfolio.pnl_surface
+    """
+    return load_portfolio(legs_csv, r).pnl_surface(spot_moves, vol_moves)
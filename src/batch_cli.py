@@ -0,0 +1,193 @@
+"""
+File: batch_cli.py
+Description: Headless command line batch pricer for file to file jobs
+    - Reads a CSV or Parquet file of contracts in fixed-size chunks so
+      memory stays bounded regardless of the file size
+    - Prices the chunks and their greeks on a pool of worker processes
+    - Writes the contracts with their price and greeks as CSV or Parquet
+    - Never imports the UI stack (streamlit, seaborn, matplotlib, yfinance)
+Usage:
+    python src/batch_cli.py contracts.parquet priced.parquet --rate 0.045
+Created by: Renesh Ravi
+"""
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+if __package__:
+    from . import batch_pricer
+else:
+    import batch_pricer
+
+INPUT_COLUMNS = ("option_type", "S", "K", "T", "vol")
+# priced as floats whatever dtype a chunk infers, so every chunk of the
+# output has the same schema
+FLOAT_COLUMNS = ("S", "K", "T", "vol", "r")
+VALUE_NAMES = ("Price",) + batch_pricer.GREEK_NAMES
+FILE_FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet"}
+DEFAULT_CHUNK_ROWS = 250_000
+
+
+def file_format(path):
+    """
+    Determines a file's format from its extension
+    :param path: path of the file
+    :return: 'csv' or 'parquet'
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FILE_FORMATS:
+        raise ValueError(f"Invalid file extension '{extension}'. Choose one "
+                         f"of {', '.join(FILE_FORMATS)}.")
+    return FILE_FORMATS[extension]
+
+
+def read_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Reads a contracts file a chunk at a time
+    :param path: path of a CSV or Parquet file with the INPUT_COLUMNS and
+    optionally a per-contract r column
+    :param chunk_rows: rows per chunk
+    :return: generator of pandas.DataFrame; an empty file gives one empty
+    chunk with its columns
+    """
+    if file_format(path) == "csv":
+        with pd.read_csv(path, chunksize=chunk_rows) as reader:
+            yield from reader
+    else:
+        parquet_file = pq.ParquetFile(path)
+        if parquet_file.metadata.num_rows == 0:
+            yield parquet_file.schema_arrow.empty_table().to_pandas()
+            return
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+
+
+def price_chunk(contracts, r):
+    """
+    Prices a chunk of contracts and adds their price and greeks as columns
+    :param contracts: pandas.DataFrame with the INPUT_COLUMNS
+    :param r: Risk Free Rate used when the chunk has no r column
+    :return: pandas.DataFrame of the contracts with the VALUE_NAMES added
+    """
+    missing = [name for name in INPUT_COLUMNS if name not in contracts]
+    if missing:
+        raise KeyError(f"Missing columns: {', '.join(missing)}")
+    contracts = contracts.astype({name: np.float64 for name in FLOAT_COLUMNS
+                                  if name in contracts})
+    rates = contracts["r"].to_numpy() if "r" in contracts else r
+    values = batch_pricer.price_and_greeks(
+        contracts["S"].to_numpy(), contracts["K"].to_numpy(),
+        contracts["T"].to_numpy(), rates, contracts["vol"].to_numpy(),
+        contracts["option_type"].to_numpy())
+    return contracts.assign(**values)
+
+
+class ResultWriter:
+    def __init__(self, path):
+        """
+        Writes priced chunks to a CSV or Parquet file as they arrive
+        :param path: path of the output file; the format follows the
+        extension
+        """
+        self.path = path
+        self.format = file_format(path)
+        self.rows = 0
+        self._parquet = None
+
+    def write(self, frame):
+        """
+        Appends a chunk of results; Parquet chunks are cast to the schema
+        of the first one (e.g. an extra column that is all integers in one
+        chunk and has decimals in another)
+        :param frame: pandas.DataFrame from price_chunk
+        """
+        if self.format == "csv":
+            frame.to_csv(self.path, mode="w" if self.rows == 0 else "a",
+                         header=self.rows == 0, index=False)
+        else:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            elif table.schema != self._parquet.schema:
+                table = table.cast(self._parquet.schema)
+            self._parquet.write_table(table)
+        self.rows += len(frame)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def price_file(input_path, output_path, r=0.05,
+               chunk_rows=DEFAULT_CHUNK_ROWS, max_workers=None):
+    """
+    Prices every contract of a file into another file. At most two chunks
+    per worker are in flight, and results are written in input order
+    :param input_path: CSV or Parquet file of contracts
+    :param output_path: CSV or Parquet file for the results
+    :param r: Risk Free Rate used when the input has no r column
+    :param chunk_rows: rows read and priced at once
+    :param max_workers: number of worker processes; 1 prices in this
+    process
+    :return: number of contracts priced
+    """
+    chunks = read_chunks(input_path, chunk_rows)
+    max_workers = max_workers or os.cpu_count() or 1
+    with ResultWriter(output_path) as writer:
+        if max_workers == 1:
+            for contracts in chunks:
+                writer.write(price_chunk(contracts, r))
+            return writer.rows
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            pending = deque()
+            for contracts in chunks:
+                pending.append(pool.submit(price_chunk, contracts, r))
+                if len(pending) >= 2 * max_workers:
+                    writer.write(pending.popleft().result())
+            while pending:
+                writer.write(pending.popleft().result())
+        return writer.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Price a CSV or Parquet file of contracts (option_type, "
+                    "S, K, T, vol and optionally r) and write their prices "
+                    "and greeks to a CSV or Parquet file")
+    parser.add_argument("input", help="contracts file (.csv or .parquet)")
+    parser.add_argument("output", help="results file (.csv or .parquet)")
+    parser.add_argument("--rate", type=float, default=0.05,
+                        help="risk free rate for inputs without an r column")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="contracts read and priced at once")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    try:
+        rows = price_file(args.input, args.output, args.rate,
+                          args.chunk_rows, args.workers)
+    except (KeyError, ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Priced {rows} contracts into {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+File: batch_pricer.py
+Description: Vectorized Black Scholes pricer that evaluates whole books of
+options in one NumPy pass
+    - Calculate call and put prices for arrays of contracts
+    - Calculate option greeks (delta, gamma, vega, theta, rho) alongside
+      the prices, matching option.Option
+Created by: Renesh Ravi
+"""
+import numpy as np
+
+if __package__:
+    from .normal_dist import norm_cdf_array, norm_pdf_array
+else:
+    from normal_dist import norm_cdf_array, norm_pdf_array
+
+GREEK_NAMES = ("Delta", "Gamma", "Vega", "Theta", "Rho")
+
+
+def option_sign(option_type):
+    """
+    Converts option types into a +1 (call) / -1 (put) array so that call
+    and put formulas can be evaluated together
+    :param option_type: 'call', 'put', an array of those strings, or a
+    boolean array that is True for calls
+    :return: numpy.ndarray of +1.0 for calls and -1.0 for puts
+    """
+    types = np.asarray(option_type)
+    if types.dtype == bool:
+        is_call = types
+    else:
+        types = np.char.lower(types.astype(str))
+        is_call = types == "call"
+        if not np.all(is_call | (types == "put")):
+            raise ValueError("Invalid option type. Choose 'call' or 'put'.")
+    return np.where(is_call, 1.0, -1.0)
+
+
+def _prepare(S, K, T, r, vol, option_type):
+    """
+    Broadcasts the pricing inputs against each other; a vol surface is
+    looked up at the strikes and expiries before they are broadcast
+    :return: tuple of float arrays (S, K, T, r, vol, sign)
+    """
+    if callable(vol):  # e.g. a vol_surface.VolSurface
+        vol = vol(K, T)
+    return np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (S, K, T, r, vol)),
+        option_sign(option_type))
+
+
+def black_scholes_price(S, K, T, r, vol, option_type="call"):
+    """
+    Calculates call or put prices for arrays of contracts
+    :param S: array of underlying prices
+    :param K: array of strike prices
+    :param T: array of times to maturity (in years)
+    :param r: array of risk free rates (annualized)
+    :param vol: array of volatilities (annualized), or a
+    vol_surface.VolSurface
+    :param option_type: 'call', 'put', or an array of them per contract
+    :return: numpy.ndarray of black scholes prices
+    """
+    S, K, T, r, vol, sign = _prepare(S, K, T, r, vol, option_type)
+    vol_sqrt_T = vol * np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * vol ** 2) * T) / vol_sqrt_T
+    d2 = d1 - vol_sqrt_T
+    discounted_K = K * np.exp(-r * T)
+    return sign * (S * norm_cdf_array(sign * d1)
+                   - discounted_K * norm_cdf_array(sign * d2))
+
+
+def price_and_greeks(S, K, T, r, vol, option_type="call"):
+    """
+    Calculates prices and all five greeks for arrays of contracts in a
+    single pass, sharing d1, d2, the normal cdf/pdf terms and the discount
+    factor between them
+    :param S: array of underlying prices
+    :param K: array of strike prices
+    :param T: array of times to maturity (in years)
+    :param r: array of risk free rates (annualized)
+    :param vol: array of volatilities (annualized), or a
+    vol_surface.VolSurface
+    :param option_type: 'call', 'put', or an array of them per contract
+    :return: dictionary with 'Price' and the option greeks as keys and
+    numpy.ndarray values
+    """
+    S, K, T, r, vol, sign = _prepare(S, K, T, r, vol, option_type)
+    sqrt_T = np.sqrt(T)
+    vol_sqrt_T = vol * sqrt_T
+    d1 = (np.log(S / K) + (r + 0.5 * vol ** 2) * T) / vol_sqrt_T
+    d2 = d1 - vol_sqrt_T
+    discounted_K = K * np.exp(-r * T)
+
+    cdf_d1 = norm_cdf_array(sign * d1)
+    cdf_d2 = norm_cdf_array(sign * d2)
+    pdf_d1 = norm_pdf_array(d1)
+    S_pdf_d1 = S * pdf_d1
+
+    return {"Price": sign * (S * cdf_d1 - discounted_K * cdf_d2),
+            "Delta": sign * cdf_d1,
+            "Gamma": pdf_d1 / (S * vol_sqrt_T),
+            "Vega": S_pdf_d1 * sqrt_T,
+            "Theta": (-S_pdf_d1 * vol / (2 * sqrt_T)
+                      - sign * r * discounted_K * cdf_d2),
+            "Rho": sign * T * discounted_K * cdf_d2,
+            }
@@ -0,0 +1,180 @@
+"""
+File: export.py
+Description: Lazy, chunked export of PnL surfaces and scenario cubes
+    - CSV, Arrow IPC stream and Parquet formats
+    - Data is serialized only when requested and one chunk of rows at a
+      time, so large cubes (including memory-mapped ones) are never copied
+      into memory as a whole
+Created by: Renesh Ravi
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+if __package__:
+    from . import profiling
+else:
+    import profiling
+
+EXPORT_FORMATS = ("csv", "arrow", "parquet")
+FILE_EXTENSIONS = {"csv": "csv", "arrow": "arrows", "parquet": "parquet"}
+MIME_TYPES = {"csv": "text/csv",
+              "arrow": "application/vnd.apache.arrow.stream",
+              "parquet": "application/vnd.apache.parquet"}
+DEFAULT_CHUNK_ROWS = 65_536
+
+
+def surface_axes(S_range, K_range):
+    """
+    Axes of a spot x strike PnL surface, in the layout cube_batches expects
+    :param S_range: 1-D array of spot prices (rows of the surface)
+    :param K_range: 1-D array of strike prices (columns of the surface)
+    :return: dictionary of axis name to values
+    """
+    return {"S": np.asarray(S_range), "K": np.asarray(K_range)}
+
+
+def cube_batches(cube, axes, value_name="PnL", chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yields a cube in long layout, one column per axis plus a value column,
+    as Arrow record batches of at most chunk_rows rows; an empty cube
+    yields a single empty batch, so its schema is still known
+    :param cube: N-dimensional numpy.ndarray (or memmap) of values
+    :param axes: dictionary of axis name to values, one per dimension
+    :param value_name: name of the value column
+    :param chunk_rows: rows per record batch
+    :return: generator of pyarrow.RecordBatch
+    """
+    if len(axes) != np.ndim(cube):
+        raise ValueError("Expected one axis per dimension of the cube.")
+    shape = np.shape(cube)
+    flat = np.reshape(cube, -1)
+    axis_values = [np.asarray(values) for values in axes.values()]
+
+    for start in range(0, max(flat.size, 1), chunk_rows):
+        stop = min(start + chunk_rows, flat.size)
+        coords = np.unravel_index(np.arange(start, stop), shape)
+        columns = {name: values[coord] for name, values, coord in
+                   zip(axes, axis_values, coords)}
+        columns[value_name] = np.asarray(flat[start:stop])
+        yield pa.RecordBatch.from_pydict(columns)
+
+
+def _wide_csv_chunks(surface_matrix, axes, chunk_rows):
+    """
+    Yields a 2-D surface as CSV with the first axis as the index and the
+    second as the columns, the layout of DataFrame.to_csv
+    :return: generator of bytes
+    """
+    (_, row_values), (_, column_values) = axes.items()
+    row_values = np.asarray(row_values)
+    # a surface without rows still gets its header line
+    for start in range(0, max(len(row_values), 1), chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        yield pd.DataFrame(np.asarray(surface_matrix[rows]),
+                           index=row_values[rows],
+                           columns=column_values).to_csv(
+            header=start == 0).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object whose contents are drained in pieces, letting
+    iter_export hand out bytes as soon as they're written
+    """
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_export(cube, axes, fmt="parquet", value_name="PnL",
+                chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Serializes a cube chunk by chunk, yielding the bytes as they are
+    produced. Arrow and Parquet use the long layout of cube_batches; CSV
+    keeps 2-D surfaces in their grid layout (as the app's downloads always
+    had) and uses the long layout for higher dimensional cubes
+    :param cube: N-dimensional numpy.ndarray (or memmap) of values
+    :param axes: dictionary of axis name to values, one per dimension
+    :param fmt: one of EXPORT_FORMATS
+    :param value_name: name of the value column
+    :param chunk_rows: rows serialized at once
+    :return: generator of bytes
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Invalid export format. Choose one of "
+                         f"{', '.join(EXPORT_FORMATS)}.")
+    if fmt == "csv" and np.ndim(cube) == 2:
+        yield from _wide_csv_chunks(cube, axes, chunk_rows)
+        return
+
+    sink = _ChunkSink()
+    batches = cube_batches(cube, axes, value_name, chunk_rows)
+    first = next(batches)
+    if fmt == "csv":
+        writer = pa_csv.CSVWriter(sink, first.schema)
+    elif fmt == "arrow":
+        writer = pa.ipc.new_stream(sink, first.schema)
+    else:
+        writer = pq.ParquetWriter(sink, first.schema)
+    with writer:
+        writer.write_batch(first)
+        yield sink.drain()
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()  # footer written when the writer closes
+
+
+def write_export(cube, axes, sink, fmt="parquet", value_name="PnL",
+                 chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Serializes a cube chunk by chunk into a file
+    :param cube: N-dimensional numpy.ndarray (or memmap) of values
+    :param axes: dictionary of axis name to values, one per dimension
+    :param sink: path or writable binary file object
+    :param fmt: one of EXPORT_FORMATS
+    :param value_name: name of the value column
+    :param chunk_rows: rows serialized at once
+    """
+    if isinstance(sink, str):
+        with open(sink, "wb") as sink_file:
+            return write_export(cube, axes, sink_file, fmt, value_name,
+                                chunk_rows)
+    with profiling.stage("export.write", format=fmt, rows=np.size(cube)):
+        for chunk in iter_export(cube, axes, fmt, value_name, chunk_rows):
+            profiling.count("export.bytes", len(chunk))
+            sink.write(chunk)
+
+
+def export_bytes(cube, axes, fmt="parquet", value_name="PnL",
+                 chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Serializes a whole cube at once, e.g. for a download button
+    :return: bytes of the export
+    """
+    with profiling.stage("export.serialize", format=fmt,
+                         rows=np.size(cube)):
+        data = b"".join(iter_export(cube, axes, fmt, value_name, chunk_rows))
+    profiling.count("export.bytes", len(data))
+    return data
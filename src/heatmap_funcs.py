@@ -1,16 +1,32 @@
 """
 File: heatmap_funcs.py
 Description: Helper functions for managing heatmaps on streamlit interface
+    - streamlit and the plotting libraries are imported by the functions
+      that draw, so the formatting helpers can be used without them
 Created by: Renesh Ravi
 """
 
-import matplotlib.pyplot as plt
+import io
 import numpy as np
-import streamlit as st
-import seaborn as sns
+if __package__:
+    from . import profiling
+else:
+    import profiling
+
+# "seaborn" draws every cell as its own patch and "image" draws the surface
+# as a single image, both rendered once into a cached PNG; "interactive" is
+# an Altair chart whose values show on hover
+HEATMAP_BACKENDS = ("seaborn", "image", "interactive")
+ANNOTATE_LIMIT = 400  # cells above which the PNG backends skip annotations
+NUM_TICKS = 11
+SPOT_STRIKE_TITLES = ("Strike Price (K)", "Spot Price (S)")
+PNL_TITLE = "PnL ($)"
+
 
 def generate_heatmap(title, surface_matrix, x_labels, y_labels, colormap,
-                     dynamic_format_func):
+                     dynamic_format_func, backend="image",
+                     annotate_limit=ANNOTATE_LIMIT,
+                     axis_titles=SPOT_STRIKE_TITLES, value_title=PNL_TITLE):
     """
     generate_heatmap creates a heatmap in streamlit framework
     :param title : string containing the title for the heatmap
@@ -19,21 +35,212 @@ def generate_heatmap(title, surface_matrix, x_labels, y_labels, colormap,
     :param y_labels: np.ndarray Y-axis labels
     :param colormap: sns.cmap color map for the heatmap
     :param dynamic_format_func: function to formation the heatmap annotations
+    :param backend: one of HEATMAP_BACKENDS; default is 'image'
+    :param annotate_limit: largest number of cells the 'seaborn' and
+    'image' backends annotate
+    :param axis_titles: (X-axis title, Y-axis title)
+    :param value_title: title of the values on the color scale
+    """
+    with profiling.stage("heatmap.render", title=title, backend=backend,
+                         cells=np.size(surface_matrix)):
+        _render_heatmap(title, surface_matrix, x_labels, y_labels, colormap,
+                        dynamic_format_func, backend, annotate_limit,
+                        axis_titles, value_title)
+
+
+def _render_heatmap(title, surface_matrix, x_labels, y_labels, colormap,
+                    dynamic_format_func, backend, annotate_limit,
+                    axis_titles, value_title):
+    """
+    Draws a heatmap with the selected backend, see generate_heatmap
     """
+    import streamlit as st
+
     st.markdown(f"### {title}")
+    if backend == "interactive":
+        st.altair_chart(heatmap_chart(surface_matrix, x_labels, y_labels,
+                                      colormap, dynamic_format_func,
+                                      axis_titles, value_title),
+                        use_container_width=True)
+        return
+    if backend not in HEATMAP_BACKENDS:
+        raise ValueError(f"Invalid heatmap backend. Choose one of "
+                         f"{', '.join(HEATMAP_BACKENDS)}.")
+
+    annotations = None
+    if surface_matrix.size <= annotate_limit:
+        annotations = format_annotations(surface_matrix, dynamic_format_func)
+    renderer = _cached_renderer("render_heatmap_image" if backend == "image"
+                                else "render_seaborn_heatmap")
+    st.image(renderer(surface_matrix, x_labels, y_labels,
+                      colormap(np.linspace(0, 1, 256)), annotations,
+                      axis_titles, value_title))
+
+
+# cached renderers (module attributes) and the functions they wrap
+_CACHED_RENDERERS = {"render_heatmap_image": "draw_heatmap_image",
+                     "render_seaborn_heatmap": "draw_seaborn_heatmap"}
+
+
+def _cached_renderer(name):
+    """
+    Wraps a drawing function in a streamlit cache on first use; the cached
+    function is also available as a module attribute of the given name
+    :param name: one of the keys of _CACHED_RENDERERS
+    :return: cached drawing function
+    """
+    renderer = globals().get(name)
+    if renderer is None:
+        import streamlit as st
+        renderer = st.cache_data(max_entries=32, show_spinner=False)(
+            globals()[_CACHED_RENDERERS[name]])
+        globals()[name] = renderer
+    return renderer
+
+
+def __getattr__(name):
+    if name in _CACHED_RENDERERS:
+        return _cached_renderer(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def draw_seaborn_heatmap(surface_matrix, x_labels, y_labels, colors,
+                         annotations=None, axis_titles=SPOT_STRIKE_TITLES,
+                         value_title=PNL_TITLE):
+    """
+    draw_seaborn_heatmap draws the surface with seaborn, one patch per
+    cell, and returns it as PNG bytes; render_seaborn_heatmap is its cached
+    version, so an unchanged surface is never redrawn
+    :param surface_matrix: np.ndarray containing surface matrix for heatmap
+    :param x_labels: np.ndarray X-axis labels
+    :param y_labels: np.ndarray Y-axis labels
+    :param colors: np.ndarray of RGBA colors making up the color map
+    :param annotations: optional np.ndarray of strings drawn on each cell
+    :param axis_titles: (X-axis title, Y-axis title)
+    :param value_title: title of the color bar
+    :return: bytes of the PNG image
+    """
+    profiling.count("heatmap.images_drawn")
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    import seaborn as sns
+    from matplotlib.colors import ListedColormap
+
     fig, ax = plt.subplots(figsize=(8, 6))
+    frame = pd.DataFrame(surface_matrix, index=np.round(y_labels, 2),
+                         columns=np.round(x_labels, 2))
+    # every label up to NUM_TICKS of them, every n-th one beyond
     sns.heatmap(
-        surface_matrix,
-        cmap=colormap,
+        frame,
+        cmap=ListedColormap(colors),
         center=0,
-        xticklabels=np.round(x_labels, 2),
-        yticklabels=np.round(y_labels, 2),
-        cbar_kws={'label': 'PnL ($)'}
+        xticklabels=max(1, -(-len(x_labels) // NUM_TICKS)),
+        yticklabels=max(1, -(-len(y_labels) // NUM_TICKS)),
+        cbar_kws={'label': value_title},
+        ax=ax
     )
-    annotate_heatmap(surface_matrix, ax, dynamic_format_func)
-    ax.set_xlabel("Strike Price (K)")
-    ax.set_ylabel("Spot Price (S)")
-    st.pyplot(fig)
+    if annotations is not None:
+        rows, cols = np.indices(annotations.shape)
+        for i, j, text in zip(rows.ravel(), cols.ravel(),
+                              annotations.ravel()):
+            ax.text(j + 0.5, i + 0.5, text, ha="center", va="center",
+                    fontsize=8)
+    ax.set_xlabel(axis_titles[0])
+    ax.set_ylabel(axis_titles[1])
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def draw_heatmap_image(surface_matrix, x_labels, y_labels, colors,
+                       annotations=None, axis_titles=SPOT_STRIKE_TITLES,
+                       value_title=PNL_TITLE):
+    """
+    draw_heatmap_image draws the surface as a single image and returns
+    it as PNG bytes; render_heatmap_image is its cached version, so an
+    unchanged surface is never redrawn
+    :param surface_matrix: np.ndarray containing surface matrix for heatmap
+    :param x_labels: np.ndarray X-axis labels
+    :param y_labels: np.ndarray Y-axis labels
+    :param colors: np.ndarray of RGBA colors making up the color map
+    :param annotations: optional np.ndarray of strings drawn on each cell
+    :param axis_titles: (X-axis title, Y-axis title)
+    :param value_title: title of the color bar
+    :return: bytes of the PNG image
+    """
+    profiling.count("heatmap.images_drawn")
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import ListedColormap, Normalize
+
+    # same coloring as sns.heatmap(center=0): a colormap symmetric about 0
+    limit = np.nanmax(np.abs(surface_matrix)) or 1.0
+    fig, ax = plt.subplots(figsize=(8, 6))
+    image = ax.imshow(surface_matrix, cmap=ListedColormap(colors),
+                      norm=Normalize(-limit, limit), aspect="auto",
+                      interpolation="nearest")
+    fig.colorbar(image, ax=ax, label=value_title)
+
+    x_ticks = np.unique(np.linspace(0, len(x_labels) - 1, NUM_TICKS)
+                        .round().astype(int))
+    y_ticks = np.unique(np.linspace(0, len(y_labels) - 1, NUM_TICKS)
+                        .round().astype(int))
+    ax.set_xticks(x_ticks, np.round(np.asarray(x_labels)[x_ticks], 2),
+                  rotation=90)
+    ax.set_yticks(y_ticks, np.round(np.asarray(y_labels)[y_ticks], 2))
+    ax.set_xlabel(axis_titles[0])
+    ax.set_ylabel(axis_titles[1])
+
+    if annotations is not None:
+        rows, cols = np.indices(annotations.shape)
+        for i, j, text in zip(rows.ravel(), cols.ravel(),
+                              annotations.ravel()):
+            ax.text(j, i, text, ha="center", va="center", fontsize=8)
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def heatmap_chart(surface_matrix, x_labels, y_labels, colormap, fmt_func,
+                  axis_titles=SPOT_STRIKE_TITLES, value_title=PNL_TITLE):
+    """
+    heatmap_chart builds an Altair heatmap of the surface whose values
+    are shown on hover instead of as per-cell text
+    :param surface_matrix: np.ndarray containing surface matrix for heatmap
+    :param x_labels: np.ndarray X-axis labels
+    :param y_labels: np.ndarray Y-axis labels
+    :param colormap: matplotlib color map for the heatmap
+    :param fmt_func: function that returns a formatted string
+    :param axis_titles: (X-axis title, Y-axis title)
+    :param value_title: title of the values in the legend and tooltip
+    :return: altair.Chart object
+    """
+    import altair as alt
+    import pandas as pd
+    from matplotlib.colors import to_hex
+
+    y_grid, x_grid = np.meshgrid(np.round(y_labels, 2),
+                                 np.round(x_labels, 2), indexing="ij")
+    data = pd.DataFrame({"Y": y_grid.ravel(),
+                         "X": x_grid.ravel(),
+                         "Value": surface_matrix.ravel(),
+                         "Label": format_annotations(surface_matrix,
+                                                     fmt_func).ravel()})
+    scale = alt.Scale(range=[to_hex(c) for c in
+                             colormap(np.linspace(0, 1, 11))],
+                      domainMid=0)
+    with alt.data_transformers.disable_max_rows():
+        return alt.Chart(data).mark_rect().encode(
+            x=alt.X("X:O", title=axis_titles[0]),
+            y=alt.Y("Y:O", title=axis_titles[1]),
+            color=alt.Color("Value:Q", scale=scale, title=value_title),
+            tooltip=[alt.Tooltip("Y:Q", title=axis_titles[1]),
+                     alt.Tooltip("X:Q", title=axis_titles[0]),
+                     alt.Tooltip("Label:N", title=value_title)],
+        ).properties(height=450)
 
 def dynamic_annotation_format(value):
     """
@@ -49,6 +256,35 @@ def dynamic_annotation_format(value):
         return f"{value:.1f}"  # Default with one decimal place
 
 
+def significant_annotation_format(value):
+    """
+    significant_annotation_format shows values with three significant
+    figures, for small quantities such as the greeks
+    :param value: float value of a heatmap cell
+    """
+    return f"{value:.3g}"
+
+
+def format_annotations(data, fmt_func=dynamic_annotation_format):
+    """
+    format_annotations formats every value of a surface at once; the
+    default format is a vectorized dynamic_annotation_format
+    :param data: numpy.ndarray containing the data to be annotated
+    :param fmt_func: function that returns a formatted string
+    :return: numpy.ndarray of strings with the same shape as data
+    """
+    data = np.asarray(data, dtype=float)
+    if fmt_func is not dynamic_annotation_format:
+        return np.vectorize(fmt_func, otypes=[str])(data)
+
+    magnitude = np.abs(data)
+    scale = np.where(magnitude >= 1_000_000, 1_000_000,
+                     np.where(magnitude >= 1_000, 1_000, 1))
+    suffix = np.where(scale == 1_000_000, "M",
+                      np.where(scale == 1_000, "K", ""))
+    return np.char.add(np.char.mod("%.1f", data / scale), suffix)
+
+
 # Custom annotation function for heatmap
 def annotate_heatmap(data, ax, fmt_func):
     """
@@ -57,8 +293,9 @@ def annotate_heatmap(data, ax, fmt_func):
     :param ax: matplotlib.axes.Axes object on which the heatmap is drawn
     :param fmt_func: function that returns a formatted string
     """
-    for i in range(data.shape[0]):
-        for j in range(data.shape[1]):
-            value = data[i, j]
-            text = fmt_func(value)
-            ax.text(j + 0.5, i + 0.5, text, ha="center", va="center", fontsize=8)
\ No newline at end of file
+    with profiling.stage("heatmap.annotate", cells=data.size):
+        for i in range(data.shape[0]):
+            for j in range(data.shape[1]):
+                value = data[i, j]
+                text = fmt_func(value)
+                ax.text(j + 0.5, i + 0.5, text, ha="center", va="center", fontsize=8)
\ No newline at end of file
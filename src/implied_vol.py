@@ -0,0 +1,124 @@
+"""
+File: implied_vol.py
+Description: Implied volatility solver for whole option chains
+    - Vectorized Newton steps on the black scholes price and vega of
+      every contract at once
+    - Bracketed Brent fallback for the contracts Newton fails on
+    - Per-contract convergence status and iteration counts
+Created by: Renesh Ravi
+"""
+import numpy as np
+from scipy.optimize import brentq
+
+if __package__:
+    from . import batch_pricer
+else:
+    import batch_pricer
+
+VOL_BOUNDS = (1e-6, 10.0)
+# tol is a price tolerance, so Brent runs to the float precision of the vol
+BRENT_XTOL = 1e-15
+BRENT_RTOL = 4 * np.finfo(float).eps
+
+
+def _initial_guess(S, K, T, r):
+    """
+    Manaster-Koehler starting point sqrt(2|ln(S/K) + rT| / T), kept away
+    from 0 where vega vanishes
+    :return: numpy.ndarray of starting volatilities
+    """
+    guess = np.sqrt(2 * np.abs(np.log(S / K) + r * T) / T)
+    return np.clip(guess, 0.05, 5.0)
+
+
+def _brent(price, S, K, T, r, sign, tol, vol_bounds):
+    """
+    Solves a single contract with Brent's method on the volatility bounds,
+    to the float precision of the volatility; as with the Newton steps, a
+    contract has converged only when its price is within tol
+    :return: tuple (vol, converged, iterations)
+    """
+    def price_error(vol):
+        return batch_pricer.black_scholes_price(S, K, T, r, vol,
+                                                sign > 0) - price
+    try:
+        vol, result = brentq(price_error, *vol_bounds, xtol=BRENT_XTOL,
+                             rtol=BRENT_RTOL, full_output=True, disp=False)
+    except ValueError:
+        # the bounds don't bracket the price
+        return np.nan, False, 0
+    if not result.converged:
+        return np.nan, False, result.iterations
+    return vol, bool(abs(price_error(vol)) < tol), result.iterations
+
+
+def implied_volatility(prices, S, K, T, r, option_type="call", tol=1e-8,
+                       max_iter=50, vol_bounds=VOL_BOUNDS):
+    """
+    Inverts black scholes prices into implied volatilities for a chain of
+    contracts, taking vectorized Newton steps for all of them together and
+    falling back to Brent's method for those where Newton fails
+    :param prices: array of market option prices
+    :param S: array of underlying prices
+    :param K: array of strike prices
+    :param T: array of times to maturity (in years)
+    :param r: array of risk free rates (annualized)
+    :param option_type: 'call', 'put', or an array of them per contract
+    :param tol: absolute price error at which a contract has converged
+    :param max_iter: maximum number of Newton steps
+    :param vol_bounds: (lowest, highest) volatility searched
+    :return: dictionary with 'Vol' (NaN where no solution was found),
+    'Converged' (bool, True where the price at Vol is within tol) and
+    'Iterations' (Newton plus Brent steps) arrays
+    """
+    prices, S, K, T, r, sign = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (prices, S, K, T, r)),
+        batch_pricer.option_sign(option_type))
+    shape = prices.shape
+    prices, S, K, T, r, sign = (x.ravel() for x in
+                                (prices, S, K, T, r, sign))
+
+    vol = np.full(prices.size, np.nan)
+    converged = np.zeros(prices.size, dtype=bool)
+    iterations = np.zeros(prices.size, dtype=np.int64)
+
+    # only prices strictly inside the no-arbitrage bounds have a solution
+    discounted_K = K * np.exp(-r * T)
+    lower = np.maximum(sign * (S - discounted_K), 0.0)
+    upper = np.where(sign > 0, S, discounted_K)
+    active = np.flatnonzero((prices > lower) & (prices < upper) & (T > 0))
+    sigma = _initial_guess(S[active], K[active], T[active], r[active])
+    failed = []
+
+    for step in range(1, max_iter + 1):
+        if not active.size:
+            break
+        results = batch_pricer.price_and_greeks(
+            S[active], K[active], T[active], r[active], sigma,
+            sign[active] > 0)
+        error = results["Price"] - prices[active]
+        iterations[active] = step
+
+        done = np.abs(error) < tol
+        vol[active[done]] = sigma[done]
+        converged[active[done]] = True
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            next_sigma = sigma - error / results["Vega"]
+        diverged = ~done & ~((next_sigma > vol_bounds[0]) &
+                             (next_sigma < vol_bounds[1]))
+        failed.append(active[diverged])
+
+        keep = ~done & ~diverged
+        active, sigma = active[keep], next_sigma[keep]
+    failed.append(active)
+
+    for i in np.concatenate(failed):
+        vol[i], converged[i], brent_steps = _brent(
+            prices[i], S[i], K[i], T[i], r[i], sign[i], tol, vol_bounds)
+        iterations[i] += brent_steps
+
+    return {"Vol": vol.reshape(shape),
+            "Converged": converged.reshape(shape),
+            "Iterations": iterations.reshape(shape),
+            }
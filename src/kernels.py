@@ -0,0 +1,312 @@
+"""
+File: kernels.py
+Description: Fused Black Scholes kernels that write prices and greeks
+straight into caller-supplied output buffers
+    - "numba" compiles one loop that evaluates the price and all five
+      greeks of each contract in a single pass, without intermediate arrays
+    - "numpy" evaluates the batch pricer block by block, so its temporary
+      arrays stay small enough to remain in cache
+    - Broadcast inputs are never expanded to the full batch: inputs that
+      vary along only some axes are gathered one block at a time
+    - The backend is chosen at runtime; "auto" uses numba when it is
+      installed and NumPy otherwise. numba is only imported on first use
+Created by: Renesh Ravi
+"""
+from math import erfc, exp, log, sqrt
+
+import numpy as np
+
+if __package__:
+    from . import batch_pricer
+    from .normal_dist import INV_SQRT_2PI, SQRT_2
+else:
+    import batch_pricer
+    from normal_dist import INV_SQRT_2PI, SQRT_2
+
+KERNEL_BACKENDS = ("auto", "numba", "numpy")
+VALUE_NAMES = ("Price",) + batch_pricer.GREEK_NAMES
+BLOCK_SIZE = 16_384  # contracts per block of the numpy backend
+
+_backend = "auto"
+_numba_kernels = None
+_numba_available = None
+_prange = range  # numba.prange once the kernels are compiled
+
+
+def fused_price_and_greeks(S, K, T, r, vol, is_call, price, delta, gamma,
+                           vega, theta, rho):
+    """
+    Evaluates the price and greeks of every contract in one pass. Plain
+    Python on its own; compiled by numba for the "numba" backend
+    :param S, K, T, r, vol: 1-D float arrays of the contract inputs
+    :param is_call: 1-D boolean array, True for calls
+    :param price, delta, gamma, vega, theta, rho: 1-D float output arrays
+    """
+    for i in _prange(S.shape[0]):
+        sqrt_T = sqrt(T[i])
+        vol_sqrt_T = vol[i] * sqrt_T
+        d1 = (log(S[i] / K[i]) + (r[i] + 0.5 * vol[i] * vol[i]) * T[i]) \
+            / vol_sqrt_T
+        d2 = d1 - vol_sqrt_T
+        discounted_K = K[i] * exp(-r[i] * T[i])
+        pdf_d1 = exp(-0.5 * d1 * d1) * INV_SQRT_2PI
+        sign = 1.0 if is_call[i] else -1.0
+        cdf_d1 = 0.5 * erfc(-sign * d1 / SQRT_2)
+        cdf_d2 = 0.5 * erfc(-sign * d2 / SQRT_2)
+
+        price[i] = sign * (S[i] * cdf_d1 - discounted_K * cdf_d2)
+        delta[i] = sign * cdf_d1
+        gamma[i] = pdf_d1 / (S[i] * vol_sqrt_T)
+        vega[i] = S[i] * pdf_d1 * sqrt_T
+        theta[i] = -S[i] * pdf_d1 * vol[i] / (2 * sqrt_T) \
+            - sign * r[i] * discounted_K * cdf_d2
+        rho[i] = sign * T[i] * discounted_K * cdf_d2
+
+
+def fused_price(S, K, T, r, vol, is_call, price):
+    """
+    Evaluates only the price of every contract in one pass
+    :param S, K, T, r, vol: 1-D float arrays of the contract inputs
+    :param is_call: 1-D boolean array, True for calls
+    :param price: 1-D float output array
+    """
+    for i in _prange(S.shape[0]):
+        vol_sqrt_T = vol[i] * sqrt(T[i])
+        d1 = (log(S[i] / K[i]) + (r[i] + 0.5 * vol[i] * vol[i]) * T[i]) \
+            / vol_sqrt_T
+        sign = 1.0 if is_call[i] else -1.0
+        price[i] = sign * (
+            S[i] * 0.5 * erfc(-sign * d1 / SQRT_2)
+            - K[i] * exp(-r[i] * T[i])
+            * 0.5 * erfc(-sign * (d1 - vol_sqrt_T) / SQRT_2))
+
+
+def numba_available():
+    """
+    :return: True when numba can be imported; the import is only tried once
+    """
+    global _numba_available
+    if _numba_available is None:
+        try:
+            import numba  # noqa: F401
+            _numba_available = True
+        except ImportError:
+            _numba_available = False
+    return _numba_available
+
+
+def set_num_threads(n):
+    """
+    Limits the threads each numba kernel call runs on, e.g. to one per
+    process pool worker so the workers don't oversubscribe the cores. Does
+    nothing when numba is not installed
+    :param n: number of threads
+    """
+    if numba_available():
+        import numba
+
+        numba.set_num_threads(n)
+
+
+def set_backend(backend):
+    """
+    Selects the backend used when a call doesn't name one
+    :param backend: one of KERNEL_BACKENDS
+    """
+    global _backend
+    _resolve(backend)
+    _backend = backend
+
+
+def get_backend():
+    """
+    :return: name of the backend that calls use by default, with "auto"
+    resolved to the backend it picks
+    """
+    return _resolve(_backend)
+
+
+def _resolve(backend):
+    """
+    :param backend: one of KERNEL_BACKENDS, or None for the selected one
+    :return: 'numba' or 'numpy'
+    """
+    backend = _backend if backend is None else backend
+    if backend not in KERNEL_BACKENDS:
+        raise ValueError(f"Invalid kernel backend. Choose one of "
+                         f"{', '.join(KERNEL_BACKENDS)}.")
+    if backend == "auto":
+        return "numba" if numba_available() else "numpy"
+    if backend == "numba" and not numba_available():
+        raise ImportError("The numba backend needs numba to be installed.")
+    return backend
+
+
+def _load_numba_kernels():
+    """
+    Compiles the fused kernels on first use; the machine code is cached on
+    disk, so other processes (e.g. pool workers) load it instead of
+    compiling again
+    :return: tuple of compiled (fused_price_and_greeks, fused_price)
+    """
+    global _numba_kernels, _prange
+    if _numba_kernels is None:
+        import numba
+
+        _prange = numba.prange
+        jit = numba.njit(parallel=True, error_model="numpy", cache=True)
+        _numba_kernels = (jit(fused_price_and_greeks), jit(fused_price))
+    return _numba_kernels
+
+
+def _flat_inputs(S, K, T, r, vol, option_type):
+    """
+    Finds the broadcast shape of the contract inputs and how each of them
+    is read at a flattened contract index, without expanding any of them;
+    a vol surface is looked up at the strikes and expiries first
+    :return: tuple (shape, list of (data, strides) per input in the order
+    S, K, T, r, vol, is_call). data is the flattened input; strides are
+    its element strides along each axis of shape, or None when the input
+    already has the full shape
+    """
+    if callable(vol):  # e.g. a vol_surface.VolSurface
+        vol = vol(K, T)
+    inputs = [np.ascontiguousarray(x, dtype=np.float64)
+              for x in (S, K, T, r, vol)]
+    inputs.append(np.ascontiguousarray(
+        batch_pricer.option_sign(option_type) > 0))
+    shape = np.broadcast_shapes(*(x.shape for x in inputs))
+    flat = []
+    for x in inputs:
+        if x.shape == shape:
+            flat.append((x.reshape(-1), None))
+        else:
+            view = np.broadcast_to(x, shape)
+            flat.append((x.reshape(-1),
+                         tuple(stride // x.itemsize
+                               for stride in view.strides)))
+    return shape, flat
+
+
+def _input_block(shape, inputs, start, stop):
+    """
+    Reads the flattened contracts start to stop of every input: a slice of
+    full inputs, a broadcast view of single values and a gather (at most
+    stop - start elements) of inputs that vary along only some axes
+    :param shape: broadcast shape of the inputs
+    :param inputs: list of (data, strides) from _flat_inputs
+    :return: list of 1-D arrays of length stop - start
+    """
+    coords = None
+    block = []
+    for data, strides in inputs:
+        if strides is None:
+            block.append(data[start:stop])
+        elif not any(strides):
+            block.append(np.broadcast_to(data[:1], (stop - start,)))
+        else:
+            if coords is None:
+                coords = np.unravel_index(np.arange(start, stop), shape)
+            offsets = sum(coord * stride for coord, stride
+                          in zip(coords, strides) if stride)
+            block.append(data[offsets])
+    return block
+
+
+def _block_size(backend, inputs):
+    """
+    :return: contracts per block; the numba kernels take every contract in
+    one call unless some input has to be gathered
+    """
+    if backend == "numba" and all(strides is None or not any(strides)
+                                  for _, strides in inputs):
+        return None
+    return BLOCK_SIZE
+
+
+def _flat_output(out, shape):
+    """
+    Checks a caller-supplied output buffer (or allocates one)
+    :return: tuple (buffer with the given shape, flat view of it)
+    """
+    if out is None:
+        out = np.empty(shape)
+    if out.shape != shape or out.dtype != np.float64 or \
+            not out.flags.c_contiguous:
+        raise ValueError(f"Output buffers must be C-contiguous float64 "
+                         f"arrays of shape {shape}.")
+    return out, out.reshape(-1)
+
+
+def price_and_greeks(S, K, T, r, vol, option_type="call", out=None,
+                     backend=None):
+    """
+    Calculates prices and all five greeks for arrays of contracts, the
+    same values as batch_pricer.price_and_greeks
+    :param S: array of underlying prices
+    :param K: array of strike prices
+    :param T: array of times to maturity (in years)
+    :param r: array of risk free rates (annualized)
+    :param vol: array of volatilities (annualized), or a
+    vol_surface.VolSurface
+    :param option_type: 'call', 'put', or an array of them per contract
+    :param out: optional dictionary of VALUE_NAMES to output buffers with
+    the broadcast shape of the inputs
+    :param backend: one of KERNEL_BACKENDS; default is the selected backend
+    :return: dictionary with 'Price' and the option greeks as keys and
+    numpy.ndarray values (the buffers in out, when given)
+    """
+    backend = _resolve(backend)
+    shape, inputs = _flat_inputs(S, K, T, r, vol, option_type)
+    out = out or {}
+    results, flat = {}, []
+    for name in VALUE_NAMES:
+        results[name], flat_out = _flat_output(out.get(name), shape)
+        flat.append(flat_out)
+
+    size = flat[0].size
+    step = _block_size(backend, inputs) or max(size, 1)
+    for start in range(0, size, step):
+        stop = min(start + step, size)
+        block = _input_block(shape, inputs, start, stop)
+        if backend == "numba":
+            _load_numba_kernels()[0](
+                *block, *(flat_out[start:stop] for flat_out in flat))
+            continue
+        values = batch_pricer.price_and_greeks(*block)
+        for name, flat_out in zip(VALUE_NAMES, flat):
+            flat_out[start:stop] = values[name]
+    return results
+
+
+def black_scholes_price(S, K, T, r, vol, option_type="call", out=None,
+                        backend=None):
+    """
+    Calculates call or put prices for arrays of contracts, the same values
+    as batch_pricer.black_scholes_price
+    :param S: array of underlying prices
+    :param K: array of strike prices
+    :param T: array of times to maturity (in years)
+    :param r: array of risk free rates (annualized)
+    :param vol: array of volatilities (annualized), or a
+    vol_surface.VolSurface
+    :param option_type: 'call', 'put', or an array of them per contract
+    :param out: optional output buffer with the broadcast shape of the
+    inputs
+    :param backend: one of KERNEL_BACKENDS; default is the selected backend
+    :return: numpy.ndarray of black scholes prices (out, when given)
+    """
+    backend = _resolve(backend)
+    shape, inputs = _flat_inputs(S, K, T, r, vol, option_type)
+    out, flat_out = _flat_output(out, shape)
+
+    size = flat_out.size
+    step = _block_size(backend, inputs) or max(size, 1)
+    for start in range(0, size, step):
+        stop = min(start + step, size)
+        block = _input_block(shape, inputs, start, stop)
+        if backend == "numba":
+            _load_numba_kernels()[1](*block, flat_out[start:stop])
+        else:
+            flat_out[start:stop] = batch_pricer.black_scholes_price(*block)
+    return out
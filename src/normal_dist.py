@@ -0,0 +1,174 @@
+"""
+File: normal_dist.py
+Description: Standard normal distribution functions for the pricers,
+built on math.erfc so that importing the pricing core needs neither
+scipy.stats nor (for scalars) NumPy
+    - Scalar normal cdf/pdf for the Option class
+    - Array normal cdf/pdf for the batch pricers, with a switchable cdf
+      backend: scipy's compiled ndtr, an element-wise math.erfc, or an
+      interpolated lookup table with a guaranteed maximum error (the pdf
+      is a single exp, which no table beats)
+    - Backends are only built (and their modules imported) on first use
+Created by: Renesh Ravi
+"""
+from math import erfc, exp, pi, sqrt
+
+SQRT_2 = sqrt(2.0)
+INV_SQRT_2PI = 1.0 / sqrt(2.0 * pi)
+ARRAY_BACKENDS = ("auto", "scipy", "erf", "table")
+DEFAULT_TABLE_ERROR = 1e-7
+# largest |f''| of the normal cdf, reached at x = +-1
+MAX_CURVATURE = INV_SQRT_2PI * exp(-0.5)
+
+_array_backend = "auto"
+_table_error = DEFAULT_TABLE_ERROR
+_array_cdf = None
+_array_pdf = None
+
+
+def norm_cdf(x):
+    """
+    Cumulative distribution function of the standard normal distribution
+    :param x: float value
+    :return: float probability of a standard normal value below x
+    """
+    return 0.5 * erfc(-x / SQRT_2)
+
+
+def norm_pdf(x):
+    """
+    Probability density function of the standard normal distribution
+    :param x: float value
+    :return: float density at x
+    """
+    return exp(-0.5 * x * x) * INV_SQRT_2PI
+
+
+class NormalTable:
+    def __init__(self, max_error=DEFAULT_TABLE_ERROR):
+        """
+        Tabulates the normal cdf for linear interpolation with an absolute
+        error of at most max_error everywhere: the chord error of a cell of
+        width h is at most h**2 / 8 * max|f''|, and h is chosen to keep it
+        within max_error / 2. Beyond +-x_max, where both tails are below
+        max_error / 2, inputs are clamped
+        :param max_error: largest absolute error of the cdf
+        """
+        import numpy as np
+
+        if not 0 < max_error < 0.5:
+            raise ValueError("Invalid table error. Choose a max_error "
+                             "between 0 and 0.5.")
+        self.max_error = max_error
+        self.step = sqrt(4 * max_error / MAX_CURVATURE)
+        self.x_max = 0.0
+        while norm_cdf(-self.x_max) > max_error / 2:
+            self.x_max += 0.01
+        nodes = np.arange(-self.x_max, self.x_max + self.step, self.step)
+        self.x_min, self.x_max = nodes[0], nodes[-1]
+        self.inv_step = 1.0 / self.step
+        self.cells = len(nodes) - 1
+
+        values = np.frompyfunc(norm_cdf, 1, 1)(nodes).astype(np.float64)
+        # the chords are stored as per-cell intercepts and slopes, so an
+        # evaluation is two lookups and a multiply-add
+        self.slopes = (values[1:] - values[:-1]) * self.inv_step
+        self.intercepts = values[:-1] - self.slopes * nodes[:-1]
+
+    def cdf(self, x):
+        """
+        :param x: numpy.ndarray of values
+        :return: numpy.ndarray of interpolated normal cdf values (NaN where
+        x is NaN)
+        """
+        import numpy as np
+
+        # NaN has no cell, so it is looked up as 0 and put back afterwards
+        nan = np.isnan(x)
+        has_nan = np.any(nan)
+        if has_nan:
+            x = np.where(nan, 0.0, x)
+        x = np.clip(x, self.x_min, self.x_max)
+        cell = np.minimum(((x - self.x_min) * self.inv_step)
+                          .astype(np.intp), self.cells - 1)
+        values = np.take(self.intercepts, cell) + np.take(self.slopes, cell) * x
+        return np.where(nan, np.nan, values) if has_nan else values
+
+
+def set_array_backend(backend, max_error=DEFAULT_TABLE_ERROR):
+    """
+    Selects how norm_cdf_array is evaluated
+    :param backend: 'scipy' (compiled ndtr), 'erf' (element-wise
+    math.erfc), 'table' (interpolated NormalTable) or 'auto' (scipy when
+    installed, erf otherwise)
+    :param max_error: largest absolute cdf error of the 'table' backend
+    """
+    global _array_backend, _table_error, _array_cdf, _array_pdf
+    if backend not in ARRAY_BACKENDS:
+        raise ValueError(f"Invalid normal distribution backend. Choose one "
+                         f"of {', '.join(ARRAY_BACKENDS)}.")
+    if backend == "table":
+        NormalTable(max_error)  # validates max_error before switching
+    _array_backend = backend
+    _table_error = max_error
+    _array_cdf = _array_pdf = None
+
+
+def get_array_backend():
+    """
+    :return: name of the selected array backend
+    """
+    return _array_backend
+
+
+def norm_cdf_array(x):
+    """
+    Standard normal cdf of every element of an array, using the selected
+    array backend
+    :param x: numpy.ndarray of values
+    :return: numpy.ndarray of probabilities with the shape of x
+    """
+    global _array_cdf
+    if _array_cdf is None:
+        _array_cdf = _load_array_functions()[0]
+    return _array_cdf(x)
+
+
+def norm_pdf_array(x):
+    """
+    Standard normal pdf of every element of an array
+    :param x: numpy.ndarray of values
+    :return: numpy.ndarray of densities with the shape of x
+    """
+    global _array_pdf
+    if _array_pdf is None:
+        _array_pdf = _load_array_functions()[1]
+    return _array_pdf(x)
+
+
+def _exact_pdf_array(x):
+    import numpy as np
+
+    return np.exp(-0.5 * x * x) * INV_SQRT_2PI
+
+
+def _load_array_functions():
+    """
+    :return: tuple of functions (cdf, pdf) of the selected array backend
+    """
+    if _array_backend == "table":
+        table = NormalTable(_table_error)
+        return table.cdf, _exact_pdf_array
+    if _array_backend in ("auto", "scipy"):
+        try:
+            from scipy.special import ndtr
+            return ndtr, _exact_pdf_array
+        except ImportError:
+            if _array_backend == "scipy":
+                raise
+
+    import numpy as np
+    element_cdf = np.frompyfunc(norm_cdf, 1, 1)
+    # frompyfunc returns a plain float for scalars, an object array otherwise
+    return (lambda x: np.asarray(element_cdf(np.asarray(x, dtype=np.float64)),
+                                 dtype=np.float64)), _exact_pdf_array
@@ -4,11 +4,16 @@ Description: Option class that generates an option with a variety of
 functions
     - Calculate call or put Black Scholes Price
     - Calculate option greeks (delta, gamma, vega, theta, rho)
+    - Price with any pricing_engines engine (binomial, Monte Carlo)
 Created by: Renesh Ravi
 """
-from scipy.stats import norm
 from math import log, sqrt, exp
 
+if __package__:
+    from .normal_dist import norm_cdf, norm_pdf
+else:
+    from normal_dist import norm_cdf, norm_pdf
+
 class Option:
     def __init__(self, S, K, T, r, vol, option_type="call"):
         """
@@ -17,9 +22,12 @@ class Option:
         :param K: Strike Price
         :param T: Time to maturity (in years)
         :param r: Risk Free Rate (annualized)
-        :param vol: Volatility (annualized)
+        :param vol: Volatility (annualized), or a vol_surface.VolSurface
+        to look it up at K and T
         :param option_type: 'call' or 'put'; default is 'call'
         """
+        if callable(vol):
+            vol = vol(K, T)
         self.S = S
         self.K = K
         self.T = T
@@ -30,6 +38,7 @@ class Option:
 
         self.d1 = self.get_d1()
         self.d2 = self.get_d2()
+        self._terms = None
 
     def get_d1(self):
         """
@@ -43,72 +52,100 @@ class Option:
     def get_d2(self):
         """
         Calculates the d2 value in the black scholes model
-        :return: float value of d1
+        :return: float value of d2
+        """
+        return self.d1 - self.vol * sqrt(self.T)
+
+    def get_terms(self):
+        """
+        Computes (on first use) the intermediate terms shared by the price
+        and the greeks of the Option
+        :return: BlackScholesTerms object of the Option
         """
-        return self.get_d1() - self.vol * sqrt(self.T)
+        if self._terms is None:
+            self._terms = BlackScholesTerms(self)
+        return self._terms
 
     def black_scholes_price(self):
         """
         Calculates call or put price for the Option object
         :return: float value of black scholes price
         """
+        terms = self.get_terms()
         if self.option_type == "call":
-            price = self.S * norm.cdf(self.d1) - self.K * exp(
-                -self.r * self.T) * norm.cdf(self.d2)
+            price = self.S * terms.cdf_d1 - self.K * terms.discount * \
+                terms.cdf_d2
         elif self.option_type == "put":
-            price = self.K * exp(-self.r * self.T) * norm.cdf(
-                -self.d2) - self.S * norm.cdf(-self.d1)
+            price = self.K * terms.discount * terms.cdf_neg_d2 - \
+                self.S * terms.cdf_neg_d1
         else:
             raise ValueError("Invalid option type. Choose 'call' or 'put'.")
 
         return price
 
+    def price(self, engine=None):
+        """
+        Calculates the price of the Option with a pricing engine
+        :param engine: pricing_engines.PricingEngine object (e.g. an
+        American BinomialEngine); default is the black scholes formula
+        :return: float value of the price
+        """
+        if engine is None:
+            return self.black_scholes_price()
+        if self.option_type not in ("call", "put"):
+            raise ValueError("Invalid option type. Choose 'call' or 'put'.")
+        return float(engine.price(self.S, self.K, self.T, self.r, self.vol,
+                                  self.option_type))
+
     def get_delta(self):
         """
         Calculates delta value of the Option -> how much option's price
         changes for every $1 move in spot price
-        :return: numpy.float delta value of an Option
+        :return: float delta value of an Option
         """
         if self.option_type == "call":
-            return norm.cdf(self.d1)
+            return self.get_terms().cdf_d1
         else:
-            return norm.cdf(self.d1) - 1
+            return self.get_terms().cdf_d1 - 1
 
     def get_gamma(self):
         """
         Calculates gamma value of an Option -> change in option's delta
-        :return: numpy.float gamma value of an Option
+        :return: float gamma value of an Option
         """
-        return (norm.pdf(self.d1)) / (self.S * self.vol * sqrt(self.T))
+        terms = self.get_terms()
+        return terms.pdf_d1 / (self.S * self.vol * terms.sqrt_T)
 
     def get_vega(self):
         """
         Calculates vega value of an Option
-        :return: numpy.float vega value of an Option
+        :return: float vega value of an Option
         """
-        return self.S * norm.pdf(self.d1) * sqrt(self.T)
+        terms = self.get_terms()
+        return self.S * terms.pdf_d1 * terms.sqrt_T
 
     def get_theta(self):
         """
         Calculates theta value of an Option
-        :return: numpy.float theta value of an Option
+        :return: float theta value of an Option
         """
+        terms = self.get_terms()
+        decay = (- self.S * terms.pdf_d1 * self.vol) / (2 * terms.sqrt_T)
         if self.option_type == "call":
-            return ((- self.S * norm.pdf(self.d1) * self.vol) / (2 * sqrt(self.T))) - self.r * self.K * exp(
-                -self.r * self.T) * norm.cdf(self.d2)
+            return decay - self.r * self.K * terms.discount * terms.cdf_d2
         else:
-            return ((- self.S * norm.pdf(self.d1) * self.vol) / (2 * sqrt(self.T))) + self.r * self.K * exp(
-                -self.r * self.T) * norm.cdf(-self.d2)
+            return decay + self.r * self.K * terms.discount * terms.cdf_neg_d2
 
     def get_rho(self):
         """
         Calculates rho value of an Option
-        :return: numpy.float rho value of an Option
+        :return: float rho value of an Option
         """
+        terms = self.get_terms()
         if self.option_type == "call":
-            return self.K * self.T * exp(- self.r * self.T) * norm.cdf(self.d2)
+            return self.K * self.T * terms.discount * terms.cdf_d2
         else:
-            return -(self.K * self.T * exp(- self.r * self.T) * norm.cdf(-1 * self.d2))
+            return -(self.K * self.T * terms.discount * terms.cdf_neg_d2)
 
     def get_greeks(self):
         """
@@ -120,4 +157,35 @@ class Option:
                 "Vega": self.get_vega(),
                 "Theta": self.get_theta(),
                 "Rho": self.get_rho(),
-                }
\ No newline at end of file
+                }
+
+    def price_and_greeks(self):
+        """
+        Calculates the black scholes price and all the greeks from a single
+        evaluation of the shared terms
+        :return: dictionary with 'Price' and the option greeks as keys and
+        their respective values
+        """
+        return dict(Price=self.black_scholes_price(), **self.get_greeks())
+
+
+class BlackScholesTerms:
+    """
+    Intermediate values of the black scholes formulas for one Option, so
+    the normal cdf/pdf, discount factor and sqrt(T) are computed only once
+    for the price and all of the greeks
+    """
+    __slots__ = ("sqrt_T", "discount", "cdf_d1", "cdf_d2", "cdf_neg_d1",
+                 "cdf_neg_d2", "pdf_d1")
+
+    def __init__(self, option):
+        """
+        Initializes the terms of an Option
+        :param option: Option object whose d1 and d2 are already computed
+        """
+        self.sqrt_T = sqrt(option.T)
+        self.discount = exp(-option.r * option.T)
+        self.cdf_d1, self.cdf_d2, self.cdf_neg_d1, self.cdf_neg_d2 = (
+            norm_cdf(d) for d in
+            (option.d1, option.d2, -option.d1, -option.d2))
+        self.pdf_d1 = norm_pdf(option.d1)
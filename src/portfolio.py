@@ -0,0 +1,199 @@
+"""
+File: portfolio.py
+Description: Portfolio of option legs stored column by column in NumPy
+arrays
+    - Prices every leg and aggregates book-level price, PnL and greeks in
+      one vectorized pass
+    - Incrementally reprices only the legs whose inputs change
+    - Generates book PnL surfaces over spot and volatility moves
+Created by: Renesh Ravi
+"""
+import numpy as np
+import pandas as pd
+
+if __package__:
+    from . import batch_pricer
+else:
+    import batch_pricer
+
+LEG_COLUMNS = ("S", "K", "T", "vol", "quantity", "cost_basis")
+VALUE_NAMES = ("Price",) + batch_pricer.GREEK_NAMES
+MIN_VOL = 1e-8  # floor of shocked volatilities, shared with scenario_engine
+SURFACE_BLOCK_SIZE = 2_000_000  # elements priced at once for surfaces
+
+
+class Portfolio:
+    def __init__(self, option_type, S, K, T, vol, quantity, cost_basis,
+                 r=0.05):
+        """
+        Initializes the Portfolio from one array per column, each entry
+        being one leg
+        :param option_type: 'call', 'put', or an array of them per leg
+        :param S: array of underlying prices
+        :param K: array of strike prices
+        :param T: array of times to maturity (in years)
+        :param vol: array of volatilities (annualized)
+        :param quantity: array of contracts held (negative when short)
+        :param cost_basis: array of prices paid per contract
+        :param r: Risk Free Rate (annualized) shared by all legs
+        """
+        *columns, sign = np.broadcast_arrays(
+            *(np.asarray(x, dtype=np.float64) for x in
+              (S, K, T, vol, quantity, cost_basis)),
+            batch_pricer.option_sign(option_type))
+        # copies so the columns can be updated in place
+        self.legs = {name: np.array(column, ndmin=1) for name, column in
+                     zip(LEG_COLUMNS, columns)}
+        self.legs["is_call"] = np.array(sign > 0, ndmin=1)
+        self.r = r
+        self.reprice()
+
+    @classmethod
+    def from_frame(cls, legs, r=0.05):
+        """
+        Creates a Portfolio from a DataFrame with an option_type column and
+        one column per entry of LEG_COLUMNS
+        :param legs: pandas.DataFrame of legs
+        :param r: Risk Free Rate (annualized) shared by all legs
+        :return: Portfolio object
+        """
+        return cls(legs["option_type"].to_numpy(),
+                   *(legs[name].to_numpy() for name in LEG_COLUMNS), r=r)
+
+    @classmethod
+    def from_csv(cls, path, r=0.05):
+        """
+        Creates a Portfolio from a CSV file in the from_frame layout
+        :param path: path or file-like object of the CSV
+        :param r: Risk Free Rate (annualized) shared by all legs
+        :return: Portfolio object
+        """
+        return cls.from_frame(pd.read_csv(path), r=r)
+
+    def __len__(self):
+        return len(self.legs["S"])
+
+    def to_frame(self):
+        """
+        :return: pandas.DataFrame with the legs, their price and greeks
+        """
+        frame = pd.DataFrame({
+            "option_type": np.where(self.legs["is_call"], "call", "put")})
+        for name in LEG_COLUMNS:
+            frame[name] = self.legs[name]
+        for name in VALUE_NAMES:
+            frame[name] = self.values[name]
+        return frame
+
+    def _evaluate(self, index):
+        """
+        Prices the selected legs
+        :param index: slice, integer array or boolean mask of legs
+        :return: dictionary of price and greeks arrays for those legs
+        """
+        legs = self.legs
+        return batch_pricer.price_and_greeks(
+            legs["S"][index], legs["K"][index], legs["T"][index], self.r,
+            legs["vol"][index], legs["is_call"][index])
+
+    def _position_totals(self, values, index):
+        """
+        Sums the position-weighted values of the selected legs
+        :param values: dictionary of price and greeks arrays of those legs
+        :param index: slice, integer array or boolean mask of legs
+        :return: dictionary of book-level price, PnL and greeks
+        """
+        quantity = self.legs["quantity"][index]
+        totals = {name: quantity @ values[name] for name in VALUE_NAMES}
+        totals["PnL"] = totals["Price"] - \
+            quantity @ self.legs["cost_basis"][index]
+        return totals
+
+    def reprice(self):
+        """
+        Prices every leg and recomputes the book totals from scratch
+        """
+        self.values = self._evaluate(slice(None))
+        self.totals = self._position_totals(self.values, slice(None))
+
+    def update_legs(self, index, **columns):
+        """
+        Changes columns of some legs, e.g. update_legs(3, quantity=10),
+        repricing only those legs and adjusting the book totals by the
+        difference in their contribution
+        :param index: leg number, array of distinct leg numbers, or boolean
+        mask
+        :param columns: new values for any of LEG_COLUMNS or is_call
+        """
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        # leg numbers as non-negative positions, so -1 and len - 1 match
+        index = np.arange(len(self))[np.atleast_1d(index)]
+        if np.unique(index).size != index.size:
+            # the totals would take a repeated leg's difference more than
+            # once
+            raise ValueError("Invalid leg index. Choose each leg at most "
+                             "once.")
+
+        old = self._position_totals(
+            {name: self.values[name][index] for name in VALUE_NAMES}, index)
+        for name, value in columns.items():
+            if name not in self.legs:
+                raise ValueError(f"Unknown leg column '{name}'.")
+            self.legs[name][index] = value
+
+        new_values = self._evaluate(index)
+        for name in VALUE_NAMES:
+            self.values[name][index] = new_values[name]
+        new = self._position_totals(new_values, index)
+        for name in self.totals:
+            self.totals[name] += new[name] - old[name]
+
+    def update_market(self, S=None, vol=None, r=None, legs=None):
+        """
+        Applies new market inputs; only the affected legs are repriced
+        unless the risk free rate, which every leg shares, changes
+        :param S: new underlying price
+        :param vol: new volatility
+        :param r: new Risk Free Rate
+        :param legs: legs on the underlying that moved (index or mask);
+        default is every leg
+        """
+        columns = {name: value for name, value in (("S", S), ("vol", vol))
+                   if value is not None}
+        if r is not None and r != self.r:
+            self.r = r
+            for name, value in columns.items():
+                self.legs[name][slice(None) if legs is None else legs] = value
+            self.reprice()
+        elif columns:
+            self.update_legs(np.arange(len(self)) if legs is None else legs,
+                             **columns)
+
+    def pnl_surface(self, spot_moves, vol_moves):
+        """
+        Calculates the book PnL with every leg's underlying price moved by
+        each of spot_moves and its volatility by each of vol_moves; legs are
+        priced in blocks so memory stays bounded for large books. Moved
+        volatilities are floored at MIN_VOL, as in the stress grid
+        :param spot_moves: 1-D array of relative spot moves (0.1 is +10%)
+        :param vol_moves: 1-D array of absolute volatility moves
+        :return: numpy.ndarray PnL surface of shape
+        (len(spot_moves), len(vol_moves))
+        """
+        spot_moves = np.asarray(spot_moves, dtype=np.float64)[:, None, None]
+        vol_moves = np.asarray(vol_moves, dtype=np.float64)[None, :, None]
+        surface = np.zeros((spot_moves.shape[0], vol_moves.shape[1]))
+        block = max(1, SURFACE_BLOCK_SIZE // surface.size)
+        legs = self.legs
+
+        for start in range(0, len(self), block):
+            index = slice(start, start + block)
+            vols = np.maximum(legs["vol"][index] + vol_moves, MIN_VOL)
+            prices = batch_pricer.black_scholes_price(
+                legs["S"][index] * (1 + spot_moves), legs["K"][index],
+                legs["T"][index], self.r, vols, legs["is_call"][index])
+            surface += (prices - legs["cost_basis"][index]) @ \
+                legs["quantity"][index]
+        return surface
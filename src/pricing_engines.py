@@ -0,0 +1,320 @@
+"""
+File: pricing_engines.py
+Description: Pluggable pricing engines sharing one vectorized interface,
+engine.price(S, K, T, r, vol, option_type), that option.Option and the
+surfaces can target
+    - BlackScholesEngine: the closed form of batch_pricer (European only)
+    - BinomialEngine: Cox-Ross-Rubinstein tree with European or American
+      exercise, evaluated for a whole block of contracts at once with
+      in-place backward induction (memory linear in the number of steps)
+    - MonteCarloEngine: geometric Brownian motion paths for vanilla and
+      arithmetic-average (Asian) payoffs, with antithetic and control
+      variates, chunked path generation and an optional process pool
+Created by: Renesh Ravi
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+if __package__:
+    from . import batch_pricer
+else:
+    import batch_pricer
+
+EXERCISE_STYLES = ("european", "american")
+PAYOFFS = ("vanilla", "asian")
+NODE_BLOCK = 2_000_000  # tree nodes (contracts x steps) evaluated at once
+PATH_BLOCK = 4_000_000  # path points (contracts x paths x steps) at once
+ASIAN_STEPS = 52  # default monitoring dates of an Asian payoff
+
+
+def _flat_contracts(S, K, T, r, vol, option_type):
+    """
+    Broadcasts the contract inputs against each other and flattens them;
+    a vol surface is looked up at the strikes and expiries first
+    :return: tuple (shape, S, K, T, r, vol, sign) with 1-D float arrays and
+    sign +1.0 for calls, -1.0 for puts
+    """
+    if callable(vol):  # e.g. a vol_surface.VolSurface
+        vol = vol(K, T)
+    *inputs, sign = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (S, K, T, r, vol)),
+        batch_pricer.option_sign(option_type))
+    return (sign.shape, *(np.ascontiguousarray(x).reshape(-1)
+                          for x in (*inputs, sign)))
+
+
+def _intrinsic(S, K, sign):
+    """
+    :return: numpy.ndarray of the exercise values of the contracts
+    """
+    return np.maximum(sign * (S - K), 0.0)
+
+
+class PricingEngine:
+    """
+    Interface of the pricing engines. Subclasses implement _price_flat on
+    flat arrays of contracts; price handles broadcasting and vol surfaces
+    """
+    def price(self, S, K, T, r, vol, option_type="call"):
+        """
+        Prices arrays of contracts
+        :param S: array of underlying prices
+        :param K: array of strike prices
+        :param T: array of times to maturity (in years)
+        :param r: array of risk free rates (annualized)
+        :param vol: array of volatilities (annualized), or a
+        vol_surface.VolSurface
+        :param option_type: 'call', 'put', an array of them per contract,
+        or a boolean array that is True for calls
+        :return: numpy.ndarray of prices with the broadcast shape of the
+        inputs
+        """
+        shape, *contracts = _flat_contracts(S, K, T, r, vol, option_type)
+        return self._price_flat(*contracts).reshape(shape)
+
+    def _price_flat(self, S, K, T, r, vol, sign):
+        raise NotImplementedError
+
+    def __repr__(self):
+        settings = ", ".join(f"{name}={value!r}" for name, value in
+                             vars(self).items())
+        return f"{type(self).__name__}({settings})"
+
+
+class BlackScholesEngine(PricingEngine):
+    """
+    Closed-form European prices from batch_pricer
+    """
+    def _price_flat(self, S, K, T, r, vol, sign):
+        return batch_pricer.black_scholes_price(S, K, T, r, vol, sign > 0)
+
+
+class BinomialEngine(PricingEngine):
+    def __init__(self, steps=500, exercise="european"):
+        """
+        Initializes the BinomialEngine
+        :param steps: number of time steps of the tree
+        :param exercise: 'european' or 'american'
+        """
+        if exercise not in EXERCISE_STYLES:
+            raise ValueError("Invalid exercise style. Choose 'european' or "
+                             "'american'.")
+        if steps < 1:
+            raise ValueError("Invalid number of steps. Choose at least 1.")
+        self.steps = int(steps)
+        self.exercise = exercise
+
+    def _price_flat(self, S, K, T, r, vol, sign):
+        prices = _intrinsic(S, K, sign)  # the value of expired contracts
+        live = np.flatnonzero(T > 0)
+        self._check_probabilities(T[live], r[live], vol[live])
+        block = max(1, NODE_BLOCK // (self.steps + 1))
+        for start in range(0, live.size, block):
+            index = live[start:start + block]
+            prices[index] = self._backward_induction(
+                S[index], K[index], T[index], r[index], vol[index],
+                sign[index])
+        return prices
+
+    def _check_probabilities(self, T, r, vol):
+        """
+        Checks that every tree has an up probability
+        (exp(r * dt) - 1 / up) / (up - 1 / up) within [0, 1], which holds
+        when |r| * sqrt(dt) <= vol; otherwise the tree prices are wrong,
+        even negative
+        :param T, r, vol: arrays of the contracts that have not expired
+        """
+        if np.any(vol <= 0):
+            raise ValueError("Invalid volatility. The binomial tree needs "
+                             "volatilities above 0.")
+        dt = T / self.steps
+        if np.any(np.abs(r) * np.sqrt(dt) > vol):
+            # dt = T / steps must be at most (vol / r)**2
+            steps = int(np.ceil(np.max(T * (r / vol) ** 2)))
+            raise ValueError(f"Invalid number of steps. The up probability "
+                             f"of the binomial tree is outside [0, 1]; "
+                             f"choose at least {steps} steps.")
+
+    def _backward_induction(self, S, K, T, r, vol, sign):
+        """
+        Rolls a block of trees back from maturity; every contract's row of
+        node values is overwritten in place, one step at a time
+        :return: numpy.ndarray of the prices of the block
+        """
+        steps = self.steps
+        dt = T / steps
+        log_up = vol * np.sqrt(dt)
+        up = np.exp(log_up)
+        p_up = (np.exp(r * dt) - 1 / up) / (up - 1 / up)
+        discount = np.exp(-r * dt)
+        weight_up = (discount * p_up)[:, None]
+        weight_down = (discount * (1 - p_up))[:, None]
+        K, sign = K[:, None], sign[:, None]
+
+        # node i of step j is at S * up**(2i - j)
+        spots = S[:, None] * np.exp(
+            log_up[:, None] * (2 * np.arange(steps + 1) - steps))
+        values = _intrinsic(spots, K, sign)
+        scratch = np.empty_like(values)
+        american = self.exercise == "american"
+        for j in range(steps - 1, -1, -1):
+            node_values, node_scratch = values[:, :j + 1], scratch[:, :j + 1]
+            np.multiply(values[:, 1:j + 2], weight_up, out=node_scratch)
+            node_values *= weight_down
+            node_values += node_scratch
+            if american:
+                node_spots = spots[:, :j + 1]
+                node_spots *= up[:, None]
+                np.subtract(node_spots, K, out=node_scratch)
+                node_scratch *= sign
+                np.maximum(node_values, node_scratch, out=node_values)
+        return values[:, 0].copy()
+
+
+def _simulate(S, K, T, r, vol, sign, paths, steps, payoff, antithetic,
+              seed):
+    """
+    Simulates one chunk of paths for every contract; all contracts use the
+    same normal draws
+    :param paths: number of paths (pairs of paths when antithetic)
+    :param seed: numpy.random.SeedSequence of the chunk
+    :return: numpy.ndarray of shape (5, contracts) with the sums of Y, Y**2,
+    X, X**2 and X * Y over the samples, where Y is the discounted payoff
+    and X the discounted terminal spot (the control variate, whose mean is
+    S)
+    """
+    normals = np.random.default_rng(seed).standard_normal((paths, steps))
+    # Brownian motion at each monitoring date of a unit-length horizon
+    brownian = np.cumsum(normals, axis=1) * np.sqrt(1.0 / steps)
+    times = np.arange(1, steps + 1) / steps
+    sums = np.empty((5, S.size))
+    block = max(1, PATH_BLOCK // (paths * steps))
+    for start in range(0, S.size, block):
+        contracts = slice(start, start + block)
+        shape = (-1, 1, 1)
+        s, k, t, rate, v, sgn = (x[contracts].reshape(shape) for x in
+                                 (S, K, T, r, vol, sign))
+        drift = (rate - 0.5 * v ** 2) * t * times
+        scale = v * np.sqrt(t)
+        discount = np.exp(-rate * t)[:, :, 0]
+        samples = []
+        for direction in ((1.0, -1.0) if antithetic else (1.0,)):
+            spots = s * np.exp(drift + direction * scale * brownian)
+            fixing = spots[:, :, -1] if payoff == "vanilla" \
+                else spots.mean(axis=2)
+            samples.append((discount * _intrinsic(fixing, k[:, :, 0],
+                                                  sgn[:, :, 0]),
+                            discount * spots[:, :, -1]))
+        y = sum(sample[0] for sample in samples) / len(samples)
+        x = sum(sample[1] for sample in samples) / len(samples)
+        sums[:, contracts] = (y.sum(axis=1), (y * y).sum(axis=1),
+                              x.sum(axis=1), (x * x).sum(axis=1),
+                              (x * y).sum(axis=1))
+    return sums
+
+
+class MonteCarloEngine(PricingEngine):
+    def __init__(self, num_paths=100_000, payoff="vanilla", steps=None,
+                 antithetic=True, control_variate=True, seed=None,
+                 chunk_paths=16_384, max_workers=1):
+        """
+        Initializes the MonteCarloEngine
+        :param num_paths: number of simulated paths (antithetic pairs count
+        as two)
+        :param payoff: 'vanilla' (European exercise on the terminal spot)
+        or 'asian' (European exercise on the average spot over the
+        monitoring dates)
+        :param steps: monitoring dates per path; default is 1 for vanilla
+        payoffs (exact for lognormal spots) and ASIAN_STEPS for Asian ones
+        :param antithetic: pair every path with its mirror image
+        :param control_variate: correct the estimate with the discounted
+        terminal spot, whose expectation is known
+        :param seed: seed of the random numbers; the same seed gives the
+        same prices for any max_workers
+        :param chunk_paths: paths generated at once (one task of the pool)
+        :param max_workers: number of worker processes; 1 runs in this
+        process
+        """
+        if payoff not in PAYOFFS:
+            raise ValueError("Invalid payoff. Choose 'vanilla' or 'asian'.")
+        if num_paths < 2 or chunk_paths < 2:
+            raise ValueError("Invalid number of paths. Choose at least 2.")
+        self.num_paths = int(num_paths)
+        self.payoff = payoff
+        self.steps = int(steps or (1 if payoff == "vanilla"
+                                   else ASIAN_STEPS))
+        self.antithetic = antithetic
+        self.control_variate = control_variate
+        self.seed = seed
+        self.chunk_paths = int(chunk_paths)
+        self.max_workers = max_workers
+
+    def _price_flat(self, S, K, T, r, vol, sign):
+        return self._estimate(S, K, T, r, vol, sign)[0]
+
+    def price_and_error(self, S, K, T, r, vol, option_type="call"):
+        """
+        Prices arrays of contracts along with the standard error of each
+        estimate
+        :param S, K, T, r, vol, option_type: see PricingEngine.price
+        :return: tuple of numpy.ndarray (prices, standard errors)
+        """
+        shape, *contracts = _flat_contracts(S, K, T, r, vol, option_type)
+        prices, errors = self._estimate(*contracts)
+        return prices.reshape(shape), errors.reshape(shape)
+
+    def _estimate(self, S, K, T, r, vol, sign):
+        """
+        Simulates all paths in chunks and combines their sums; contracts
+        past expiry (T <= 0) are worth their intrinsic value, as in the
+        binomial tree
+        :return: tuple of numpy.ndarray (prices, standard errors)
+        """
+        # a path of zero length ends where it starts, at the intrinsic value
+        T = np.maximum(T, 0.0)
+        per_sample = 2 if self.antithetic else 1
+        chunks = [min(self.chunk_paths, self.num_paths - start) // per_sample
+                  for start in range(0, self.num_paths, self.chunk_paths)]
+        chunks = [paths for paths in chunks if paths]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(chunks))
+        tasks = [(S, K, T, r, vol, sign, paths, self.steps, self.payoff,
+                  self.antithetic, seed)
+                 for paths, seed in zip(chunks, seeds)]
+        if self.max_workers == 1:
+            sums = sum(_simulate(*task) for task in tasks)
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                sums = sum(pool.map(_simulate, *zip(*tasks)))
+
+        samples = sum(chunks)
+        mean_y, mean_y2, mean_x, mean_x2, mean_xy = sums / samples
+        var_y = mean_y2 - mean_y ** 2
+        prices = mean_y
+        if self.control_variate:
+            var_x = mean_x2 - mean_x ** 2
+            cov_xy = mean_xy - mean_x * mean_y
+            with np.errstate(divide="ignore", invalid="ignore"):
+                beta = np.where(var_x > 0, cov_xy / var_x, 0.0)
+            prices = mean_y - beta * (mean_x - S)
+            var_y = var_y - beta * cov_xy
+        errors = np.sqrt(np.maximum(var_y, 0.0) * samples
+                         / max(samples - 1, 1) / samples)
+        return prices, errors
+
+
+ENGINES = {"black_scholes": BlackScholesEngine, "binomial": BinomialEngine,
+           "monte_carlo": MonteCarloEngine}
+
+
+def make_engine(name, **settings):
+    """
+    Creates a pricing engine by name
+    :param name: one of the keys of ENGINES
+    :param settings: keyword arguments of the engine
+    :return: PricingEngine object
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Invalid pricing engine. Choose one of "
+                         f"{', '.join(ENGINES)}.")
+    return ENGINES[name](**settings)
@@ -0,0 +1,287 @@
+"""
+File: pricing_service.py
+Description: Local asyncio pricing service for other systems
+    - Speaks newline-delimited JSON over TCP: one contract per request
+      line, one price and greeks reply line carrying the same id, and any
+      number of requests in flight per connection. Values that are not
+      finite (e.g. the greeks at expiry) are sent as null, so replies are
+      strict JSON
+    - Coalesces concurrent requests into micro-batches, closed after
+      max_batch_size contracts or max_wait_ms, whichever comes first, and
+      prices each batch in one vectorized evaluation
+Usage:
+    python src/pricing_service.py --port 8765 --max-wait-ms 2
+    echo '{"id": 1, "S": 100, "K": 100, "T": 1, "r": 0.05, "vol": 0.2,
+           "option_type": "call"}' | nc localhost 8765
+Created by: Renesh Ravi
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+
+import numpy as np
+
+if __package__:
+    from . import batch_pricer
+else:
+    import batch_pricer
+
+DEFAULT_PORT = 8765
+DEFAULT_RATE = 0.05
+MAX_BATCH_SIZE = 256
+MAX_WAIT_MS = 2.0
+
+
+def parse_contract(request):
+    """
+    Reads the contract of a request
+    :param request: dictionary with S, K, T, vol and optionally r (default
+    DEFAULT_RATE) and option_type (default 'call')
+    :return: tuple (S, K, T, r, vol, is_call)
+    """
+    option_type = str(request.get("option_type", "call")).lower()
+    if option_type not in ("call", "put"):
+        raise ValueError("Invalid option type. Choose 'call' or 'put'.")
+    return (float(request["S"]), float(request["K"]), float(request["T"]),
+            float(request.get("r", DEFAULT_RATE)), float(request["vol"]),
+            option_type == "call")
+
+
+def _finite_or_none(value):
+    """
+    :return: float value, or None (JSON null) for NaN and infinities
+    """
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+class MicroBatcher:
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        """
+        Collects contracts priced concurrently into batches
+        :param max_batch_size: largest number of contracts in a batch
+        :param max_wait_ms: longest time a batch stays open after its first
+        contract arrives; lower values cut latency, higher values give
+        larger batches and more throughput
+        """
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.contracts = 0
+        self._queue = asyncio.Queue()
+
+    async def price(self, contract):
+        """
+        Prices one contract as part of the next batch
+        :param contract: tuple from parse_contract
+        :return: dictionary with 'Price' and the option greeks
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((contract, future))
+        return await future
+
+    async def _next_batch(self):
+        """
+        Waits for a contract, then keeps the batch open until it is full or
+        max_wait has passed
+        :return: list of (contract, future) pairs
+        """
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(),
+                                                    timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _evaluate(self, batch):
+        """
+        Prices a batch in one vectorized pass and answers every caller
+        :param batch: list of (contract, future) pairs
+        """
+        S, K, T, r, vol, is_call = np.array([contract for contract, _ in
+                                             batch]).T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = batch_pricer.price_and_greeks(S, K, T, r, vol,
+                                                   is_call.astype(bool))
+        for i, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result({name: _finite_or_none(column[i])
+                                   for name, column in values.items()})
+        self.batches += 1
+        self.contracts += len(batch)
+
+    async def run(self):
+        """
+        Prices batches until cancelled
+        """
+        while True:
+            self._evaluate(await self._next_batch())
+
+
+class PricingService:
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        """
+        Initializes the PricingService
+        :param max_batch_size: see MicroBatcher
+        :param max_wait_ms: see MicroBatcher
+        """
+        self.batcher = MicroBatcher(max_batch_size, max_wait_ms)
+        self._tasks = set()
+        self._batch_task = None
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """
+        Starts listening and batching
+        :param host: interface to listen on
+        :param port: TCP port; 0 picks a free one
+        :return: (host, port) the service listens on
+        """
+        self._batch_task = asyncio.create_task(self.batcher.run())
+        self.server = await asyncio.start_server(self._handle_connection,
+                                                 host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        """
+        Stops listening and batching
+        """
+        self.server.close()
+        await self.server.wait_closed()
+        self._batch_task.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+
+    async def _handle_connection(self, reader, writer):
+        pending = set()
+        try:
+            while line := await reader.readline():
+                # answered concurrently so that requests pipelined on one
+                # connection share batches
+                task = asyncio.create_task(self._respond(line, writer))
+                for tasks in (self._tasks, pending):
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            # the client may half-close after its last request, which still
+            # gets its reply
+            await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def _respond(self, line, writer):
+        """
+        Prices one request line and writes its reply line
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            reply = await self.batcher.price(parse_contract(request))
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            reply = {"error": f"Invalid request: {e}"}
+        reply["id"] = request_id
+        if writer.is_closing():
+            return
+        try:
+            line = json.dumps(reply, allow_nan=False)
+        except ValueError:  # e.g. a NaN id, which strict JSON can't carry
+            line = json.dumps({"error": "Invalid request: id must be "
+                                        "valid JSON", "id": None})
+        writer.write(line.encode() + b"\n")
+        try:
+            # waits while the client is slow to read the replies
+            await writer.drain()
+        except ConnectionError:
+            pass  # the client went away; its connection is closing
+
+
+class PricingClient:
+    def __init__(self, reader, writer):
+        """
+        Client of a PricingService connection that can have many requests
+        in flight; use PricingClient.connect to create one
+        """
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._pending = {}
+        self._reply_task = asyncio.create_task(self._read_replies())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=DEFAULT_PORT):
+        """
+        :return: PricingClient connected to the service at host:port
+        """
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def _read_replies(self):
+        while line := await self._reader.readline():
+            reply = json.loads(line)
+            future = self._pending.pop(reply.pop("id"), None)
+            if future is not None and not future.done():
+                future.set_result(reply)
+        for future in self._pending.values():
+            future.set_exception(ConnectionError("Connection closed"))
+
+    async def price(self, S, K, T, r, vol, option_type="call"):
+        """
+        Prices one contract through the service
+        :return: dictionary with 'Price' and the option greeks
+        """
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._writer.write(json.dumps({
+            "id": request_id, "S": S, "K": K, "T": T, "r": r, "vol": vol,
+            "option_type": option_type}).encode() + b"\n")
+        reply = await future
+        if "error" in reply:
+            raise ValueError(reply["error"])
+        return reply
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._reply_task.cancel()
+
+
+async def serve(host, port, max_batch_size, max_wait_ms):
+    service = PricingService(max_batch_size, max_wait_ms)
+    host, port = await service.start(host, port)
+    print(f"Pricing service listening on {host}:{port}")
+    await service.server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve option prices and greeks over newline-delimited "
+                    "JSON, batching concurrent requests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE,
+                        help="largest number of contracts priced together")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="longest time a batch waits for more contracts")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch_size,
+                          args.max_wait_ms))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
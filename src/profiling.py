@@ -0,0 +1,260 @@
+"""
+File: profiling.py
+Description: Lightweight instrumentation of the app's pipeline stages
+    - Timing context managers (stage) and decorators (timed) plus named
+      counters, recorded by the current Profiler: a process-wide default,
+      or one set for the running thread or task (e.g. per app session)
+    - Disabled by default: a disabled stage is a single attribute check
+      returning a shared no-op context, so the hooks can stay in place
+    - Per-run summaries, and exports as JSON or Chrome trace events (open
+      in chrome://tracing or https://ui.perfetto.dev)
+    - Enable with the app's profiling panel or the profiling=1
+      environment variable
+Created by: Renesh Ravi
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+
+PROFILE_FORMATS = ("json", "chrome")
+FILE_EXTENSIONS = {"json": "json", "chrome": "trace.json"}
+ENABLED_BY_ENV = os.getenv("profiling", "").lower() in ("1", "true")
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "args", "start")
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = self.profiler.timer()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler._record(self.name, self.start, self.profiler.timer(),
+                              self.args)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    def __init__(self, enabled=False, timer=time.perf_counter_ns):
+        """
+        Initializes the Profiler
+        :param enabled: whether stages and counters are recorded
+        :param timer: clock returning integer nanoseconds
+        """
+        self.enabled = enabled
+        self.timer = timer
+        self._lock = threading.Lock()
+        self.start_run()
+
+    def start_run(self):
+        """
+        Drops everything recorded so far; timestamps of the exports are
+        relative to this call
+        """
+        with self._lock:
+            self.origin = self.timer()
+            self.events = []
+            self.counters = {}
+            self._counter_events = []
+            self._threads = {}
+
+    def stage(self, name, **args):
+        """
+        Times a block of code:
+            with profiler.stage("surface.price", points=n): ...
+        :param name: name of the stage; nested stages show nested in traces
+        :param args: extra values stored with the timing
+        :return: context manager
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, args)
+
+    def count(self, name, n=1):
+        """
+        Adds to a named counter
+        :param name: name of the counter
+        :param n: amount added
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            total = self.counters.get(name, 0) + n
+            self.counters[name] = total
+            self._counter_events.append((name, self.timer(), total))
+
+    def _record(self, name, start, end, args):
+        thread = threading.current_thread()
+        with self._lock:
+            self._threads[thread.ident] = thread.name
+            self.events.append((name, start, end - start, thread.ident,
+                                args))
+
+    def summary(self):
+        """
+        :return: dictionary of stage name to a dictionary of its Calls,
+        Total ms, Mean ms and Max ms, in order of first call
+        """
+        stages = {}
+        for name, _, duration, _, _ in self.events:
+            stats = stages.setdefault(name, {"Calls": 0, "Total ms": 0.0,
+                                             "Max ms": 0.0})
+            stats["Calls"] += 1
+            stats["Total ms"] += duration / 1e6
+            stats["Max ms"] = max(stats["Max ms"], duration / 1e6)
+        for stats in stages.values():
+            stats["Mean ms"] = stats["Total ms"] / stats["Calls"]
+        return stages
+
+    def to_json(self):
+        """
+        :return: JSON string with the summary, the counters and every
+        recorded stage (start and duration in milliseconds)
+        """
+        return json.dumps({
+            "stages": self.summary(),
+            "counters": self.counters,
+            "events": [{"name": name,
+                        "start_ms": (start - self.origin) / 1e6,
+                        "duration_ms": duration / 1e6,
+                        "thread": self._threads.get(tid, str(tid)),
+                        "args": args}
+                       for name, start, duration, tid, args in self.events]},
+            indent=2, default=str)
+
+    def to_chrome_trace(self):
+        """
+        :return: JSON string in the Chrome trace event format: one complete
+        ("X") event per stage and one counter ("C") event per count
+        """
+        pid = os.getpid()
+        trace = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                  "args": {"name": thread_name}}
+                 for tid, thread_name in self._threads.items()]
+        trace += [{"name": name, "cat": name.split(".")[0], "ph": "X",
+                   "ts": (start - self.origin) / 1e3, "dur": duration / 1e3,
+                   "pid": pid, "tid": tid, "args": args}
+                  for name, start, duration, tid, args in self.events]
+        trace += [{"name": name, "ph": "C", "ts": (ts - self.origin) / 1e3,
+                   "pid": pid, "args": {name: total}}
+                  for name, ts, total in self._counter_events]
+        return json.dumps({"traceEvents": trace, "displayTimeUnit": "ms"},
+                          default=str)
+
+    def export(self, fmt="json"):
+        """
+        :param fmt: one of PROFILE_FORMATS
+        :return: string of the recorded run in that format
+        """
+        if fmt not in PROFILE_FORMATS:
+            raise ValueError(f"Invalid profile format. Choose one of "
+                             f"{', '.join(PROFILE_FORMATS)}.")
+        return self.to_json() if fmt == "json" else self.to_chrome_trace()
+
+
+_profiler = Profiler(enabled=ENABLED_BY_ENV)
+# new threads start from the default, so a Profiler set by one app session's
+# script thread never sees the stages of another session
+_current = contextvars.ContextVar("profiler", default=_profiler)
+
+
+def get_profiler():
+    """
+    Gets the Profiler the pipeline stages of the running thread or task
+    report to
+    :return: Profiler object
+    """
+    return _current.get()
+
+
+def set_profiler(profiler):
+    """
+    Makes the pipeline stages of the running thread or task (and the tasks
+    it starts) report to profiler instead of the process-wide default
+    :param profiler: Profiler object
+    :return: contextvars.Token to restore the previous Profiler with
+    reset_profiler
+    """
+    return _current.set(profiler)
+
+
+def reset_profiler(token):
+    """
+    Restores the Profiler that was current before set_profiler
+    :param token: return value of set_profiler
+    """
+    _current.reset(token)
+
+
+@contextlib.contextmanager
+def use_profiler(profiler):
+    """
+    Context manager reporting the stages of a block to profiler
+    :param profiler: Profiler object
+    """
+    token = set_profiler(profiler)
+    try:
+        yield profiler
+    finally:
+        reset_profiler(token)
+
+
+def stage(name, **args):
+    """
+    Times a block of code on the current Profiler (see Profiler.stage)
+    :return: context manager
+    """
+    profiler = _current.get()
+    if not profiler.enabled:
+        return _NULL_STAGE
+    return _Stage(profiler, name, args)
+
+
+def count(name, n=1):
+    """
+    Adds to a named counter of the current Profiler
+    """
+    profiler = _current.get()
+    if profiler.enabled:
+        profiler.count(name, n)
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function as a stage of the current
+    Profiler
+    :param name: name of the stage
+    :return: decorator
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _current.get()
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with _Stage(profiler, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
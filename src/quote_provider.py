@@ -0,0 +1,163 @@
+"""
+File: quote_provider.py
+Description: Spot price provider for the live data path of the app
+    - LRU + TTL cache of the latest price per ticker
+    - Batched multi-ticker fetches
+    - Pluggable backends: Yahoo Finance, a local CSV file or a fixed
+      dictionary of prices (e.g. for tests)
+Created by: Renesh Ravi
+"""
+import threading
+import time
+
+import pandas as pd
+from cachetools import TTLCache
+
+if __package__:
+    from . import profiling
+else:
+    import profiling
+
+DEFAULT_MAXSIZE = 256
+DEFAULT_TTL = 60  # seconds
+
+
+class YahooQuoteBackend:
+    def __init__(self, period="1d"):
+        """
+        Initializes the YahooQuoteBackend
+        :param period: history period requested from Yahoo Finance
+        """
+        self.period = period
+
+    def fetch(self, tickers):
+        """
+        Pulls the latest closing price of every ticker in one download
+        :param tickers: list of ticker symbols
+        :return: dictionary of ticker to price, leaving out tickers that
+        have no price data
+        """
+        import yfinance as yf  # only needed when live data is used
+
+        closes = yf.download(list(tickers), period=self.period,
+                             progress=False, auto_adjust=True)['Close']
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(tickers[0])
+
+        prices = {}
+        for ticker in tickers:
+            if ticker in closes:
+                history = closes[ticker].dropna()
+                if len(history):
+                    prices[ticker] = float(history.iloc[-1])
+        return prices
+
+
+class CsvQuoteBackend:
+    def __init__(self, path):
+        """
+        Initializes the CsvQuoteBackend
+        :param path: CSV file with 'ticker' and 'price' columns
+        """
+        self.path = path
+
+    def fetch(self, tickers):
+        """
+        Reads the prices of the requested tickers from the CSV file
+        :param tickers: list of ticker symbols
+        :return: dictionary of ticker to price for the tickers in the file
+        """
+        quotes = pd.read_csv(self.path).set_index('ticker')['price']
+        return {ticker: float(quotes[ticker]) for ticker in tickers
+                if ticker in quotes.index}
+
+
+class StaticQuoteBackend:
+    def __init__(self, prices):
+        """
+        Initializes the StaticQuoteBackend
+        :param prices: dictionary of ticker to price
+        """
+        self.prices = dict(prices)
+
+    def fetch(self, tickers):
+        """
+        :param tickers: list of ticker symbols
+        :return: dictionary of ticker to price for the known tickers
+        """
+        return {ticker: self.prices[ticker] for ticker in tickers
+                if ticker in self.prices}
+
+
+class QuoteProvider:
+    def __init__(self, backend=None, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL,
+                 timer=time.monotonic):
+        """
+        Initializes the QuoteProvider
+        :param backend: object with a fetch(tickers) method returning
+        {ticker: price}; defaults to Yahoo Finance
+        :param maxsize: maximum number of tickers kept in the cache, least
+        recently used ones are evicted first
+        :param ttl: seconds a cached price stays valid
+        :param timer: clock used for the TTL
+        """
+        self.backend = backend if backend is not None else YahooQuoteBackend()
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+        self._lock = threading.Lock()
+
+    def get_prices(self, tickers):
+        """
+        Gets the latest price of several tickers, fetching all the ones
+        missing from the cache in a single backend call
+        :param tickers: list of ticker symbols
+        :return: dictionary of ticker to price
+        """
+        tickers = [ticker.upper() for ticker in tickers]
+        with self._lock:
+            prices = {ticker: self._cache[ticker] for ticker in tickers
+                      if ticker in self._cache}
+        missing = [ticker for ticker in dict.fromkeys(tickers)
+                   if ticker not in prices]
+        profiling.count("quotes.cache_hits", len(tickers) - len(missing))
+        if missing:
+            profiling.count("quotes.cache_misses", len(missing))
+            with profiling.stage("quotes.fetch", tickers=len(missing)):
+                fetched = self.backend.fetch(missing)
+            with self._lock:
+                self._cache.update(fetched)
+            prices.update(fetched)
+
+        unavailable = [ticker for ticker in tickers if ticker not in prices]
+        if unavailable:
+            raise LookupError(f"No price data available for ticker(s) "
+                              f"{', '.join(unavailable)}")
+        return {ticker: prices[ticker] for ticker in tickers}
+
+    def get_price(self, ticker):
+        """
+        Gets the latest price of a ticker
+        :param ticker: ticker symbol
+        :return: float value of the price
+        """
+        return self.get_prices([ticker])[ticker.upper()]
+
+    def clear(self):
+        """
+        Empties the cache
+        """
+        with self._lock:
+            self._cache.clear()
+
+
+_quote_provider = None
+
+
+def get_quote_provider():
+    """
+    Gets the shared QuoteProvider backed by Yahoo Finance
+    :return: QuoteProvider object
+    """
+    global _quote_provider
+    if _quote_provider is None:
+        _quote_provider = QuoteProvider()
+    return _quote_provider
@@ -0,0 +1,293 @@
+"""
+File: result_store.py
+Description: On-disk store of large result cubes (surfaces, scenario
+grids) as memory-mapped .npy files
+    - Each result is keyed by a hash of its name and inputs, so a cube that
+      was computed before (even by another process) is reopened instead of
+      recomputed, which only maps the file
+    - A small JSON index keeps the axes and a summary of the inputs of
+      every result
+    - Results are written incrementally through a writable memory map,
+      which worker processes can open by path, and read back as read-only
+      memory maps whose slices are zero-copy views
+    - Optional size limit, evicting the least recently opened results
+Created by: Renesh Ravi
+"""
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+INDEX_FILE = "index.json"
+DEFAULT_ROOT = os.path.join(tempfile.gettempdir(), "black_scholes_results")
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+def _hash_value(digest, value):
+    """
+    Feeds one input value into a hash; arrays are hashed by dtype, shape
+    and content
+    """
+    if isinstance(value, (list, tuple)):
+        digest.update(f"seq{len(value)}".encode())
+        for item in value:
+            _hash_value(digest, item)
+    elif isinstance(value, (str, bool)) or value is None:
+        digest.update(repr(value).encode())
+    else:
+        array = np.ascontiguousarray(value, dtype=np.float64
+                                     if isinstance(value, (int, float))
+                                     else None)
+        if array.dtype == object:
+            raise TypeError(f"Unsupported result input of type "
+                            f"{type(value).__name__}")
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.tobytes())
+
+
+def result_key(name, inputs):
+    """
+    Identifies a result by its name and everything it was computed from
+    :param name: kind of result, e.g. 'price_surfaces'
+    :param inputs: dictionary of input name to value (numbers, strings,
+    arrays, or lists of those)
+    :return: string key
+    """
+    digest = hashlib.sha256(name.encode())
+    for field in sorted(inputs):
+        digest.update(field.encode())
+        _hash_value(digest, inputs[field])
+    return f"{name}-{digest.hexdigest()[:24]}"
+
+
+def _describe(value):
+    """
+    :return: JSON-friendly summary of an input; arrays are described by
+    their shape and dtype only
+    """
+    if isinstance(value, (str, bool, int, float)) or value is None:
+        return value
+    array = np.asarray(value) if not isinstance(value, (list, tuple)) \
+        else None
+    if array is not None and array.ndim == 0 and array.dtype != object:
+        return array.item()
+    if array is not None:
+        return {"shape": list(array.shape), "dtype": array.dtype.str}
+    return [_describe(item) for item in value]
+
+
+class ResultStore:
+    def __init__(self, root=DEFAULT_ROOT, max_bytes=None):
+        """
+        Initializes the ResultStore in a directory, creating it if needed
+        :param root: directory of the result files and the index
+        :param max_bytes: total size of the results above which the least
+        recently opened ones are deleted; None keeps everything
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.index = self._read_index()
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.root, INDEX_FILE)) as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _update_index(self, update):
+        """
+        Applies a change to the index on disk (which other processes may
+        have changed too) and keeps the result in memory
+        :param update: function modifying the index dictionary in place
+        """
+        path = os.path.join(self.root, INDEX_FILE)
+        with self._lock:
+            index = self._read_index()
+            update(index)
+            # write then rename so readers never see a half written index
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as index_file:
+                json.dump(index, index_file)
+            os.replace(tmp_path, path)
+            self.index = index
+
+    def path(self, key):
+        """
+        :return: path of the .npy file of a result
+        """
+        return os.path.join(self.root, f"{key}.npy")
+
+    def info(self, key):
+        """
+        :return: dictionary of the metadata of a stored result (name,
+        shape, dtype, axes, inputs, size and creation time), or None
+        """
+        entry = self.index.get(key)
+        if entry is None:
+            # another process may have added it since the index was read
+            self.index = self._read_index()
+            entry = self.index.get(key)
+        if entry is None or not os.path.exists(self.path(key)):
+            return None
+        return entry
+
+    def __contains__(self, key):
+        return self.info(key) is not None
+
+    def open(self, key):
+        """
+        Maps a stored result read-only; slicing it does not copy
+        :param key: key of the result
+        :return: numpy.memmap with the stored shape
+        """
+        if self.info(key) is None:
+            raise KeyError(f"No stored result {key}")
+        # the modification time of the file tracks its last use for prune
+        os.utime(self.path(key))
+        return np.load(self.path(key), mmap_mode="r")
+
+    def axes(self, key):
+        """
+        :return: dictionary of axis name to numpy.ndarray of its values
+        """
+        return {name: np.asarray(values) for name, values in
+                self.info(key)["axes"].items()}
+
+    @contextlib.contextmanager
+    def writer(self, name, axes, inputs, dtype=np.float64):
+        """
+        Creates a result and yields a writable memory map of it (filled
+        with NaN for float dtypes). The values go to a separate file, unique
+        to this writer, that replaces any previous result (without
+        disturbing its readers) and is listed once the block exits without
+        an error; on an error it is removed. Worker processes can write
+        into it through open_for_write(array.filename)
+        :param name: kind of result
+        :param axes: dictionary of axis name to values, one per dimension
+        :param inputs: dictionary of the inputs the result depends on
+        :param dtype: numpy dtype of the values
+        :return: context manager yielding (key, numpy.memmap)
+        """
+        key = result_key(name, inputs)
+        shape = tuple(len(values) for values in axes.values())
+        path = self.path(key)
+        # concurrent writers of the same key (threads or processes) each
+        # get their own file; the last one to finish replaces the others
+        descriptor, partial_path = tempfile.mkstemp(
+            suffix=".partial", prefix=f"{key}.", dir=self.root)
+        os.close(descriptor)
+        array = np.lib.format.open_memmap(partial_path, mode="w+",
+                                          dtype=dtype, shape=shape)
+        if np.issubdtype(dtype, np.floating):
+            array[...] = np.nan
+        try:
+            yield key, array
+            array.flush()
+        except BaseException:
+            del array
+            os.remove(partial_path)
+            raise
+        del array
+        os.replace(partial_path, path)
+
+        entry = {"name": name, "shape": list(shape),
+                 "dtype": np.dtype(dtype).str,
+                 "axes": {axis: np.asarray(values).tolist()
+                          for axis, values in axes.items()},
+                 "inputs": {field: _describe(value)
+                            for field, value in inputs.items()},
+                 "bytes": os.path.getsize(path), "created_at": time.time()}
+        self._update_index(lambda index: index.update({key: entry}))
+        if self.max_bytes is not None:
+            self.prune(self.max_bytes, keep=key)
+
+    def get_or_compute(self, name, axes, inputs, compute, dtype=np.float64):
+        """
+        Opens a stored result, or computes and stores it first
+        :param name: kind of result
+        :param axes: dictionary of axis name to values, one per dimension
+        :param inputs: dictionary of the inputs the result depends on
+        :param compute: function filling the writable array it is given
+        (its return value is ignored)
+        :param dtype: numpy dtype of the values
+        :return: read-only numpy.memmap of the result
+        """
+        key = result_key(name, inputs)
+        if key in self:
+            return self.open(key)
+        with self.writer(name, axes, inputs, dtype) as (_, array):
+            compute(array)
+        return np.load(self.path(key), mmap_mode="r")
+
+    def delete(self, key):
+        """
+        Removes a result and its file
+        """
+        self._update_index(lambda index: index.pop(key, None))
+        # open memory maps of the file stay valid on POSIX systems
+        with contextlib.suppress(OSError):
+            os.remove(self.path(key))
+
+    def total_bytes(self):
+        """
+        :return: total size of the stored results in bytes
+        """
+        return sum(entry["bytes"] for entry in self.index.values())
+
+    def prune(self, max_bytes, keep=None):
+        """
+        Deletes the least recently opened results until the store is at
+        most max_bytes
+        :param max_bytes: size limit in bytes
+        :param keep: key that is never deleted (e.g. the newest result)
+        :return: list of the deleted keys
+        """
+        deleted = []
+        def last_used(key):
+            try:
+                return os.path.getmtime(self.path(key))
+            except OSError:
+                return 0.0
+
+        for key in sorted(self.index, key=last_used):
+            if self.total_bytes() <= max_bytes:
+                break
+            if key != keep:
+                self.delete(key)
+                deleted.append(key)
+        return deleted
+
+
+def open_for_write(path):
+    """
+    Maps the file of a result that is being written, e.g. from a worker
+    process given the filename of the array yielded by ResultStore.writer
+    :return: writable numpy.memmap
+    """
+    return np.load(path, mmap_mode="r+")
+
+
+_result_store = None
+
+
+def get_result_store():
+    """
+    Gets the shared ResultStore, configured from the optional
+    result_store_path and result_store_max_mb environment variables
+    :return: ResultStore object
+    """
+    global _result_store
+    if _result_store is None:
+        max_mb = os.getenv("result_store_max_mb")
+        _result_store = ResultStore(
+            os.getenv("result_store_path", DEFAULT_ROOT),
+            float(max_mb) * (1 << 20) if max_mb else DEFAULT_MAX_BYTES)
+    return _result_store
@@ -1,12 +1,40 @@
 """
 File: risk_free_rate_fetcher.py
 Description: Pulls risk-free rate from government bond data with secure key handling
+    - Fetches the whole treasury curve (3 month to 10 year) in one refresh
+    - Caches the curve on disk and in memory with a configurable TTL,
+      refreshing stale curves in the background
+    - Interpolates the rate for any time to maturity across the tenors
 Created by: Renesh Ravi
 """
-import requests
-from dotenv import load_dotenv
+import json
 import os
-import streamlit as st
+import tempfile
+import threading
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+if __package__:
+    from . import profiling
+else:
+    import profiling
+
+MATURITIES = {
+    0.25: "DGS3MO",
+    0.5: "DGS6MO",
+    1: "DGS1",
+    2: "DGS2",
+    5: "DGS5",
+    10: "DGS10"
+}
+FRED_URL = "https://api.stlouisfed.org/fred/series/observations"
+FRED_TIMEOUT = (3.05, 10)  # seconds to connect and to wait for a reply
+DEFAULT_TTL = 6 * 60 * 60  # seconds, treasury yields only update daily
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(),
+                                  "risk_free_rate_curve.json")
+
 
 def get_api_key():
     """
@@ -14,6 +42,7 @@ def get_api_key():
     """
     # First try to get from Streamlit secrets
     try:
+        import streamlit as st
         return st.secrets["api_keys"]["fred"]
     except:
         load_dotenv()
@@ -22,30 +51,222 @@ def get_api_key():
             raise ValueError("API key not found in environment variables or Streamlit secrets")
         return api_key
 
-def fetch_risk_free_rate(T):
+
+def fetch_rate_curve():
+    """
+    Pulls the latest observation of every treasury series in MATURITIES
+    from FRED in one bulk refresh
+    :return: dictionary of maturity (in years) to rate in decimal form
+    :raises TimeoutError: when FRED doesn't answer within FRED_TIMEOUT, so
+    a stale cached curve keeps being served instead of a hung refresh
+    """
+    import requests  # only needed when the curve is refreshed
+
+    api_key = get_api_key()
+    curve = {}
+    with profiling.stage("fred.fetch_curve"), requests.Session() as session:
+        for maturity, series_id in MATURITIES.items():
+            # only the most recent observations are needed, FRED marks
+            # missing days (e.g. holidays) with "."
+            profiling.count("fred.requests")
+            try:
+                response = session.get(FRED_URL, params={
+                    "series_id": series_id,
+                    "api_key": api_key,
+                    "file_type": "json",
+                    "sort_order": "desc",
+                    "limit": 10,
+                }, timeout=FRED_TIMEOUT)
+            except requests.Timeout as e:
+                raise TimeoutError(f"FRED did not answer for {series_id} "
+                                   f"within {FRED_TIMEOUT} seconds") from e
+            response.raise_for_status()
+            observations = response.json()['observations']
+            latest = next(obs['value'] for obs in observations
+                          if obs['value'] != ".")
+            curve[maturity] = float(latest) / 100  # Convert to decimal
+    return curve
+
+
+def curve_file_fetcher(path):
+    """
+    Creates a stand-in for fetch_rate_curve that reads a local JSON file of
+    {"maturity in years": rate in decimal form}, e.g. a test fixture
+    :param path: path of the JSON file
+    :return: function that returns the curve in the file
+    """
+    def fetch():
+        with open(path) as curve_file:
+            return {float(maturity): float(rate)
+                    for maturity, rate in json.load(curve_file).items()}
+    return fetch
+
+
+class CurveLoadingError(LookupError):
+    """
+    Raised by RateCurveCache.get_rate while the first curve is being fetched
+    """
+
+
+class RateCurveCache:
+    def __init__(self, fetch_curve=fetch_rate_curve,
+                 cache_path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL,
+                 cold_start_timeout=2.0):
+        """
+        Initializes the RateCurveCache, loading any curve already on disk
+        :param fetch_curve: function returning {maturity: rate}; defaults to
+        pulling the curve from FRED
+        :param cache_path: JSON file the curve is persisted to, or None to
+        keep it in memory only
+        :param ttl: seconds before a cached curve is refreshed
+        :param cold_start_timeout: seconds to wait for the first refresh
+        when there is no cached curve at all
+        """
+        self.fetch_curve = fetch_curve
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.cold_start_timeout = cold_start_timeout
+
+        self.maturities = None
+        self.rates = None
+        self.fetched_at = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+        self.load()
+
+    def load(self):
+        """
+        Loads the curve persisted at cache_path into memory, if there is one
+        """
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path) as cache_file:
+                cached = json.load(cache_file)
+            self._set_curve({float(maturity): rate for maturity, rate in
+                             cached['rates'].items()}, cached['fetched_at'])
+        except (OSError, ValueError, KeyError):
+            pass  # unreadable caches are simply refetched
+
+    def _set_curve(self, curve, fetched_at):
+        """
+        Stores a curve in memory, sorted by maturity for interpolation
+        :param curve: dictionary of maturity to rate
+        :param fetched_at: epoch seconds at which the curve was fetched
+        """
+        maturities = sorted(curve)
+        self.maturities = np.array(maturities, dtype=float)
+        self.rates = np.array([curve[m] for m in maturities], dtype=float)
+        self.fetched_at = fetched_at
+
+    def is_stale(self):
+        """
+        :return: True when there is no curve or it is older than the TTL
+        """
+        return self.fetched_at is None or \
+            time.time() - self.fetched_at > self.ttl
+
+    def refresh(self):
+        """
+        Fetches the full curve, then stores it in memory and on disk
+        """
+        with profiling.stage("risk_free_rate.refresh"):
+            curve = self.fetch_curve()
+        fetched_at = time.time()
+        self._set_curve(curve, fetched_at)
+        self.last_error = None
+        if self.cache_path:
+            # write then rename so readers never see a half written file;
+            # each writer (e.g. another app process) has its own temp file
+            descriptor, tmp_path = tempfile.mkstemp(
+                suffix=".tmp", prefix=f"{os.path.basename(self.cache_path)}.",
+                dir=os.path.dirname(os.path.abspath(self.cache_path)))
+            try:
+                with os.fdopen(descriptor, "w") as cache_file:
+                    json.dump({"fetched_at": fetched_at,
+                               "rates": {str(m): r
+                                         for m, r in curve.items()}},
+                              cache_file)
+                os.replace(tmp_path, self.cache_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+    def _refresh_in_background(self):
+        """
+        Runs refresh, keeping any error for get_rate to report
+        """
+        try:
+            self.refresh()
+        except Exception as e:
+            self.last_error = e
+
+    def refresh_async(self):
+        """
+        Starts a background refresh unless one is already running
+        :return: threading.Thread performing the refresh
+        """
+        with self._lock:
+            if self._refresh_thread is None or \
+                    not self._refresh_thread.is_alive():
+                self._refresh_thread = threading.Thread(
+                    target=self._refresh_in_background, daemon=True)
+                self._refresh_thread.start()
+            return self._refresh_thread
+
+    def get_rate(self, T, timeout=None):
+        """
+        Given a Time value T, interpolates the risk-free rate from the
+        cached curve (flat beyond the shortest and longest tenors). Stale
+        curves are still served while a refresh runs in the background
+        :param T: float value (or array) of time till expiry of the option
+        :param timeout: seconds to wait for the first refresh when there is
+        no cached curve at all; default is cold_start_timeout, and 0
+        returns at once (e.g. for the app, which must not block)
+        :return: float value of the risk-free rate in decimal form
+        :raises CurveLoadingError: when the first refresh is still running
+        """
+        if self.rates is None:
+            self.refresh_async().join(self.cold_start_timeout
+                                      if timeout is None else timeout)
+            if self.rates is None:
+                if self.last_error is not None:
+                    raise self.last_error
+                raise CurveLoadingError("Risk-free rate curve is still "
+                                        "loading")
+        elif self.is_stale():
+            self.refresh_async()
+        rate = np.interp(T, self.maturities, self.rates)
+        return float(rate) if np.ndim(rate) == 0 else rate
+
+
+_rate_curve_cache = None
+
+
+def get_rate_curve_cache():
+    """
+    Gets the shared RateCurveCache, configured from the optional
+    rfr_cache_ttl and rfr_cache_path environment variables
+    :return: RateCurveCache object
+    """
+    global _rate_curve_cache
+    if _rate_curve_cache is None:
+        load_dotenv()
+        _rate_curve_cache = RateCurveCache(
+            cache_path=os.getenv("rfr_cache_path", DEFAULT_CACHE_PATH),
+            ttl=float(os.getenv("rfr_cache_ttl", DEFAULT_TTL)))
+    return _rate_curve_cache
+
+
+def fetch_risk_free_rate(T, timeout=None):
     """
     Given a Time value T, pulls government bond rate for risk-free rate
     value to be used in black scholes model
     :param T: float value of time till expiry of the option
+    :param timeout: seconds to wait for a curve on a cold start (see
+    RateCurveCache.get_rate)
     :return: float value of the fetched risk-free rate in decimal form
     """
-    maturities = {
-        0.25: "DGS3MO",
-        0.5: "DGS6MO",
-        1: "DGS1",
-        2: "DGS2",
-        5: "DGS5",
-        10: "DGS10"
-    }
-
-    closest_maturity = min(maturities.keys(), key=lambda x: abs(x - T))
-    series_id = maturities[closest_maturity]
-
-    api_key = get_api_key()
-    url = f"https://api.stlouisfed.org/fred/series/observations?series_id={series_id}&api_key={api_key}&file_type=json"
-
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
-    latest_rate = float(data['observations'][-1]['value']) / 100  # Convert to decimal
-    return latest_rate
\ No newline at end of file
+    return get_rate_curve_cache().get_rate(T, timeout)
@@ -0,0 +1,234 @@
+"""
+File: scenario_engine.py
+Description: Stress grid engine that prices a whole book over a cube of
+spot x volatility x rate x time-decay shocks
+    - Splits the scenario cube into chunks run on a process pool
+    - Shares the book and shock arrays with the workers through shared
+      memory instead of pickling them
+    - Workers write book PnL straight into a preallocated shared output,
+      or into a memory-mapped result_store file so that a cube computed
+      before is reopened instead of recomputed
+    - Prices are evaluated by the fused kernels (compiled when numba is
+      installed); each pool worker runs them on a single thread, since
+      the pool already keeps every core busy
+Created by: Renesh Ravi
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+if __package__:
+    from . import kernels
+    from . import result_store
+    from .portfolio import MIN_VOL
+else:
+    import kernels
+    import result_store
+    from portfolio import MIN_VOL
+
+SHOCK_AXES = ("spot", "vol", "rate", "time")
+BLOCK_SIZE = 1_000_000  # (scenario, leg) pairs priced at once
+
+
+class SharedArrays:
+    def __init__(self, arrays):
+        """
+        Copies arrays into shared memory blocks that worker processes can
+        attach to by name
+        :param arrays: dictionary of name to numpy.ndarray
+        """
+        self._blocks = []
+        self.arrays = {}
+        self.spec = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True,
+                                               size=max(array.nbytes, 1))
+            shared = np.ndarray(array.shape, array.dtype, buffer=block.buf)
+            shared[...] = array
+            self._blocks.append(block)
+            self.arrays[name] = shared
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        """
+        Releases and removes the shared memory blocks
+        """
+        self.arrays = {}
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def attach_shared(spec):
+    """
+    Attaches to arrays created by SharedArrays in another process
+    :param spec: SharedArrays.spec of the arrays
+    :return: tuple (dictionary of name to numpy.ndarray, list of the
+    shared memory blocks, which must stay open while the arrays are used)
+    """
+    arrays, blocks = {}, []
+    for name, (block_name, shape, dtype) in spec.items():
+        # pool workers share their parent's resource tracker, so the block
+        # is still unlinked exactly once, by SharedArrays.close
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+    return arrays, blocks
+
+
+def leg_prices(S, K, T, r, vol, is_call):
+    """
+    Prices shocked legs; volatilities are floored at MIN_VOL and legs
+    decayed past expiry are worth their intrinsic value
+    :param S, K, T, r, vol: arrays of the shocked leg inputs
+    :param is_call: boolean array, True for calls
+    :return: numpy.ndarray of prices
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prices = kernels.black_scholes_price(S, K, T, r,
+                                             np.maximum(vol, MIN_VOL), is_call)
+    expired = T <= 0
+    if np.any(expired):
+        intrinsic = np.maximum(np.where(is_call, S - K, K - S), 0.0)
+        prices = np.where(expired, intrinsic, prices)
+    return prices
+
+
+def price_scenarios(arrays, start, stop, block_size=BLOCK_SIZE):
+    """
+    Calculates book PnL for the flattened scenarios start to stop of the
+    cube and writes them into arrays['out']
+    :param arrays: dictionary with the leg columns, the shock axes and the
+    flattened output array
+    :param start: first flattened scenario index
+    :param stop: flattened scenario index to stop before
+    :param block_size: (scenario, leg) pairs priced at once
+    """
+    shape = tuple(len(arrays[axis]) for axis in SHOCK_AXES)
+    num_legs = len(arrays["S"])
+    step = max(1, block_size // max(num_legs, 1))
+
+    for block_start in range(start, stop, step):
+        scenarios = np.arange(block_start, min(block_start + step, stop))
+        spot, vol, rate, time = np.unravel_index(scenarios, shape)
+        spot = arrays["spot"][spot][:, None]
+        vol = arrays["vol"][vol][:, None]
+        rate = arrays["rate"][rate][:, None]
+        time = arrays["time"][time][:, None]
+
+        prices = leg_prices(arrays["S"] * (1 + spot), arrays["K"],
+                            arrays["T"] - time, arrays["r"] + rate,
+                            arrays["vol_leg"] + vol, arrays["is_call"])
+        arrays["out"][scenarios] = \
+            (prices - arrays["cost_basis"]) @ arrays["quantity"]
+
+
+def _init_worker():
+    """
+    Process pool initializer: one kernel thread per worker process
+    """
+    kernels.set_num_threads(1)
+
+
+def _price_shared_scenarios(spec, start, stop, block_size, out_path=None):
+    """
+    Process pool entry point: attaches to the shared arrays and prices
+    scenarios start to stop
+    :param out_path: file of a memory-mapped output to write to instead of
+    the shared 'out' array
+    """
+    arrays, blocks = attach_shared(spec)
+    try:
+        if out_path is not None:
+            arrays["out"] = result_store.open_for_write(out_path).reshape(-1)
+        price_scenarios(arrays, start, stop, block_size)
+        if out_path is not None:
+            arrays["out"].flush()
+    finally:
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+
+def run_scenarios(book, spot_shocks=(0.0,), vol_shocks=(0.0,),
+                  rate_shocks=(0.0,), time_decay=(0.0,), max_workers=None,
+                  num_chunks=None, block_size=BLOCK_SIZE, store=None):
+    """
+    Calculates the PnL of a book for every combination of shocks
+    :param book: portfolio.Portfolio object
+    :param spot_shocks: relative spot moves (0.1 is +10%)
+    :param vol_shocks: absolute volatility moves
+    :param rate_shocks: absolute risk free rate moves
+    :param time_decay: years elapsed; legs past expiry take their
+    intrinsic value
+    :param max_workers: number of worker processes; 1 runs in this process
+    :param num_chunks: number of pieces the cube is split into; default is
+    four per worker
+    :param block_size: (scenario, leg) pairs priced at once per worker
+    :param store: optional result_store.ResultStore; a cube computed before
+    for the same book and shocks is then mapped from disk, and a new one
+    is written into it by the workers
+    :return: numpy.ndarray of book PnL with shape (len(spot_shocks),
+    len(vol_shocks), len(rate_shocks), len(time_decay)); a read-only
+    memory map when a store is given
+    """
+    shocks = [np.asarray(axis, dtype=np.float64).ravel() for axis in
+              (spot_shocks, vol_shocks, rate_shocks, time_decay)]
+    shape = tuple(len(axis) for axis in shocks)
+    inputs = dict(zip(SHOCK_AXES, shocks))
+    inputs.update(S=book.legs["S"], K=book.legs["K"], T=book.legs["T"],
+                  vol_leg=book.legs["vol"], quantity=book.legs["quantity"],
+                  cost_basis=book.legs["cost_basis"],
+                  is_call=book.legs["is_call"], r=np.float64(book.r))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if store is None:
+        out = np.empty(shape)
+        _price_cube(inputs, out, max_workers, num_chunks, block_size)
+        return out
+
+    return store.get_or_compute(
+        "scenarios", dict(zip(SHOCK_AXES, shocks)), inputs,
+        lambda out: _price_cube(inputs, out, max_workers, num_chunks,
+                                block_size))
+
+
+def _price_cube(inputs, out, max_workers, num_chunks, block_size):
+    """
+    Prices every scenario of the cube into out, on a process pool unless
+    max_workers is 1
+    :param inputs: dictionary with the leg columns and the shock axes
+    :param out: C-contiguous output array with the shape of the cube
+    (numpy.ndarray, or a numpy.memmap the workers write to directly)
+    """
+    num_scenarios = out.size
+    inputs = dict(inputs, out=out.reshape(-1))
+    if max_workers == 1:
+        price_scenarios(inputs, 0, num_scenarios, block_size)
+        return
+
+    out_path = getattr(out, "filename", None)
+    if out_path is not None:
+        del inputs["out"]  # workers map the file themselves
+    num_chunks = min(num_chunks or 4 * max_workers, num_scenarios)
+    bounds = np.linspace(0, num_scenarios, num_chunks + 1).astype(int)
+    with SharedArrays(inputs) as shared, \
+            ProcessPoolExecutor(max_workers=max_workers,
+                                initializer=_init_worker) as pool:
+        futures = [pool.submit(_price_shared_scenarios, shared.spec,
+                               start, stop, block_size, out_path)
+                   for start, stop in zip(bounds[:-1], bounds[1:])]
+        for future in futures:
+            future.result()
+        if out_path is None:
+            out.reshape(-1)[...] = shared.arrays["out"]
@@ -4,18 +4,35 @@ Description: Streamlit application driver that showcases a Black Scholes
 Option Pricer with a PnL surface heatmap
 Created by: Renesh Ravi
 """
-import option
 import streamlit as st
 import seaborn as sns
 import numpy as np
 import heatmap_funcs
 import pandas as pd
-import yfinance as yf
 import re
 import risk_free_rate_fetcher as rfr
+import quote_provider
+import app_cache
+import batch_pricer
+import export
+import profiling
 
 
 st.set_page_config(layout='wide', initial_sidebar_state='expanded')
+
+# the pipeline stages of this run are timed when the profiling panel (at the
+# bottom of the sidebar) is shown; its toggle is read from the session state
+# here so that the whole run is recorded. Every session has its own profiler,
+# set for this script run's thread, so sessions don't see each other's runs
+show_profiling = st.session_state.get("show_profiling",
+                                      profiling.ENABLED_BY_ENV)
+if "profiler" not in st.session_state:
+    st.session_state.profiler = profiling.Profiler()
+profiler = st.session_state.profiler
+profiler.enabled = show_profiling
+profiler.start_run()
+profiling.set_profiler(profiler)
+
 st.title("Black-Scholes Option Pricing")
 st.sidebar.header('Option Parameters')
 
@@ -28,11 +45,13 @@ if use_live_data:
     stock_ticker = st.sidebar.text_input("Stock Ticker", value="AAPL")
     if bool(re.match(r"^[A-Za-z0-9-.]+$", stock_ticker)):
         try:
-            stock_data = yf.Ticker(stock_ticker)
-            live_price = stock_data.history(period="1d")['Close'].iloc[-1]
+            # cached per ticker, so reruns don't wait on Yahoo Finance
+            with profiling.stage("app.spot_price"):
+                live_price = quote_provider.get_quote_provider().get_price(
+                    stock_ticker)
             st.sidebar.write(f"Live Spot Price: ${live_price:.2f}")
             S = live_price
-        except IndexError:
+        except LookupError:
             st.sidebar.error(f"No price data available for ticker '{stock_ticker}'. Please check the ticker.")
             S = st.sidebar.number_input("Spot Price", value=100.0, step=0.01)
         except Exception as e:
@@ -53,8 +72,15 @@ use_gov_bond_rate = st.sidebar.toggle("Use Government Bond Rate for "
                                       "Risk-Free Rate", value=True)
 if use_gov_bond_rate:
     try:
-        r = rfr.fetch_risk_free_rate(T) * 100
+        # never waits for FRED: the first fetch runs in the background and
+        # its curve is used from the next rerun on
+        with profiling.stage("app.risk_free_rate"):
+            r = rfr.fetch_risk_free_rate(T, timeout=0) * 100
         st.sidebar.write(f"Fetched government rate: {r:.2f}%")
+    except rfr.CurveLoadingError:
+        st.sidebar.info("Government rate is still loading; using 5.00% "
+                        "until it arrives.")
+        r = 5.00
     except Exception as e:
         st.sidebar.error(f"Error fetching rate: {e}")
         r = 5.00  # Default fallback rate
@@ -65,13 +91,28 @@ else:
 vol = st.sidebar.number_input("Volatility (in percent)", value=20.00,
                               step=0.01)
 
-# creates a call and put option object based on user's input
-call_option = option.Option(S, K, T, r / 100, vol / 100, "call")
-put_option = option.Option(S, K, T, r / 100, vol / 100, "put")
-
-# generates call and put price evaluation based on black scholes model
-call_price = call_option.black_scholes_price()
-put_price = put_option.black_scholes_price()
+# Optional volatility smile: the option and every cell of the heatmaps then
+# take the surface's volatility at their own strike and expiry
+vol_file = st.sidebar.file_uploader(
+    "Volatility Surface (CSV with K, T, vol)", type="csv")
+vol_csv = None
+if vol_file is not None:
+    try:
+        smile = app_cache.load_vol_surface(vol_file.getvalue())
+    except (KeyError, ValueError) as e:
+        st.sidebar.error(f"Invalid volatility surface file: {e}")
+    else:
+        vol_csv = vol_file.getvalue()
+        vol = smile(K, T) * 100
+        st.sidebar.write(f"Surface volatility at K and T: {vol:.2f}%")
+
+# generates call and put price evaluation based on black scholes model,
+# along with the greeks shown further down, from a single evaluation each
+# (cached on the option inputs, so reruns for other widgets reuse them)
+call_greeks = app_cache.option_values(S, K, T, r / 100, vol / 100, "call")
+put_greeks = app_cache.option_values(S, K, T, r / 100, vol / 100, "put")
+call_price = call_greeks.pop("Price")
+put_price = put_greeks.pop("Price")
 
 # css text for custom containers in the streamlit interface
 st.markdown(
@@ -169,32 +210,66 @@ purchase_price = st.sidebar.number_input("Purchase Price per Contract", value=ca
 pnl = num_contracts * (call_price - purchase_price)
 
 
-num_points = 11 # number of data points
+num_points = st.sidebar.number_input("Heatmap Grid Points", value=11,
+                                     min_value=2, max_value=500, step=1)
+use_approximation = st.sidebar.toggle(
+    "Approximate PnL from the Greeks", value=False,
+    help="Delta-gamma expansion around the spot; points whose estimated "
+         "error is above the tolerance are priced exactly")
+if use_approximation:
+    approximation_tolerance = st.sidebar.number_input(
+        "Approximation Tolerance ($ per contract)", value=0.01,
+        min_value=0.0, step=0.01, format="%.4f")
+use_time_decay = st.sidebar.toggle(
+    "Time Decay Sweep", value=False,
+    help="Prices the PnL heatmaps at a sequence of maturities from T down "
+         "to expiry, to step through with a slider")
+if use_time_decay:
+    max_frames = app_cache.max_sweep_frames(num_points)
+    num_frames = st.sidebar.number_input(
+        "Sweep Frames", value=min(100, max_frames), min_value=2,
+        max_value=max_frames, step=1,
+        help="Every frame is priced and cached at once, so larger grids "
+             "allow fewer frames")
+heatmap_backend = st.sidebar.selectbox(
+    "Heatmap Renderer", heatmap_funcs.HEATMAP_BACKENDS, index=1,
+    format_func=lambda backend: {"seaborn": "Annotated (seaborn)",
+                                 "image": "Image",
+                                 "interactive": "Interactive (hover)"}[backend])
 S_min, S_max = S - (S/2), S + (S/2) # calculates the range of values for S
 K_min, K_max = K - (K/2), K + (K/2) # calculates the range of values for S
 
 S_range = np.linspace(S_min, S_max, num_points)
 K_range = np.linspace(K_min, K_max, num_points)
 
-call_pnl_surface = np.zeros((num_points, num_points))
-put_pnl_surface = np.zeros((num_points, num_points))
-
-for i, S_val in enumerate(S_range):
-    for j, K_val in enumerate(K_range):
-        # call option PnL
-        temp_call_option = option.Option(S_val, K_val, T, r / 100, vol / 100, "call")
-        call_option_price = temp_call_option.black_scholes_price()
-        call_pnl_surface[i, j] = num_contracts * (call_option_price - purchase_price)
-
-        # P\put option PnL
-        temp_put_option = option.Option(S_val, K_val, T, r / 100, vol / 100, "put")
-        put_option_price = temp_put_option.black_scholes_price()
-        put_pnl_surface[i, j] = num_contracts * (put_option_price - purchase_price)
+# call and put prices over every (S, K) pair in one vectorized evaluation,
+# cached on (S, K, T, r, vol); the position size and purchase price only
+# rescale them into PnL
+with profiling.stage("app.price_surfaces"):
+    if use_approximation:
+        call_price_surface, put_price_surface, approximation_report = \
+            app_cache.approximate_price_surfaces(S_range, K_range, T,
+                                                 r / 100, vol / 100,
+                                                 approximation_tolerance,
+                                                 vol_csv)
+    else:
+        call_price_surface, put_price_surface = app_cache.price_surfaces(
+            S_range, K_range, T, r / 100, vol / 100, vol_csv)
+call_pnl_surface = app_cache.pnl_surface(call_price_surface, num_contracts,
+                                         purchase_price)
+put_pnl_surface = app_cache.pnl_surface(put_price_surface, num_contracts,
+                                        purchase_price)
 
 # custom colormap that ranges from green to red, for profit and loss,
 # respectively
 custom_cmap = sns.diverging_palette(0, 145, as_cmap=True)
 st.divider()
+if use_approximation:
+    st.caption(
+        f"Approximated {approximation_report['Points'] - approximation_report['Exact Points']} "
+        f"of {approximation_report['Points']} prices from the Greeks; largest "
+        f"error observed on {approximation_report['Sampled Points']} sampled "
+        f"points: ${approximation_report['Max Observed Error']:.4f}")
 
 col_call_pnl, col_put_pnl = st.columns(2)
 
@@ -206,7 +281,8 @@ with col_call_pnl:
         K_range,
         S_range,
         custom_cmap,
-        heatmap_funcs.dynamic_annotation_format
+        heatmap_funcs.dynamic_annotation_format,
+        backend=heatmap_backend
     )
 
 # Put PnL heatmap
@@ -217,45 +293,191 @@ with col_put_pnl:
         K_range,
         S_range,
         custom_cmap,
-        heatmap_funcs.dynamic_annotation_format
+        heatmap_funcs.dynamic_annotation_format,
+        backend=heatmap_backend
     )
 
+# every frame of the sweep is priced in one batched evaluation and cached, so
+# moving the slider only slices out a frame and draws it
+if use_time_decay:
+    st.divider()
+    st.subheader("Time Decay")
+    with profiling.stage("app.time_decay_surfaces"):
+        maturities, call_frames, put_frames = app_cache.time_decay_surfaces(
+            S_range, K_range, T, r / 100, vol / 100, num_frames, vol_csv)
+    frame = st.select_slider(
+        "Time to Maturity", options=range(num_frames),
+        format_func=lambda i: f"{maturities[i]:.3f} years")
+    col_call_decay, col_put_decay = st.columns(2)
+    with col_call_decay:
+        heatmap_funcs.generate_heatmap(
+            f"Call Option PnL Heatmap (T = {maturities[frame]:.3f})",
+            app_cache.pnl_surface(call_frames[frame], num_contracts,
+                                  purchase_price),
+            K_range,
+            S_range,
+            custom_cmap,
+            heatmap_funcs.dynamic_annotation_format,
+            backend=heatmap_backend
+        )
+    with col_put_decay:
+        heatmap_funcs.generate_heatmap(
+            f"Put Option PnL Heatmap (T = {maturities[frame]:.3f})",
+            app_cache.pnl_surface(put_frames[frame], num_contracts,
+                                  purchase_price),
+            K_range,
+            S_range,
+            custom_cmap,
+            heatmap_funcs.dynamic_annotation_format,
+            backend=heatmap_backend
+        )
+
 st.divider()
 st.subheader("Greeks")
-call_greeks = call_option.get_greeks()
-put_greeks = put_option.get_greeks()
 col_call_greeks, col_put_greeks = st.columns(2)
 
 with col_call_greeks:
     st.markdown("#### Call Option Greeks")
-    data = {
-        "Greek": ["Delta", "Gamma", "Vega", "Theta", "Rho"],
-        "Values": [f"{value:.4f}" for value in call_greeks.values()]}
-    call_greeks_df = pd.DataFrame(data)
-    st.table(call_greeks_df)
+    st.table(app_cache.greeks_table(call_greeks))
 
 with col_put_greeks:
     st.markdown("#### Put Option Greeks")
-    data = {
-        "Greek": ["Delta", "Gamma", "Vega", "Theta", "Rho"],
-        "Values": [f"{value:.4f}" for value in put_greeks.values()]}
-    put_greeks_df = pd.DataFrame(data)
-    st.table(put_greeks_df)
-
-call_pnl_df = pd.DataFrame(call_pnl_surface, index=S_range, columns=K_range)
-put_pnl_df = pd.DataFrame(put_pnl_surface, index=S_range, columns=K_range)
-
-# Provide download options
-st.sidebar.download_button(
-    label="Download Call PnL Data",
-    data=call_pnl_df.to_csv(index=True),
-    file_name="call_pnl_data.csv",
-    mime="text/csv"
-)
+    st.table(app_cache.greeks_table(put_greeks))
+
+# greeks over the same (S, K) grid as the PnL heatmaps, all from one batched
+# evaluation (cached, so switching the greek shown doesn't recompute them)
+show_greeks_surfaces = st.toggle("Show Greeks Heatmaps", value=False)
+if show_greeks_surfaces:
+    col_greek, col_check = st.columns(2)
+    with col_greek:
+        greek_name = st.selectbox("Greek", batch_pricer.GREEK_NAMES)
+    with col_check:
+        check_greeks = st.toggle(
+            "Check Against Finite Differences", value=False,
+            help="Reprices the grid with bumped spot, volatility, time and "
+                 "rate, and compares the differences with the greeks")
+    call_values, put_values = app_cache.greeks_surfaces(
+        S_range, K_range, T, r / 100, vol / 100, vol_csv)
+    col_call_greek, col_put_greek = st.columns(2)
+    with col_call_greek:
+        heatmap_funcs.generate_heatmap(
+            f"Call Option {greek_name} Heatmap",
+            call_values[greek_name],
+            K_range,
+            S_range,
+            custom_cmap,
+            heatmap_funcs.significant_annotation_format,
+            backend=heatmap_backend,
+            value_title=greek_name
+        )
+    with col_put_greek:
+        heatmap_funcs.generate_heatmap(
+            f"Put Option {greek_name} Heatmap",
+            put_values[greek_name],
+            K_range,
+            S_range,
+            custom_cmap,
+            heatmap_funcs.significant_annotation_format,
+            backend=heatmap_backend,
+            value_title=greek_name
+        )
+    if check_greeks:
+        try:
+            st.table(app_cache.greeks_check(S_range, K_range, T, r / 100,
+                                            vol / 100, vol_csv))
+        except ValueError as e:
+            st.warning(f"Finite difference check unavailable: {e}")
 
-st.sidebar.download_button(
-    label="Download Put PnL Data",
-    data=put_pnl_df.to_csv(index=True),
-    file_name="put_pnl_data.csv",
-    mime="text/csv"
-)
\ No newline at end of file
+# Optional book of option legs (e.g. a spread) whose combined PnL is shown
+# over spot and volatility moves
+st.sidebar.divider()
+st.sidebar.subheader("Portfolio")
+legs_file = st.sidebar.file_uploader(
+    "Option Legs (CSV with option_type, S, K, T, vol, quantity, cost_basis)",
+    type="csv")
+if legs_file is not None:
+    legs_csv = legs_file.getvalue()
+    try:
+        with profiling.stage("app.load_portfolio"):
+            book = app_cache.load_portfolio(legs_csv, r / 100)
+    except (KeyError, ValueError) as e:
+        st.sidebar.error(f"Invalid portfolio file: {e}")
+    else:
+        st.divider()
+        st.subheader(f"Portfolio ({len(book)} legs)")
+        col_book_totals, col_book_pnl = st.columns(2)
+
+        with col_book_totals:
+            st.markdown("#### Book Totals")
+            data = {
+                "Measure": list(book.totals.keys()),
+                "Values": [f"{value:.4f}" for value in book.totals.values()]}
+            st.table(pd.DataFrame(data))
+
+        spot_moves = np.linspace(-0.5, 0.5, num_points)
+        vol_moves = np.linspace(-0.5, 0.5, num_points) * vol / 100
+        with col_book_pnl:
+            heatmap_funcs.generate_heatmap(
+                "Portfolio PnL Heatmap",
+                app_cache.portfolio_pnl_surface(legs_csv, r / 100,
+                                                spot_moves, vol_moves),
+                vol_moves * 100,
+                spot_moves * 100,
+                custom_cmap,
+                heatmap_funcs.dynamic_annotation_format,
+                backend=heatmap_backend,
+                axis_titles=("Volatility Move (pts)", "Spot Move (%)")
+            )
+
+# Provide download options; the PnL data is only serialized once the user
+# asks for it, and kept until any of the inputs change
+st.sidebar.divider()
+export_format = st.sidebar.selectbox(
+    "Export Format", export.EXPORT_FORMATS,
+    format_func=lambda fmt: {"csv": "CSV", "arrow": "Arrow IPC stream",
+                             "parquet": "Parquet"}[fmt])
+export_key = (export_format, S, K, T, r, vol, vol_csv, num_points,
+              num_contracts, purchase_price)
+if st.session_state.get("pnl_export_key") != export_key:
+    st.session_state.pop("pnl_exports", None)
+if st.sidebar.button("Prepare PnL Export"):
+    axes = export.surface_axes(S_range, K_range)
+    st.session_state.pnl_export_key = export_key
+    st.session_state.pnl_exports = {
+        "Call": export.export_bytes(call_pnl_surface, axes, export_format),
+        "Put": export.export_bytes(put_pnl_surface, axes, export_format)}
+
+for option_type, data in st.session_state.get("pnl_exports", {}).items():
+    st.sidebar.download_button(
+        label=f"Download {option_type} PnL Data",
+        data=data,
+        file_name=f"{option_type.lower()}_pnl_data."
+                  f"{export.FILE_EXTENSIONS[export_format]}",
+        mime=export.MIME_TYPES[export_format]
+    )
+
+# Optional debug panel with the timings and counters of this run, which can
+# be downloaded for offline analysis
+st.sidebar.divider()
+st.sidebar.toggle("Show Profiling Panel", value=show_profiling,
+                  key="show_profiling",
+                  help="Times the data fetches, pricing, heatmaps and "
+                       "exports of every run")
+if show_profiling:
+    run_ms = (profiler.timer() - profiler.origin) / 1e6
+    with st.sidebar.expander("Profiling", expanded=True):
+        st.write(f"Run time: {run_ms:.1f} ms")
+        st.dataframe(pd.DataFrame.from_dict(
+            profiler.summary(), orient="index",
+            columns=["Calls", "Total ms", "Mean ms", "Max ms"]))
+        if profiler.counters:
+            st.table(pd.DataFrame({"Counter": list(profiler.counters),
+                                   "Value": list(profiler.counters.values())}))
+        for profile_format in profiling.PROFILE_FORMATS:
+            st.download_button(
+                label={"json": "Download JSON Profile",
+                       "chrome": "Download Chrome Trace"}[profile_format],
+                data=profiler.export(profile_format),
+                file_name=f"profile."
+                          f"{profiling.FILE_EXTENSIONS[profile_format]}",
+                mime="application/json")
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""
+File: surface.py
+Description: Builds call and put price/PnL surfaces over a grid of spot and
+strike prices by broadcasting the grid through the batch pricer, or
+through any pricing_engines engine
+    - Greeks surfaces over the same grid come out of the pricing pass, and
+      can be checked against bump-and-reprice finite differences
+    - Time decay sweeps price the surfaces at a whole sequence of
+      maturities down to expiry in one evaluation
+Created by: Renesh Ravi
+"""
+import numpy as np
+if __package__:
+    from . import batch_pricer
+    from . import profiling
+else:
+    import batch_pricer
+    import profiling
+
+# bump sizes of the finite-difference greeks; the spot bump is relative
+FD_BUMPS = {"S": 1e-3, "vol": 1e-4, "T": 1e-4, "r": 1e-4}
+
+
+def _as_axis(value):
+    """
+    Reshapes a 1-D array so it becomes a leading axis in front of the
+    (S, K) grid; scalars are left unchanged
+    :param value: float or 1-D array
+    :return: float or numpy.ndarray of shape (n, 1, 1)
+    """
+    value = np.asarray(value, dtype=np.float64)
+    return value.reshape(-1, 1, 1) if value.ndim else value
+
+
+def price_surfaces(S_range, K_range, T, r, vol, store=None, engine=None):
+    """
+    price_surfaces evaluates call and put prices for every (S, K) pair
+    :param S_range: 1-D array of spot prices (rows of the surface)
+    :param K_range: 1-D array of strike prices (columns of the surface)
+    :param T: time to maturity, or a 1-D array to add a leading axis
+    :param r: risk free rate, or a 1-D array to add a leading axis
+    :param vol: volatility, a 1-D array to add a leading axis, or a
+    vol_surface.VolSurface looked up at every strike (and expiry)
+    (when several of T, r, vol are arrays they share the same leading axis)
+    :param store: optional result_store.ResultStore; surfaces computed
+    before with the same inputs are then mapped from disk instead of
+    recomputed, and new ones are written to it
+    :param engine: optional pricing_engines.PricingEngine (e.g. American
+    exercise on a binomial tree); default is the black scholes formula
+    :return: tuple of numpy.ndarray (call prices, put prices) with shape
+    (len(S_range), len(K_range)), or (n, len(S_range), len(K_range)) when
+    a leading axis is used; read-only memory maps when a store is given
+    """
+    S = np.asarray(S_range, dtype=np.float64)[:, None]
+    K = np.asarray(K_range, dtype=np.float64)[None, :]
+    T, r = _as_axis(T), _as_axis(r)
+    # a smile only needs one lookup per strike (and expiry), not per cell
+    vol = vol(K, T) if callable(vol) else _as_axis(vol)
+
+    # calls and puts are stacked on an outer axis so both come out of a
+    # single vectorized evaluation
+    ndim = max(np.ndim(x) for x in (S, T, r, vol))
+    option_types = np.array([True, False]).reshape((2,) + (1,) * ndim)
+    pricer = batch_pricer.black_scholes_price if engine is None \
+        else engine.price
+    if store is not None:
+        prices = _stored_prices(store, S, K, T, r, vol, option_types,
+                                pricer, engine)
+        return prices[0], prices[1]
+    with profiling.stage("surface.price_surfaces",
+                         points=2 * S.size * K.size):
+        prices = pricer(S, K, T, r, vol, option_types)
+    return prices[0], prices[1]
+
+
+def _stored_prices(store, S, K, T, r, vol, option_types, pricer, engine):
+    """
+    Maps the stacked call and put prices from a result store, pricing
+    them straight into a new stored result when they are missing
+    :param pricer: function pricing arrays of contracts
+    :param engine: pricing engine behind pricer, or None
+    :return: read-only numpy.memmap of shape (2, [n,] len(S), len(K))
+    """
+    shape = np.broadcast_shapes(*(np.shape(x) for x in
+                                  (S, K, T, r, vol, option_types)))
+    axes = {"option_type": ["call", "put"]}
+    if len(shape) == 4:
+        axes["scenario"] = np.arange(shape[1])
+    axes.update(S=S.ravel(), K=K.ravel())
+    # a vol surface was already looked up, so the key covers its smile
+    inputs = {"S": S, "K": K, "T": T, "r": r, "vol": vol}
+    if engine is not None:
+        inputs["engine"] = repr(engine)
+
+    def compute(out):
+        # one (S, K) surface at a time, so only that much is held in memory
+        with profiling.stage("surface.price_surfaces",
+                             points=int(np.prod(shape))):
+            for index in np.ndindex(shape[:-2]):
+                out[index] = pricer(
+                    *(np.broadcast_to(x, shape)[index] for x in
+                      (S, K, T, r, vol, option_types)))
+    return store.get_or_compute("price_surfaces", axes, inputs, compute)
+
+
+def greeks_surfaces(S_range, K_range, T, r, vol):
+    """
+    greeks_surfaces evaluates the call and put prices and all five greeks
+    for every (S, K) pair in a single vectorized pass
+    :param S_range: 1-D array of spot prices (rows of the surfaces)
+    :param K_range: 1-D array of strike prices (columns of the surfaces)
+    :param T, r, vol: see price_surfaces
+    :return: tuple of dictionaries (call values, put values) with 'Price'
+    and the option greeks as keys and numpy.ndarray surfaces as values
+    """
+    S = np.asarray(S_range, dtype=np.float64)[:, None]
+    K = np.asarray(K_range, dtype=np.float64)[None, :]
+    T, r = _as_axis(T), _as_axis(r)
+    vol = vol(K, T) if callable(vol) else _as_axis(vol)
+    ndim = max(np.ndim(x) for x in (S, T, r, vol))
+    option_types = np.array([True, False]).reshape((2,) + (1,) * ndim)
+    with profiling.stage("surface.greeks_surfaces",
+                         points=2 * S.size * K.size):
+        values = batch_pricer.price_and_greeks(S, K, T, r, vol, option_types)
+    return ({name: surface[0] for name, surface in values.items()},
+            {name: surface[1] for name, surface in values.items()})
+
+
+def finite_difference_greeks(S_range, K_range, T, r, vol, bumps=None):
+    """
+    finite_difference_greeks estimates the greeks surfaces by bumping and
+    repricing: central differences in spot, volatility, time and rate. All
+    bumped grids are stacked and priced in one vectorized evaluation
+    :param S_range: 1-D array of spot prices (rows of the surfaces)
+    :param K_range: 1-D array of strike prices (columns of the surfaces)
+    :param T: time to maturity, a single value above the time bump (no
+    leading axis)
+    :param r: risk free rate, a single value
+    :param vol: volatility, or a vol_surface.VolSurface (held fixed at
+    each strike's unbumped expiry)
+    :param bumps: dictionary overriding FD_BUMPS
+    :return: tuple of dictionaries (call greeks, put greeks) with the same
+    keys as greeks_surfaces, without 'Price'
+    """
+    bumps = dict(FD_BUMPS, **(bumps or {}))
+    if np.ndim(T) or np.ndim(r):
+        raise ValueError("Invalid finite difference inputs. T and r must be "
+                         "single values.")
+    if T <= bumps["T"]:
+        raise ValueError("Invalid finite difference inputs. T must be above "
+                         "the time bump.")
+    S = np.asarray(S_range, dtype=np.float64)[:, None]
+    K = np.asarray(K_range, dtype=np.float64)[None, :]
+    vol = vol(K, T) if callable(vol) else vol
+    h_S = bumps["S"] * S
+    # the base grid, then S, vol, T and r each bumped up and down, stacked
+    # on a leading axis
+    moves = np.vstack([np.zeros(4), np.repeat(np.eye(4), 2, axis=0)
+                       * np.tile([1.0, -1.0], 4)[:, None]])[:, :, None, None]
+    S_bumped = S + moves[:, 0] * h_S
+    vol_bumped = vol + moves[:, 1] * bumps["vol"]
+    T_bumped = T + moves[:, 2] * bumps["T"]
+    r_bumped = r + moves[:, 3] * bumps["r"]
+    option_types = np.array([True, False]).reshape(2, 1, 1, 1)
+    with profiling.stage("surface.finite_difference_greeks",
+                         points=18 * S.size * K.size):
+        prices = batch_pricer.black_scholes_price(
+            S_bumped, K, T_bumped, r_bumped, vol_bumped, option_types)
+
+    base, S_up, S_down, vol_up, vol_down, T_up, T_down, r_up, r_down = \
+        np.moveaxis(prices, 1, 0)
+    greeks = {"Delta": (S_up - S_down) / (2 * h_S),
+              "Gamma": (S_up - 2 * base + S_down) / h_S ** 2,
+              "Vega": (vol_up - vol_down) / (2 * bumps["vol"]),
+              # theta is the decay as time passes, so T goes down
+              "Theta": (T_down - T_up) / (2 * bumps["T"]),
+              "Rho": (r_up - r_down) / (2 * bumps["r"])}
+    return ({name: surface[0] for name, surface in greeks.items()},
+            {name: surface[1] for name, surface in greeks.items()})
+
+
+def check_greeks(S_range, K_range, T, r, vol, bumps=None):
+    """
+    check_greeks compares the analytic greeks surfaces with their finite
+    difference estimates
+    :param S_range, K_range, T, r, vol: see finite_difference_greeks
+    :param bumps: dictionary overriding FD_BUMPS
+    :return: dictionary of greek name to the largest absolute difference
+    over the call and put surfaces
+    """
+    analytic = greeks_surfaces(S_range, K_range, T, r, vol)
+    numeric = finite_difference_greeks(S_range, K_range, T, r, vol, bumps)
+    return {name: float(max(np.abs(exact[name] - estimate[name]).max()
+                            for exact, estimate in zip(analytic, numeric)))
+            for name in batch_pricer.GREEK_NAMES}
+
+
+def time_decay_surfaces(S_range, K_range, T, r, vol, num_frames):
+    """
+    time_decay_surfaces prices the call and put surfaces at num_frames
+    maturities evenly spaced from T down to expiry, stacked on a leading
+    axis and evaluated in one pass; the frame at expiry holds the
+    intrinsic values
+    :param S_range: 1-D array of spot prices (rows of the surfaces)
+    :param K_range: 1-D array of strike prices (columns of the surfaces)
+    :param T: time to maturity of the first frame (in years)
+    :param r: risk free rate
+    :param vol: volatility, or a vol_surface.VolSurface looked up at every
+    strike and frame maturity
+    :param num_frames: number of maturities, at least 2
+    :return: tuple (1-D numpy.ndarray of the maturities, call prices, put
+    prices) with prices of shape (num_frames, len(S_range),
+    len(K_range))
+    """
+    if num_frames < 2:
+        raise ValueError("Invalid number of frames. Choose at least 2.")
+    maturities = np.linspace(T, 0.0, num_frames)
+    live = maturities > 0
+    S = np.asarray(S_range, dtype=np.float64)[:, None]
+    K = np.asarray(K_range, dtype=np.float64)[None, :]
+    calls = np.empty((num_frames, S.size, K.size))
+    puts = np.empty_like(calls)
+    calls[live], puts[live] = price_surfaces(S_range, K_range,
+                                             maturities[live], r, vol)
+    calls[~live] = np.maximum(S - K, 0.0)
+    puts[~live] = np.maximum(K - S, 0.0)
+    return maturities, calls, puts
+
+
+def generate_pnl_surfaces(S_range, K_range, T, r, vol, num_contracts,
+                          purchase_price, engine=None):
+    """
+    generate_pnl_surfaces calculates the call and put PnL surfaces for a
+    position bought at purchase_price
+    :param S_range: 1-D array of spot prices (rows of the surface)
+    :param K_range: 1-D array of strike prices (columns of the surface)
+    :param T: time to maturity, or a 1-D array to add a leading axis
+    :param r: risk free rate, or a 1-D array to add a leading axis
+    :param vol: volatility, or a 1-D array to add a leading axis
+    :param num_contracts: number of contracts held
+    :param purchase_price: price paid per contract
+    :param engine: optional pricing_engines.PricingEngine
+    :return: tuple of numpy.ndarray (call PnL surface, put PnL surface)
+    """
+    call_prices, put_prices = price_surfaces(S_range, K_range, T, r, vol,
+                                             engine=engine)
+    return (num_contracts * (call_prices - purchase_price),
+            num_contracts * (put_prices - purchase_price))
@@ -0,0 +1,229 @@
+"""
+File: taylor_approx.py
+Description: Fast PnL approximation from the option greeks for PnL
+surfaces and scenario cubes
+    - Estimates shocked prices with the delta-gamma-vega expansion around
+      a base point instead of repricing every point
+    - Estimates each point's truncation error from the third order terms
+      (speed, vanna, volga) and reprices exactly the points whose estimate
+      is above a tolerance
+    - Reports the error actually observed by exactly repricing a random
+      sample of the approximated points
+Created by: Renesh Ravi
+"""
+import numpy as np
+
+if __package__:
+    from . import batch_pricer
+    from . import profiling
+    from . import scenario_engine
+    from .normal_dist import INV_SQRT_2PI
+else:
+    import batch_pricer
+    import profiling
+    import scenario_engine
+    from normal_dist import INV_SQRT_2PI
+
+DEFAULT_TOLERANCE = 0.01  # dollars per contract
+SAMPLE_SIZE = 256  # approximated points checked against exact prices
+BLOCK_SIZE = 2_000_000  # points approximated at once for scenario cubes
+
+
+def higher_order_greeks(S, K, T, r, vol):
+    """
+    Third order sensitivities used to bound the expansion error; they are
+    the same for calls and puts
+    :param S: array of underlying prices
+    :param K: array of strike prices
+    :param T: array of times to maturity (in years)
+    :param r: array of risk free rates (annualized)
+    :param vol: array of volatilities (annualized)
+    :return: dictionary of numpy.ndarray with Speed (dGamma/dS), Vanna
+    (dDelta/dvol) and Volga (dVega/dvol)
+    """
+    vol_sqrt_T = vol * np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * vol ** 2) * T) / vol_sqrt_T
+    d2 = d1 - vol_sqrt_T
+    pdf_d1 = np.exp(-0.5 * d1 ** 2) * INV_SQRT_2PI
+    gamma = pdf_d1 / (S * vol_sqrt_T)
+    return {"Speed": -gamma / S * (d1 / vol_sqrt_T + 1),
+            "Vanna": -pdf_d1 * d2 / vol,
+            "Volga": S * pdf_d1 * np.sqrt(T) * d1 * d2 / vol}
+
+
+def approximate_prices(S, K, T, r, vol, is_call, spot_moves, vol_moves=0.0,
+                       tolerance=DEFAULT_TOLERANCE, sample_size=SAMPLE_SIZE,
+                       rng=None):
+    """
+    Prices contracts under spot and volatility moves from the greeks of
+    their base point, falling back to exact prices where the estimated
+    error is above tolerance
+    :param S, K, T, r, vol: arrays of the base point of each contract
+    :param is_call: boolean array, True for calls
+    :param spot_moves: absolute spot moves, broadcastable with the inputs
+    :param vol_moves: absolute volatility moves, broadcastable likewise
+    :param tolerance: largest estimated error (per contract) accepted
+    :param sample_size: number of approximated points repriced exactly to
+    measure the observed error
+    :param rng: numpy.random.Generator used to pick the sample
+    :return: tuple (numpy.ndarray of prices, error report from new_report)
+    """
+    if callable(vol):  # a vol surface, sticky to the strikes
+        vol = vol(K, T)
+    base = batch_pricer.price_and_greeks(S, K, T, r, vol, is_call)
+    higher = higher_order_greeks(S, K, T, r, vol)
+    dS, dvol = np.asarray(spot_moves), np.asarray(vol_moves)
+
+    # the spot and volatility terms are formed separately so that only
+    # their sums take the full (moves x contracts) shape
+    prices = base["Price"] + dS * (base["Delta"] + 0.5 * base["Gamma"] * dS)
+    prices = prices + base["Vega"] * dvol
+    abs_dS = np.abs(dS)
+    error = abs_dS * (np.abs(higher["Speed"]) / 6 * dS ** 2 +
+                      np.abs(higher["Vanna"] * dvol)) + \
+        0.5 * np.abs(higher["Volga"]) * dvol ** 2
+    shape = prices.shape
+    error = np.broadcast_to(error, shape)
+    # NaN estimates (e.g. legs past expiry) are repriced as well
+    exact = ~(error <= tolerance) | (vol + dvol <= scenario_engine.MIN_VOL)
+    inputs = [np.broadcast_to(x, shape) for x in
+              (S + dS, K, T, r, vol + dvol, is_call)]
+    prices[exact] = scenario_engine.leg_prices(*(x[exact] for x in inputs))
+
+    report = new_report()
+    report["Points"] = prices.size
+    report["Exact Points"] = int(np.count_nonzero(exact))
+    if report["Exact Points"] < prices.size:
+        report["Max Estimated Error"] = float(
+            np.max(error, where=~exact, initial=0.0))
+        sampled = np.unravel_index(
+            _sample_indices(exact, sample_size, rng), shape)
+        observed = scenario_engine.leg_prices(*(x[sampled] for x in inputs))
+        report["Sampled Points"] = len(sampled[0])
+        report["Max Observed Error"] = float(
+            np.abs(observed - prices[sampled]).max())
+    return prices, report
+
+
+def _sample_indices(exact, sample_size, rng=None):
+    """
+    Picks a random sample of the approximated points
+    :param exact: boolean array, True where points were priced exactly
+    :param sample_size: largest number of points picked
+    :param rng: numpy.random.Generator
+    :return: numpy.ndarray of flat indices of approximated points
+    """
+    rng = rng or np.random.default_rng(0)
+    flat = exact.ravel()
+    # mostly approximated grids: draw candidates instead of listing every
+    # approximated point
+    candidates = np.unique(rng.integers(0, flat.size, 4 * sample_size))
+    candidates = candidates[~flat[candidates]]
+    if len(candidates) < sample_size:
+        candidates = np.flatnonzero(~flat)
+    return rng.permutation(candidates)[:sample_size]
+
+
+def new_report():
+    """
+    :return: dictionary of the counts and errors of an approximation
+    """
+    return {"Points": 0, "Exact Points": 0, "Sampled Points": 0,
+            "Max Estimated Error": 0.0, "Max Observed Error": 0.0}
+
+
+def merge_reports(reports):
+    """
+    Combines the reports of several approximated pieces
+    :param reports: iterable of reports from approximate_prices
+    :return: dictionary in the layout of new_report
+    """
+    merged = new_report()
+    for report in reports:
+        for name, value in report.items():
+            merged[name] = max(merged[name], value) \
+                if name.startswith("Max") else merged[name] + value
+    return merged
+
+
+def price_surfaces(S_range, K_range, T, r, vol,
+                   tolerance=DEFAULT_TOLERANCE, S0=None,
+                   sample_size=SAMPLE_SIZE):
+    """
+    Approximate version of surface.price_surfaces: every strike is
+    expanded in spot around S0 with its delta and gamma
+    :param S_range: 1-D array of spot prices (rows of the surface)
+    :param K_range: 1-D array of strike prices (columns of the surface)
+    :param T: time to maturity
+    :param r: risk free rate
+    :param vol: volatility, or a vol_surface.VolSurface looked up at every
+    strike
+    :param tolerance: largest estimated error per contract accepted
+    :param S0: spot of the expansion; default is the middle of S_range
+    :param sample_size: approximated points repriced to measure the error
+    :return: tuple (call prices, put prices, error report); the surfaces
+    have shape (len(S_range), len(K_range))
+    """
+    S_range = np.asarray(S_range, dtype=np.float64)
+    if S0 is None:
+        S0 = 0.5 * (S_range.min() + S_range.max())
+    option_types = np.array([True, False])[:, None, None]
+    with profiling.stage("surface.approximate_surfaces",
+                         points=2 * S_range.size * np.size(K_range)):
+        prices, report = approximate_prices(
+            S0, np.asarray(K_range, dtype=np.float64)[None, None, :], T, r,
+            vol, option_types, (S_range - S0)[None, :, None], 0.0, tolerance,
+            sample_size)
+    profiling.count("surface.exact_fallbacks", report["Exact Points"])
+    return prices[0], prices[1], report
+
+
+def run_scenarios(book, spot_shocks=(0.0,), vol_shocks=(0.0,),
+                  rate_shocks=(0.0,), time_decay=(0.0,),
+                  tolerance=DEFAULT_TOLERANCE, sample_size=SAMPLE_SIZE,
+                  block_size=BLOCK_SIZE):
+    """
+    Approximate version of scenario_engine.run_scenarios. The legs are
+    priced exactly (with their greeks) once per rate and time shock, and
+    the spot and volatility shocks are applied with the delta-gamma-vega
+    expansion around those base points
+    :param book: portfolio.Portfolio object
+    :param spot_shocks: relative spot moves (0.1 is +10%)
+    :param vol_shocks: absolute volatility moves
+    :param rate_shocks: absolute risk free rate moves
+    :param time_decay: years elapsed; legs past expiry take their
+    intrinsic value
+    :param tolerance: largest estimated error per contract accepted
+    :param sample_size: approximated points repriced to measure the error,
+    per block
+    :param block_size: (scenario, leg) pairs approximated at once
+    :return: tuple (numpy.ndarray of book PnL with the shape of
+    scenario_engine.run_scenarios, error report)
+    """
+    spot, vol_moves, rates, times = (
+        np.asarray(axis, dtype=np.float64).ravel() for axis in
+        (spot_shocks, vol_shocks, rate_shocks, time_decay))
+    legs = book.legs
+    cube = np.empty((len(spot), len(vol_moves), len(rates), len(times)))
+    step = max(1, block_size // max(len(spot) * len(vol_moves), 1))
+    rng = np.random.default_rng(0)
+    reports = []
+
+    for j, rate in enumerate(rates):
+        for k, time in enumerate(times):
+            pnl = np.zeros((len(spot), len(vol_moves)))
+            for start in range(0, len(book), step):
+                index = slice(start, start + step)
+                S = legs["S"][index]
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    prices, report = approximate_prices(
+                        S, legs["K"][index], legs["T"][index] - time,
+                        book.r + rate, legs["vol"][index],
+                        legs["is_call"][index], spot[:, None, None] * S,
+                        vol_moves[None, :, None], tolerance, sample_size,
+                        rng)
+                pnl += (prices - legs["cost_basis"][index]) @ \
+                    legs["quantity"][index]
+                reports.append(report)
+            cube[:, :, j, k] = pnl
+    return cube, merge_reports(reports)
@@ -0,0 +1,160 @@
+"""
+File: tick_repricer.py
+Description: Repricer for market data ticks on a book whose strikes,
+maturities and rate stay fixed
+    - Precomputes the per-contract invariants (log K, sqrt(T), discount
+      factors and their signed products) once, and the volatility terms
+      whenever a volatility moves
+    - A spot tick then costs one log, two normal cdfs and a handful of
+      multiplies per contract, and can be limited to the contracts whose
+      inputs changed
+Created by: Renesh Ravi
+"""
+import numpy as np
+
+if __package__:
+    from . import batch_pricer
+    from .normal_dist import norm_cdf_array, norm_pdf_array
+else:
+    import batch_pricer
+    from normal_dist import norm_cdf_array, norm_pdf_array
+
+VALUE_NAMES = ("Price",) + batch_pricer.GREEK_NAMES
+
+
+class TickRepricer:
+    def __init__(self, option_type, S, K, T, vol, r=0.05, quantity=1.0):
+        """
+        Initializes the TickRepricer and prices every contract
+        :param option_type: 'call', 'put', or an array of them per contract
+        :param S: array of underlying prices
+        :param K: array of strike prices
+        :param T: array of times to maturity (in years)
+        :param vol: array of volatilities (annualized)
+        :param r: Risk Free Rate (annualized) shared by all contracts
+        :param quantity: array of contracts held, used by totals()
+        """
+        *columns, sign = np.broadcast_arrays(
+            *(np.asarray(x, dtype=np.float64) for x in
+              (S, K, T, vol, quantity)),
+            batch_pricer.option_sign(option_type))
+        self.S, self.K, self.T, self.vol, self.quantity, self.sign = (
+            np.array(column, ndmin=1) for column in (*columns, sign))
+        self.log_K = np.log(self.K)
+        self.sqrt_T = np.sqrt(self.T)
+        self.vol_sqrt_T, self.inv_vol_sqrt_T, self.d1_offset, \
+            self.theta_decay = np.empty((4,) + self.S.shape)
+        self.values = {name: np.empty(self.S.shape) for name in VALUE_NAMES}
+        self.set_rate(r)
+
+    @classmethod
+    def from_portfolio(cls, book):
+        """
+        Creates a TickRepricer for the legs of a Portfolio
+        :param book: portfolio.Portfolio object
+        :return: TickRepricer object
+        """
+        legs = book.legs
+        return cls(legs["is_call"], legs["S"], legs["K"], legs["T"],
+                   legs["vol"], book.r, legs["quantity"])
+
+    def __len__(self):
+        return len(self.S)
+
+    def set_rate(self, r):
+        """
+        Changes the Risk Free Rate, which every contract shares, and
+        reprices the whole book
+        :param r: Risk Free Rate (annualized)
+        """
+        self.r = r
+        discounted_K = self.K * np.exp(-r * self.T)
+        self.signed_discounted_K = self.sign * discounted_K
+        self.signed_r_discounted_K = r * self.signed_discounted_K
+        self.signed_T_discounted_K = self.T * self.signed_discounted_K
+        self._set_vol_terms(slice(None))
+        self._evaluate(slice(None))
+
+    def _set_vol_terms(self, index):
+        """
+        Recomputes the volatility dependent invariants of some contracts;
+        d1 is then log(S) * inv_vol_sqrt_T + d1_offset
+        :param index: slice or integer array of contracts
+        """
+        vol, sqrt_T = self.vol[index], self.sqrt_T[index]
+        vol_sqrt_T = vol * sqrt_T
+        self.vol_sqrt_T[index] = vol_sqrt_T
+        self.inv_vol_sqrt_T[index] = 1.0 / vol_sqrt_T
+        self.d1_offset[index] = ((self.r + 0.5 * vol ** 2) * self.T[index]
+                                 - self.log_K[index]) / vol_sqrt_T
+        self.theta_decay[index] = vol / (2 * sqrt_T)
+
+    def _evaluate(self, index):
+        """
+        Prices some contracts from the invariants and their current spot
+        :param index: slice or integer array of contracts
+        """
+        S = self.S[index]
+        sign = self.sign[index]
+        inv_vol_sqrt_T = self.inv_vol_sqrt_T[index]
+        d1 = np.log(S) * inv_vol_sqrt_T + self.d1_offset[index]
+        d2 = d1 - self.vol_sqrt_T[index]
+
+        delta = sign * norm_cdf_array(sign * d1)
+        cdf_d2 = norm_cdf_array(sign * d2)
+        pdf_d1 = norm_pdf_array(d1)
+        S_pdf_d1 = S * pdf_d1
+
+        values = self.values
+        values["Price"][index] = S * delta - \
+            self.signed_discounted_K[index] * cdf_d2
+        values["Delta"][index] = delta
+        values["Gamma"][index] = pdf_d1 * inv_vol_sqrt_T / S
+        values["Vega"][index] = S_pdf_d1 * self.sqrt_T[index]
+        values["Theta"][index] = -S_pdf_d1 * self.theta_decay[index] - \
+            self.signed_r_discounted_K[index] * cdf_d2
+        values["Rho"][index] = self.signed_T_discounted_K[index] * cdf_d2
+
+    def tick(self, S=None, vol=None, index=None, changed_only=False):
+        """
+        Applies a market data tick and reprices the affected contracts
+        :param S: new underlying price, for all selected contracts or one
+        per selected contract
+        :param vol: new volatility, in the same layout as S
+        :param index: contracts the tick applies to (leg numbers or
+        boolean mask); default is every contract
+        :param changed_only: with index=None, reprice only the contracts
+        whose S or vol actually differs from the current value
+        :return: dictionary of VALUE_NAMES to arrays for every contract
+        """
+        if index is None and changed_only:
+            changed = np.zeros(len(self), dtype=bool)
+            for current, new in ((self.S, S), (self.vol, vol)):
+                if new is not None:
+                    changed |= current != new
+            index = np.flatnonzero(changed)
+            S = S if S is None or np.ndim(S) == 0 else np.asarray(S)[index]
+            vol = vol if vol is None or np.ndim(vol) == 0 else \
+                np.asarray(vol)[index]
+        elif index is None:
+            index = slice(None)
+        else:
+            index = np.asarray(index)
+            if index.dtype == bool:
+                index = np.flatnonzero(index)
+            index = np.atleast_1d(index)
+
+        if S is not None:
+            self.S[index] = S
+        if vol is not None:
+            self.vol[index] = vol
+            self._set_vol_terms(index)
+        self._evaluate(index)
+        return self.values
+
+    def totals(self):
+        """
+        :return: dictionary of the position-weighted sums of VALUE_NAMES
+        """
+        return {name: self.quantity @ values for name, values in
+                self.values.items()}
@@ -0,0 +1,195 @@
+"""
+File: vol_surface.py
+Description: Implied volatility surface indexed by strike and expiry
+    - Built from a grid of vols, from scattered implied vols (e.g. solved
+      from an option chain) or from a CSV file
+    - Interpolates total variance (vol**2 * T) bilinearly in strike and
+      expiry, with flat vols beyond the grid; the bilinear coefficients of
+      every cell are precomputed, so a lookup is a cell index, four takes
+      and a square root
+    - A VolSurface can be passed as the vol of the pricers and surfaces,
+      which look it up at each contract's strike and expiry
+Created by: Renesh Ravi
+"""
+import numpy as np
+
+CSV_COLUMNS = ("K", "T", "vol")
+
+
+class _Axis:
+    def __init__(self, nodes):
+        """
+        Interpolation axis; evenly spaced nodes are indexed arithmetically,
+        others by binary search
+        :param nodes: sorted 1-D array of at least two nodes
+        """
+        self.nodes = nodes
+        self.low, self.high = nodes[0], nodes[-1]
+        self.cells = len(nodes) - 1
+        step = (self.high - self.low) / self.cells
+        self.uniform = bool(np.allclose(np.diff(nodes), step, rtol=1e-9,
+                                        atol=0.0))
+        self.inv_step = 1.0 / step
+
+    def locate(self, x):
+        """
+        :param x: numpy.ndarray of values
+        :return: tuple (x clamped to the axis, cell index of each value)
+        """
+        x = np.clip(x, self.low, self.high)
+        if self.uniform:
+            cell = np.minimum(((x - self.low) * self.inv_step)
+                              .astype(np.intp), self.cells - 1)
+        else:
+            cell = np.clip(np.searchsorted(self.nodes, x, side="right") - 1,
+                           0, self.cells - 1)
+        return x, cell
+
+
+def _with_two_nodes(nodes, values, axis):
+    """
+    Repeats a single node (and its values) one unit further, so that the
+    surface is constant along that axis
+    :return: tuple (nodes, values)
+    """
+    if len(nodes) > 1:
+        return nodes, values
+    return np.append(nodes, nodes[0] + 1.0), np.repeat(values, 2, axis=axis)
+
+
+class VolSurface:
+    def __init__(self, strikes, expiries, vols):
+        """
+        Initializes the VolSurface from a grid of implied volatilities and
+        precomputes the interpolation coefficients of every cell
+        :param strikes: increasing 1-D array of strike prices
+        :param expiries: increasing 1-D array of times to maturity (in
+        years), all above 0
+        :param vols: array of volatilities (annualized) with one row per
+        expiry and one column per strike
+        """
+        strikes = np.asarray(strikes, dtype=np.float64).ravel()
+        expiries = np.asarray(expiries, dtype=np.float64).ravel()
+        vols = np.asarray(vols, dtype=np.float64)
+        if vols.shape != (len(expiries), len(strikes)) or not vols.size:
+            raise ValueError("Invalid volatility surface. Expected one row "
+                             "of vols per expiry and one column per strike.")
+        if np.any(np.diff(strikes) <= 0) or np.any(np.diff(expiries) <= 0) \
+                or expiries[0] <= 0:
+            raise ValueError("Invalid volatility surface. Strikes and "
+                             "expiries must be increasing and expiries "
+                             "above 0.")
+        if not np.all(np.isfinite(vols) & (vols > 0)):
+            raise ValueError("Invalid volatility surface. Vols must be "
+                             "finite and above 0.")
+        self.strikes, self.expiries, self.vols = strikes, expiries, vols
+
+        strikes, variance = _with_two_nodes(strikes,
+                                            vols ** 2 * expiries[:, None], 1)
+        expiries, variance = _with_two_nodes(expiries, variance, 0)
+        self._K, self._T = _Axis(strikes), _Axis(expiries)
+
+        # total variance in the cell [K0, K1] x [T0, T1] is
+        # a + b * K + c * T + d * K * T
+        K0, K1 = strikes[None, :-1], strikes[None, 1:]
+        T0, T1 = expiries[:-1, None], expiries[1:, None]
+        w00, w01 = variance[:-1, :-1], variance[:-1, 1:]
+        w10, w11 = variance[1:, :-1], variance[1:, 1:]
+        area = (K1 - K0) * (T1 - T0)
+        coefficients = (
+            (w00 * K1 * T1 - w01 * K0 * T1 - w10 * K1 * T0 + w11 * K0 * T0),
+            (-w00 * T1 + w01 * T1 + w10 * T0 - w11 * T0),
+            (-w00 * K1 + w01 * K0 + w10 * K1 - w11 * K0),
+            (w00 - w01 - w10 + w11))
+        self._coefficients = [np.ascontiguousarray(c / area).ravel()
+                              for c in coefficients]
+
+    @classmethod
+    def from_implied_vols(cls, strikes, expiries, vols):
+        """
+        Creates a VolSurface from scattered implied vols, e.g. the 'Vol' of
+        implied_vol.implied_volatility over a chain. The grid is every
+        quoted strike and expiry; each expiry's smile is interpolated
+        linearly (flat beyond its quotes) onto the grid strikes. NaN vols
+        (contracts that did not converge) are left out
+        :param strikes: array of strike prices
+        :param expiries: array of times to maturity, one per strike
+        :param vols: array of implied volatilities, one per strike
+        :return: VolSurface object
+        """
+        strikes, expiries, vols = (
+            np.asarray(x, dtype=np.float64).ravel() for x in
+            np.broadcast_arrays(strikes, expiries, vols))
+        valid = np.isfinite(vols) & (vols > 0)
+        strikes, expiries, vols = strikes[valid], expiries[valid], vols[valid]
+        if not vols.size:
+            raise ValueError("Invalid volatility surface. No valid implied "
+                             "vols were given.")
+
+        grid_strikes = np.unique(strikes)
+        grid_expiries = np.unique(expiries)
+        smiles = []
+        for expiry in grid_expiries:
+            quoted = expiries == expiry
+            order = np.argsort(strikes[quoted])
+            smiles.append(np.interp(grid_strikes, strikes[quoted][order],
+                                    vols[quoted][order]))
+        return cls(grid_strikes, grid_expiries, np.array(smiles))
+
+    @classmethod
+    def from_chain(cls, prices, S, K, T, r, option_type="call"):
+        """
+        Creates a VolSurface from the market prices of an option chain
+        :param prices: array of market option prices
+        :param S: array of underlying prices
+        :param K: array of strike prices
+        :param T: array of times to maturity (in years)
+        :param r: array of risk free rates (annualized)
+        :param option_type: 'call', 'put', or an array of them per contract
+        :return: VolSurface object
+        """
+        # needs scipy, only for chains
+        if __package__:
+            from . import implied_vol
+        else:
+            import implied_vol
+
+        solved = implied_vol.implied_volatility(prices, S, K, T, r,
+                                                option_type)
+        K, T = np.broadcast_arrays(K, T, solved["Vol"])[:2]
+        return cls.from_implied_vols(K, T, solved["Vol"])
+
+    @classmethod
+    def from_csv(cls, path):
+        """
+        Creates a VolSurface from a CSV file of implied vols with K, T and
+        vol columns (one row per quote)
+        :param path: path or file object of the CSV
+        :return: VolSurface object
+        """
+        import pandas as pd
+
+        quotes = pd.read_csv(path)
+        missing = [column for column in CSV_COLUMNS
+                   if column not in quotes.columns]
+        if missing:
+            raise KeyError(f"Missing volatility surface columns: "
+                           f"{', '.join(missing)}")
+        return cls.from_implied_vols(*(quotes[column].to_numpy()
+                                       for column in CSV_COLUMNS))
+
+    def __call__(self, K, T):
+        """
+        Looks up the volatility of every (K, T) pair
+        :param K: array of strike prices
+        :param T: array of times to maturity, broadcastable with K
+        :return: numpy.ndarray of volatilities with the broadcast shape
+        (a float for scalar inputs)
+        """
+        K, K_cell = self._K.locate(np.asarray(K, dtype=np.float64))
+        T, T_cell = self._T.locate(np.asarray(T, dtype=np.float64))
+        cell = T_cell * self._K.cells + K_cell
+        a, b, c, d = (np.take(coefficient, cell)
+                      for coefficient in self._coefficients)
+        vol = np.sqrt((a + b * K + (c + d * K) * T) / T)
+        return float(vol) if np.ndim(vol) == 0 else vol
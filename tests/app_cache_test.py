@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from src import app_cache
+from src.result_store import ResultStore
+from src.surface import price_surfaces
+from src.vol_surface import VolSurface
+
+VOL_SURFACE_PATH = os.path.join(os.path.dirname(__file__), "fixtures",
+                                "vol_surface.csv")
+
+
+class TestAppCache(unittest.TestCase):
+
+    def setUp(self):
+        app_cache.price_surfaces.clear()
+        app_cache.option_values.clear()
+        app_cache.time_decay_surfaces.clear()
+        self.S_range = np.linspace(50, 150, 11)
+        self.K_range = np.linspace(50, 150, 11)
+
+    def test_surfaces_reused_for_position_changes(self):
+        with patch("src.surface.price_surfaces",
+                   wraps=price_surfaces) as pricer:
+            calls, _ = app_cache.price_surfaces(self.S_range, self.K_range,
+                                                1.0, 0.05, 0.2)
+            pnl_1 = app_cache.pnl_surface(calls, 1, 10.0)
+            calls, _ = app_cache.price_surfaces(self.S_range, self.K_range,
+                                                1.0, 0.05, 0.2)
+            pnl_5 = app_cache.pnl_surface(calls, 5, 10.0)
+            self.assertEqual(pricer.call_count, 1)
+            np.testing.assert_allclose(pnl_5, 5 * pnl_1)
+
+            app_cache.price_surfaces(self.S_range, self.K_range, 1.0, 0.05,
+                                     0.3)
+            self.assertEqual(pricer.call_count, 2)
+
+    def test_only_large_surfaces_use_the_store(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = ResultStore(root)
+            with patch("src.result_store.get_result_store",
+                       return_value=store) as get_store, \
+                    patch("src.surface.price_surfaces",
+                          wraps=price_surfaces) as pricer:
+                app_cache.price_surfaces(self.S_range, self.K_range, 1.0,
+                                         0.05, 0.2)
+                get_store.assert_not_called()
+                self.assertIsNone(pricer.call_args.kwargs["store"])
+                with patch.object(app_cache, "STORE_MIN_POINTS", 121):
+                    app_cache.price_surfaces(self.S_range, self.K_range, 1.0,
+                                             0.05, 0.25)
+                self.assertIs(pricer.call_args.kwargs["store"], store)
+
+    def test_smile_surfaces(self):
+        with open(VOL_SURFACE_PATH, "rb") as vol_file:
+            vol_csv = vol_file.read()
+        calls, puts = app_cache.price_surfaces(self.S_range, self.K_range,
+                                               1.0, 0.05, 0.2, vol_csv)
+        expected = price_surfaces(self.S_range, self.K_range, 1.0, 0.05,
+                                  VolSurface.from_csv(VOL_SURFACE_PATH))
+        np.testing.assert_allclose(calls, expected[0])
+        np.testing.assert_allclose(puts, expected[1])
+        self.assertIs(app_cache.load_vol_surface(vol_csv),
+                      app_cache.load_vol_surface(vol_csv))
+
+    def test_greeks_surfaces(self):
+        call_values, put_values = app_cache.greeks_surfaces(
+            self.S_range, self.K_range, 1.0, 0.05, 0.2)
+        calls, puts = app_cache.price_surfaces(self.S_range, self.K_range,
+                                               1.0, 0.05, 0.2)
+        np.testing.assert_allclose(call_values["Price"], calls)
+        np.testing.assert_allclose(put_values["Price"], puts)
+        table = app_cache.greeks_check(self.S_range, self.K_range, 1.0,
+                                       0.05, 0.2)
+        self.assertEqual(table["Greek"].tolist(),
+                         ["Delta", "Gamma", "Vega", "Theta", "Rho"])
+        self.assertTrue(all(float(value) < 1e-4
+                            for value in table["Max Difference"]))
+
+    def test_time_decay_frames_computed_once(self):
+        with patch("src.surface.price_surfaces",
+                   wraps=price_surfaces) as pricer:
+            for num_contracts in (1, 2):
+                maturities, calls, _ = app_cache.time_decay_surfaces(
+                    self.S_range, self.K_range, 1.0, 0.05, 0.2, 100)
+                for frame in (0, 50, 99):
+                    app_cache.pnl_surface(calls[frame], num_contracts, 10.0)
+            # all 99 frames before expiry in a single evaluation
+            self.assertEqual(pricer.call_count, 1)
+        self.assertEqual(calls.shape, (100, 11, 11))
+        self.assertEqual(maturities[-1], 0.0)
+
+    def test_sweep_frames_capped_by_grid_size(self):
+        self.assertEqual(app_cache.max_sweep_frames(11),
+                         app_cache.MAX_SWEEP_FRAMES)
+        frames = app_cache.max_sweep_frames(500)
+        self.assertEqual(frames, 20)
+        self.assertLessEqual(frames * 500 ** 2, app_cache.MAX_SWEEP_POINTS)
+        grid = np.linspace(50, 150, 500)
+        with self.assertRaises(ValueError):
+            app_cache.time_decay_surfaces(grid, grid, 1.0, 0.05, 0.2,
+                                          frames + 1)
+
+    def test_option_values_returns_copies(self):
+        values = app_cache.option_values(100.0, 100.0, 1.0, 0.05, 0.2, "call")
+        price = values.pop("Price")
+        self.assertAlmostEqual(price, 10.4506, places=4)
+        again = app_cache.option_values(100.0, 100.0, 1.0, 0.05, 0.2, "call")
+        self.assertIn("Price", again)
+
+    def test_greeks_table(self):
+        values = app_cache.option_values(100.0, 100.0, 1.0, 0.05, 0.2, "put")
+        table = app_cache.greeks_table(values)
+        self.assertEqual(table["Greek"].tolist(),
+                         ["Delta", "Gamma", "Vega", "Theta", "Rho"])
+        self.assertEqual(table["Values"][0], "-0.3632")
+
+
+if __name__ == "__main__":
+    unittest.main()
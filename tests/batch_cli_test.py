@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.batch_cli import main, price_file
+from src.option import Option
+
+
+class TestBatchCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(3)
+        size = 25
+        self.contracts = pd.DataFrame({
+            "option_type": rng.choice(["call", "put"], size),
+            "S": rng.uniform(50, 150, size),
+            "K": rng.uniform(50, 150, size),
+            "T": rng.uniform(0.1, 2, size),
+            "vol": rng.uniform(0.1, 0.5, size)})
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
+
+    def test_csv_to_parquet_matches_option(self):
+        self.contracts.to_csv(self.path("in.csv"), index=False)
+        rows = price_file(self.path("in.csv"), self.path("out.parquet"),
+                          r=0.03, chunk_rows=7, max_workers=1)
+        self.assertEqual(rows, 25)
+
+        results = pd.read_parquet(self.path("out.parquet"))
+        pd.testing.assert_frame_equal(results[self.contracts.columns],
+                                      self.contracts)
+        for row in results.itertuples():
+            option = Option(row.S, row.K, row.T, 0.03, row.vol,
+                            row.option_type)
+            self.assertAlmostEqual(row.Price, option.black_scholes_price())
+            self.assertAlmostEqual(row.Delta, option.get_greeks()["Delta"])
+
+    def test_worker_processes_keep_input_order(self):
+        self.contracts["r"] = np.linspace(0.01, 0.05, 25)
+        self.contracts.to_parquet(self.path("in.parquet"))
+        price_file(self.path("in.parquet"), self.path("pool.csv"),
+                   chunk_rows=4, max_workers=2)
+        price_file(self.path("in.parquet"), self.path("inline.csv"),
+                   chunk_rows=25, max_workers=1)
+        pd.testing.assert_frame_equal(pd.read_csv(self.path("pool.csv")),
+                                      pd.read_csv(self.path("inline.csv")))
+
+    def test_chunks_with_different_dtypes(self):
+        # the first chunk reads S and K as integers and the later ones as
+        # floats; an extra id column goes from floats to integers
+        self.contracts["S"] = ["100"] * 10 + ["100.5"] * 15
+        self.contracts["K"] = ["90"] * 10 + ["90.5"] * 15
+        self.contracts["id"] = ["0.5"] * 10 + ["2"] * 15
+        self.contracts.to_csv(self.path("in.csv"), index=False)
+        price_file(self.path("in.csv"), self.path("out.parquet"),
+                   chunk_rows=10, max_workers=1)
+        results = pd.read_parquet(self.path("out.parquet"))
+        self.assertEqual(results["S"].tolist(), [100.0] * 10 + [100.5] * 15)
+        self.assertEqual(results["id"].tolist(), [0.5] * 10 + [2.0] * 15)
+
+    def test_empty_input_writes_schema(self):
+        self.contracts.iloc[:0].to_parquet(self.path("in.parquet"))
+        rows = price_file(self.path("in.parquet"), self.path("out.parquet"),
+                          max_workers=1)
+        self.assertEqual(rows, 0)
+        results = pd.read_parquet(self.path("out.parquet"))
+        self.assertEqual(len(results), 0)
+        self.assertEqual(list(results.columns),
+                         list(self.contracts.columns) +
+                         ["Price", "Delta", "Gamma", "Vega", "Theta", "Rho"])
+
+    def test_errors(self):
+        self.contracts.drop(columns="vol").to_csv(self.path("in.csv"),
+                                                  index=False)
+        self.assertEqual(main([self.path("in.csv"), self.path("out.csv")]),
+                         1)
+        self.assertEqual(main([self.path("in.csv"), self.path("out.xlsx")]),
+                         1)
+
+    def test_no_ui_imports(self):
+        code = ("import sys; sys.path.insert(0, 'src'); import batch_cli; "
+                "print(sorted({'streamlit', 'seaborn', 'matplotlib', "
+                "'yfinance'} & set(sys.modules)))")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, "-c", code], cwd=root,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+from src.option import Option
+from src.batch_pricer import black_scholes_price, price_and_greeks
+
+
+class TestBatchPricer(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 200
+        self.S = rng.uniform(50, 150, n)
+        self.K = rng.uniform(50, 150, n)
+        self.T = rng.uniform(0.05, 3, n)
+        self.r = rng.uniform(0.0, 0.08, n)
+        self.vol = rng.uniform(0.05, 0.8, n)
+        self.types = np.where(rng.random(n) < 0.5, "call", "put")
+
+    def test_matches_option(self):
+        results = price_and_greeks(self.S, self.K, self.T, self.r, self.vol,
+                                   self.types)
+        for i in range(len(self.S)):
+            option = Option(self.S[i], self.K[i], self.T[i], self.r[i],
+                            self.vol[i], str(self.types[i]))
+            expected = dict(option.get_greeks(),
+                            Price=option.black_scholes_price())
+            for name, value in expected.items():
+                self.assertAlmostEqual(results[name][i], value, places=9)
+
+    def test_price_only_matches_price_and_greeks(self):
+        prices = black_scholes_price(self.S, self.K, self.T, self.r,
+                                     self.vol, self.types)
+        np.testing.assert_allclose(
+            prices, price_and_greeks(self.S, self.K, self.T, self.r,
+                                     self.vol, self.types)["Price"])
+
+    def test_broadcasting_and_scalar_type(self):
+        prices = black_scholes_price(100, np.array([90.0, 100.0, 110.0]), 1,
+                                     0.05, 0.2, "put")
+        self.assertEqual(prices.shape, (3,))
+        self.assertAlmostEqual(prices[1], 5.5735, places=4)
+
+    def test_boolean_option_type(self):
+        prices = black_scholes_price(100, 100, 1, 0.05, 0.2,
+                                     np.array([True, False]))
+        np.testing.assert_allclose(prices, [10.4506, 5.5735], rtol=1e-4)
+
+    def test_invalid_option_type(self):
+        with self.assertRaises(ValueError):
+            black_scholes_price(100, 100, 1, 0.05, 0.2, "straddle")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import io
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.export import (cube_batches, export_bytes, iter_export, surface_axes,
+                        write_export)
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.S_range = np.linspace(50, 150, 7)
+        self.K_range = np.linspace(60, 140, 5)
+        self.surface = np.arange(35.0).reshape(7, 5) - 10
+        self.axes = surface_axes(self.S_range, self.K_range)
+
+    def test_wide_csv_matches_to_csv(self):
+        expected = pd.DataFrame(self.surface, index=self.S_range,
+                                columns=self.K_range).to_csv(index=True)
+        chunks = list(iter_export(self.surface, self.axes, "csv",
+                                  chunk_rows=3))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(b"".join(chunks).decode(), expected)
+
+    def test_long_layout_batches(self):
+        batches = list(cube_batches(self.surface, self.axes, chunk_rows=10))
+        self.assertEqual([batch.num_rows for batch in batches],
+                         [10, 10, 10, 5])
+        table = pa.Table.from_batches(batches).to_pandas()
+        self.assertEqual(list(table.columns), ["S", "K", "PnL"])
+        row = table.iloc[7]  # second row, third column of the surface
+        self.assertEqual((row.S, row.K, row.PnL),
+                         (self.S_range[1], self.K_range[2],
+                          self.surface[1, 2]))
+
+    def test_arrow_round_trip(self):
+        data = export_bytes(self.surface, self.axes, "arrow", chunk_rows=4)
+        table = pa.ipc.open_stream(data).read_all()
+        np.testing.assert_array_equal(table["PnL"].to_numpy(),
+                                      self.surface.ravel())
+
+    def test_parquet_cube_to_file(self):
+        cube = np.random.default_rng(0).normal(size=(3, 4, 2, 5))
+        axes = {"spot": np.arange(3), "vol": np.arange(4),
+                "rate": np.arange(2), "time": np.arange(5)}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "cube.parquet")
+            write_export(cube, axes, path, "parquet", chunk_rows=16)
+            table = pq.read_table(path)
+        self.assertEqual(table.num_rows, cube.size)
+        np.testing.assert_array_equal(table["PnL"].to_numpy(), cube.ravel())
+        self.assertEqual(table["time"].to_numpy()[:6].tolist(),
+                         [0, 1, 2, 3, 4, 0])
+
+    def test_long_csv_for_cubes(self):
+        cube = np.arange(8.0).reshape(2, 2, 2)
+        axes = {"a": [0, 1], "b": [0, 1], "c": [0, 1]}
+        sink = io.BytesIO()
+        write_export(cube, axes, sink, "csv", chunk_rows=3)
+        frame = pd.read_csv(io.BytesIO(sink.getvalue()))
+        self.assertEqual(frame["PnL"].tolist(), list(range(8)))
+
+    def test_empty_cube(self):
+        cube = np.empty((3, 0, 2))
+        axes = {"spot": [-0.1, 0.0, 0.1], "vol": [], "rate": [0.0, 0.01]}
+        for fmt in ("arrow", "parquet", "csv"):
+            data = export_bytes(cube, axes, fmt)
+            if fmt == "arrow":
+                table = pa.ipc.open_stream(data).read_all()
+            elif fmt == "parquet":
+                table = pq.read_table(io.BytesIO(data))
+            else:
+                self.assertEqual(data, b'"spot","vol","rate","PnL"\n')
+                continue
+            self.assertEqual(table.num_rows, 0)
+            self.assertEqual(table.column_names,
+                             ["spot", "vol", "rate", "PnL"])
+
+        empty_surface = export_bytes(np.empty((0, 5)),
+                                     surface_axes([], self.K_range), "csv")
+        self.assertEqual(empty_surface.decode(),
+                         pd.DataFrame(np.empty((0, 5)),
+                                      columns=self.K_range).to_csv())
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            export_bytes(self.surface, self.axes, "xlsx")
+
+
+if __name__ == "__main__":
+    unittest.main()
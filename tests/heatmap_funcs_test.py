@@ -1,6 +1,9 @@
 import unittest
 import numpy as np
-from src.heatmap_funcs import dynamic_annotation_format
+import seaborn as sns
+from src.heatmap_funcs import (dynamic_annotation_format, format_annotations,
+                               render_heatmap_image, render_seaborn_heatmap,
+                               heatmap_chart, significant_annotation_format)
 
 class TestHeatmapFunctions(unittest.TestCase):
 
@@ -17,5 +20,63 @@ class TestHeatmapFunctions(unittest.TestCase):
         expected_annotations = [["100.0", "200.0"], ["300.0", "-400.0"]]
         self.assertEqual(annotations, expected_annotations)
 
+    def test_format_annotations_matches_dynamic_format(self):
+        data = np.array([[1_500_000, -2_345_678, 10_000, -999.96],
+                         [250.5, -50, 0.04, 999_999]])
+        expected = [[dynamic_annotation_format(value) for value in row]
+                    for row in data]
+        self.assertEqual(format_annotations(data).tolist(), expected)
+
+    def test_format_annotations_custom_function(self):
+        data = np.array([[1.0, 2.0]])
+        self.assertEqual(format_annotations(data, lambda v: f"{v:.0f}")
+                         .tolist(), [["1", "2"]])
+
+    def test_significant_annotation_format(self):
+        # greeks keep their resolution, e.g. a gamma of 0.0187
+        data = np.array([[0.018734, -0.5123, 43.219, 1e-5]])
+        self.assertEqual(format_annotations(data,
+                                            significant_annotation_format)
+                         .tolist(), [["0.0187", "-0.512", "43.2", "1e-05"]])
+
+    def test_render_heatmap_image(self):
+        cmap = sns.diverging_palette(0, 145, as_cmap=True)
+        colors = cmap(np.linspace(0, 1, 256))
+        surface = np.outer(np.linspace(-5, 5, 200), np.ones(200))
+        labels = np.linspace(50, 150, 200)
+        png = render_heatmap_image(surface, labels, labels, colors)
+        self.assertTrue(png.startswith(b"\x89PNG"))
+
+        small = surface[:5, :5]
+        annotated = render_heatmap_image(small, labels[:5], labels[:5],
+                                         colors, format_annotations(small))
+        self.assertTrue(annotated.startswith(b"\x89PNG"))
+
+    def test_render_seaborn_heatmap(self):
+        cmap = sns.diverging_palette(0, 145, as_cmap=True)
+        colors = cmap(np.linspace(0, 1, 256))
+        surface = np.outer(np.linspace(-5, 5, 50), np.ones(50))
+        labels = np.linspace(50, 150, 50)
+        png = render_seaborn_heatmap(surface, labels, labels, colors)
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        small = surface[:5, :5]
+        annotated = render_seaborn_heatmap(small, labels[:5], labels[:5],
+                                           colors, format_annotations(small))
+        self.assertTrue(annotated.startswith(b"\x89PNG"))
+
+    def test_heatmap_chart(self):
+        cmap = sns.diverging_palette(0, 145, as_cmap=True)
+        surface = np.arange(12.0).reshape(3, 4)
+        chart = heatmap_chart(surface, np.arange(4.0), np.arange(3.0), cmap,
+                              dynamic_annotation_format)
+        self.assertEqual(len(chart.data), 12)
+        self.assertEqual(chart.to_dict()["encoding"]["color"]["title"],
+                         "PnL ($)")
+        gamma = heatmap_chart(surface, np.arange(4.0), np.arange(3.0), cmap,
+                              dynamic_annotation_format, value_title="Gamma")
+        encoding = gamma.to_dict()["encoding"]
+        self.assertEqual(encoding["color"]["title"], "Gamma")
+        self.assertEqual(encoding["tooltip"][2]["title"], "Gamma")
+
 if __name__ == "__main__":
     unittest.main()
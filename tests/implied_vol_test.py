@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+from src.option import Option
+from src.batch_pricer import black_scholes_price
+from src.implied_vol import implied_volatility
+
+
+class TestImpliedVolatility(unittest.TestCase):
+
+    def test_round_trip_chain(self):
+        rng = np.random.default_rng(1)
+        n = 5000
+        S = 100.0
+        K = rng.uniform(60, 140, n)
+        T = rng.uniform(0.05, 2, n)
+        vols = rng.uniform(0.05, 1.0, n)
+        types = np.where(rng.random(n) < 0.5, "call", "put")
+        prices = black_scholes_price(S, K, T, 0.03, vols, types)
+
+        results = implied_volatility(prices, S, K, T, 0.03, types)
+        solved = results["Converged"]
+        self.assertGreater(solved.mean(), 0.99)
+        np.testing.assert_allclose(
+            black_scholes_price(S, K[solved], T[solved], 0.03,
+                                results["Vol"][solved], types[solved]),
+            prices[solved], atol=1e-7)
+        self.assertTrue(np.all(results["Iterations"][solved] > 0))
+
+    def test_matches_option_price(self):
+        price = Option(100, 110, 0.5, 0.05, 0.35, "put").black_scholes_price()
+        results = implied_volatility(price, 100, 110, 0.5, 0.05, "put")
+        self.assertTrue(results["Converged"])
+        self.assertAlmostEqual(float(results["Vol"]), 0.35, places=6)
+
+    def test_deep_out_of_the_money_uses_fallback(self):
+        price = black_scholes_price(100, 300, 0.1, 0.05, 0.6, "call")
+        results = implied_volatility(price, 100, 300, 0.1, 0.05, "call",
+                                     tol=1e-14)
+        self.assertTrue(results["Converged"])
+        self.assertAlmostEqual(float(results["Vol"]), 0.6, places=4)
+
+    def test_fallback_converged_means_price_within_tol(self):
+        # with a vega of several hundred, a vol within tol of the root would
+        # still be several tol away in price
+        K = np.linspace(800, 1200, 9)
+        prices = black_scholes_price(1000, K, 2.0, 0.03,
+                                     np.linspace(0.15, 0.45, 9), "call")
+        results = implied_volatility(prices, 1000, K, 2.0, 0.03, "call",
+                                     tol=1e-3, max_iter=0)
+        errors = np.abs(black_scholes_price(1000, K, 2.0, 0.03,
+                                            results["Vol"], "call") - prices)
+        np.testing.assert_array_equal(results["Converged"], errors < 1e-3)
+        self.assertTrue(results["Converged"].all())
+
+    def test_prices_outside_arbitrage_bounds(self):
+        # a call is worth less than the spot and more than its intrinsic
+        results = implied_volatility([150.0, 1.0], 100, [100, 50], 1, 0.0,
+                                     "call")
+        self.assertFalse(results["Converged"].any())
+        self.assertTrue(np.isnan(results["Vol"]).all())
+        self.assertEqual(results["Iterations"].tolist(), [0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+from unittest import mock
+import numpy as np
+from src import kernels
+from src.batch_pricer import black_scholes_price, price_and_greeks
+
+
+class TestKernels(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        size = 40_000  # more than one numpy block
+        self.S = rng.uniform(50, 150, size)
+        self.K = rng.uniform(50, 150, size)
+        self.T = rng.uniform(0.05, 2, size)
+        self.vol = rng.uniform(0.05, 0.6, size)
+        self.is_call = rng.random(size) < 0.5
+        self.expected = price_and_greeks(self.S, self.K, self.T, 0.04,
+                                         self.vol, self.is_call)
+
+    def test_fused_loop_matches_batch_pricer(self):
+        # the plain Python version of the loop numba compiles
+        size = 500
+        inputs = [x[:size] for x in (self.S, self.K, self.T)]
+        out = [np.empty(size) for _ in kernels.VALUE_NAMES]
+        kernels.fused_price_and_greeks(*inputs, np.full(size, 0.04),
+                                       self.vol[:size], self.is_call[:size],
+                                       *out)
+        for name, values in zip(kernels.VALUE_NAMES, out):
+            np.testing.assert_allclose(values, self.expected[name][:size],
+                                       rtol=1e-10, atol=1e-12)
+
+        price = np.empty(size)
+        kernels.fused_price(*inputs, np.full(size, 0.04), self.vol[:size],
+                            self.is_call[:size], price)
+        np.testing.assert_allclose(price, self.expected["Price"][:size],
+                                   rtol=1e-10, atol=1e-12)
+
+    def test_numpy_backend_writes_into_buffers(self):
+        out = {name: np.empty(self.S.shape) for name in kernels.VALUE_NAMES}
+        results = kernels.price_and_greeks(self.S, self.K, self.T, 0.04,
+                                           self.vol, self.is_call, out=out,
+                                           backend="numpy")
+        for name in kernels.VALUE_NAMES:
+            self.assertIs(results[name], out[name])
+            np.testing.assert_array_equal(out[name], self.expected[name])
+
+        price = np.empty(self.S.shape)
+        kernels.black_scholes_price(self.S, self.K, self.T, 0.04, self.vol,
+                                    self.is_call, out=price, backend="numpy")
+        np.testing.assert_array_equal(price, self.expected["Price"])
+
+    def test_broadcasting(self):
+        S = np.linspace(80, 120, 5)[:, None]
+        K = np.linspace(90, 110, 3)
+        prices = kernels.black_scholes_price(S, K, 1.0, 0.05, 0.2, "put",
+                                             backend="numpy")
+        np.testing.assert_array_equal(
+            prices, black_scholes_price(S, K, 1.0, 0.05, 0.2, "put"))
+        with self.assertRaises(ValueError):
+            kernels.black_scholes_price(S, K, 1.0, 0.05, 0.2,
+                                        out=np.empty(15), backend="numpy")
+
+    def test_partially_broadcast_inputs_across_blocks(self):
+        # S varies along the rows, K along the columns and T (transposed,
+        # so not contiguous) along both; blocks cut through the rows
+        S = np.linspace(80, 120, 7)[:, None]
+        K = np.linspace(90, 110, 5)
+        T = np.linspace(0.2, 2, 35).reshape(5, 7).T
+        expected = price_and_greeks(S, K, T, 0.05, 0.2, "call")
+        with mock.patch.object(kernels, "BLOCK_SIZE", 4):
+            results = kernels.price_and_greeks(S, K, T, 0.05, 0.2, "call",
+                                               backend="numpy")
+            prices = kernels.black_scholes_price(S, K, T, 0.05, 0.2,
+                                                 backend="numpy")
+        for name in kernels.VALUE_NAMES:
+            np.testing.assert_allclose(results[name], expected[name],
+                                       rtol=1e-12, atol=1e-14)
+        np.testing.assert_allclose(prices, expected["Price"], rtol=1e-12)
+
+        shape, inputs = kernels._flat_inputs(S, K, T, 0.05, 0.2, "call")
+        self.assertEqual(shape, (7, 5))
+        self.assertEqual([data.size for data, _ in inputs],
+                         [7, 5, 35, 1, 1, 1])
+
+    def test_backend_selection(self):
+        with self.assertRaises(ValueError):
+            kernels.set_backend("cuda")
+        kernels.set_backend("numpy")
+        try:
+            self.assertEqual(kernels.get_backend(), "numpy")
+        finally:
+            kernels.set_backend("auto")
+        expected = "numba" if kernels.numba_available() else "numpy"
+        self.assertEqual(kernels.get_backend(), expected)
+        if not kernels.numba_available():
+            with self.assertRaises(ImportError):
+                kernels.price_and_greeks(100.0, 100.0, 1.0, 0.05, 0.2,
+                                         backend="numba")
+
+    @unittest.skipUnless(kernels.numba_available(), "numba not installed")
+    def test_numba_backend(self):
+        results = kernels.price_and_greeks(self.S, self.K, self.T, 0.04,
+                                           self.vol, self.is_call,
+                                           backend="numba")
+        for name in kernels.VALUE_NAMES:
+            np.testing.assert_allclose(results[name], self.expected[name],
+                                       rtol=1e-10, atol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
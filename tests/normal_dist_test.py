@@ -0,0 +1,127 @@
+import os
+import subprocess
+import sys
+import unittest
+import unittest.mock
+import numpy as np
+from scipy.special import ndtr
+from scipy.stats import norm
+from src import batch_pricer
+from src import normal_dist
+from src.normal_dist import norm_cdf, norm_cdf_array, norm_pdf
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def modules_loaded_by(module):
+    """
+    :return: set of heavy modules loaded by importing module from src
+    """
+    code = (f"import sys; sys.path.insert(0, 'src'); import {module}; "
+            f"print(' '.join(name for name in ('numpy', 'scipy', "
+            f"'streamlit', 'matplotlib', 'seaborn', 'requests') "
+            f"if name in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    return set(output.stdout.split())
+
+
+class TestNormalDist(unittest.TestCase):
+
+    def test_scalar_functions_match_scipy(self):
+        for x in (-38.0, -8.5, -1.3, 0.0, 0.2, 2.7, 9.0):
+            self.assertAlmostEqual(norm_cdf(x), norm.cdf(x), places=15)
+            self.assertAlmostEqual(norm_pdf(x), norm.pdf(x), places=15)
+        # deep tails keep their relative precision
+        self.assertAlmostEqual(norm_cdf(-20.0) / norm.cdf(-20.0), 1.0,
+                               places=12)
+
+    def test_array_cdf(self):
+        x = np.linspace(-10, 10, 101).reshape(101, 1)
+        np.testing.assert_allclose(norm_cdf_array(x), ndtr(x), rtol=1e-13)
+
+    def test_array_cdf_without_scipy(self):
+        x = np.linspace(-10, 10, 12).reshape(3, 4)
+        normal_dist._array_cdf = None
+        try:
+            with unittest.mock.patch.dict(sys.modules,
+                                          {"scipy.special": None}):
+                result = norm_cdf_array(x)
+        finally:
+            normal_dist._array_cdf = None
+        self.assertEqual(result.dtype, np.float64)
+        np.testing.assert_allclose(result, ndtr(x), rtol=1e-13)
+
+    def test_table_error_within_guarantee(self):
+        x = np.concatenate([np.linspace(-12, 12, 480_000),
+                            np.random.default_rng(0).normal(0, 3, 100_000)])
+        for max_error in (1e-4, 1e-7, 1e-10):
+            table = normal_dist.NormalTable(max_error)
+            self.assertLessEqual(np.abs(table.cdf(x) - ndtr(x)).max(),
+                                 max_error)
+        self.assertEqual(table.cdf(x.reshape(-1, 2)).shape, (290_000, 2))
+
+    def test_table_backend_prices(self):
+        args = (np.linspace(50, 150, 201), 100.0, 1.0, 0.05, 0.2, "call")
+        exact = batch_pricer.price_and_greeks(*args)
+        normal_dist.set_array_backend("table", max_error=1e-8)
+        try:
+            self.assertEqual(normal_dist.get_array_backend(), "table")
+            approximate = batch_pricer.price_and_greeks(*args)
+        finally:
+            normal_dist.set_array_backend("auto")
+        self.assertFalse(np.array_equal(approximate["Price"], exact["Price"]))
+        # price error is at most (S + K) * max_error
+        np.testing.assert_allclose(approximate["Price"], exact["Price"],
+                                   rtol=0, atol=3e-6)
+        np.testing.assert_allclose(approximate["Delta"], exact["Delta"],
+                                   rtol=0, atol=1e-8)
+
+    def test_nan_and_scalar_inputs(self):
+        x = np.array([np.nan, -np.inf, -1.5, 0.0, 2.0, np.inf])
+        for backend in ("scipy", "erf", "table"):
+            normal_dist.set_array_backend(backend)
+            try:
+                result = norm_cdf_array(x)
+                scalar = norm_cdf_array(np.float64(0.3))
+            finally:
+                normal_dist.set_array_backend("auto")
+            np.testing.assert_allclose(result, ndtr(x), rtol=0, atol=1e-7)
+            self.assertAlmostEqual(float(scalar), ndtr(0.3), places=7)
+
+    def test_table_backend_expired_legs(self):
+        # legs decayed past expiry give NaN d1 before taking their
+        # intrinsic value
+        from src import portfolio
+        from src import scenario_engine
+
+        book = portfolio.Portfolio(["call", "put"], 100, [90, 110], 1.0, 0.2,
+                                   [1, 1], [12.0, 8.0], r=0.05)
+        expected = scenario_engine.run_scenarios(book, [0.0], [0.0], [0.0],
+                                                 [0.0, 2.0], max_workers=1)
+        normal_dist.set_array_backend("table")
+        try:
+            cube = scenario_engine.run_scenarios(book, [0.0], [0.0], [0.0],
+                                                 [0.0, 2.0], max_workers=1)
+        finally:
+            normal_dist.set_array_backend("auto")
+        np.testing.assert_allclose(cube, expected, atol=1e-5)
+        self.assertAlmostEqual(cube[0, 0, 0, 1], 0.0)
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            normal_dist.set_array_backend("lookup")
+        with self.assertRaises(ValueError):
+            normal_dist.set_array_backend("table", max_error=0.0)
+        self.assertEqual(normal_dist.get_array_backend(), "auto")
+
+    def test_core_imports_stay_light(self):
+        self.assertEqual(modules_loaded_by("option"), set())
+        self.assertEqual(modules_loaded_by("batch_pricer"), {"numpy"})
+        self.assertEqual(modules_loaded_by("heatmap_funcs"), {"numpy"})
+        self.assertEqual(modules_loaded_by("risk_free_rate_fetcher"),
+                         {"numpy"})
+
+
+if __name__ == "__main__":
+    unittest.main()
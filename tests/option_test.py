@@ -50,6 +50,18 @@ class TestOption(unittest.TestCase):
         self.assertIn("Theta", greeks)
         self.assertIn("Rho", greeks)
 
+    def test_price_and_greeks(self):
+        for option in (self.call_option, self.put_option):
+            results = option.price_and_greeks()
+            self.assertEqual(results.pop("Price"), option.black_scholes_price())
+            self.assertEqual(results, option.get_greeks())
+
+    def test_terms_computed_once(self):
+        terms = self.call_option.get_terms()
+        self.call_option.price_and_greeks()
+        self.assertIs(self.call_option.get_terms(), terms)
+        self.assertTrue(isclose(terms.cdf_d1 + terms.cdf_neg_d1, 1.0))
+
 
 if __name__ == "__main__":
     unittest.main()
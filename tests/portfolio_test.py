@@ -0,0 +1,91 @@
+import io
+import unittest
+import numpy as np
+from src.option import Option
+from src.portfolio import Portfolio
+from src.scenario_engine import run_scenarios
+
+
+class TestPortfolio(unittest.TestCase):
+
+    def setUp(self):
+        # bull call spread plus a protective put
+        self.portfolio = Portfolio(["call", "call", "put"], 100,
+                                   [95, 105, 90], 1, 0.2, [1, -1, 2],
+                                   [9.0, 4.0, 2.0], r=0.05)
+
+    def expected_totals(self, S, vols, r):
+        totals = dict.fromkeys(["Price", "PnL", "Delta", "Gamma", "Vega",
+                                "Theta", "Rho"], 0.0)
+        legs = [("call", 95, 1, 9.0), ("call", 105, -1, 4.0),
+                ("put", 90, 2, 2.0)]
+        for (option_type, K, quantity, cost), leg_S, leg_vol in zip(legs, S,
+                                                                  vols):
+            option = Option(leg_S, K, 1, r, leg_vol, option_type)
+            values = option.price_and_greeks()
+            for name, value in values.items():
+                totals[name] += quantity * value
+            totals["PnL"] += quantity * (values["Price"] - cost)
+        return totals
+
+    def assertTotals(self, expected):
+        for name, value in expected.items():
+            self.assertAlmostEqual(self.portfolio.totals[name], value)
+
+    def test_totals_match_options(self):
+        self.assertTotals(self.expected_totals([100] * 3, [0.2] * 3, 0.05))
+
+    def test_incremental_leg_update(self):
+        self.portfolio.update_legs(2, S=98, vol=0.3)
+        self.assertTotals(self.expected_totals([100, 100, 98],
+                                               [0.2, 0.2, 0.3], 0.05))
+        self.portfolio.update_legs(np.array([True, False, False]),
+                                   quantity=3)
+        self.assertAlmostEqual(self.portfolio.legs["quantity"][0], 3)
+        totals = dict(self.portfolio.totals)
+        self.portfolio.reprice()
+        for name, value in totals.items():
+            self.assertAlmostEqual(self.portfolio.totals[name], value)
+
+    def test_repeated_legs_rejected(self):
+        totals = dict(self.portfolio.totals)
+        for index in ([2, 2], [0, -3]):
+            with self.assertRaises(ValueError):
+                self.portfolio.update_legs(index, S=98)
+        self.assertEqual(self.portfolio.totals, totals)
+        self.portfolio.update_legs([-1, 0], S=[98, 100])
+        self.assertTotals(self.expected_totals([100, 100, 98],
+                                               [0.2] * 3, 0.05))
+
+    def test_market_update(self):
+        self.portfolio.update_market(S=110)
+        self.assertTotals(self.expected_totals([110] * 3, [0.2] * 3, 0.05))
+        self.portfolio.update_market(r=0.02, vol=0.25)
+        self.assertTotals(self.expected_totals([110] * 3, [0.25] * 3, 0.02))
+
+    def test_pnl_surface(self):
+        surface = self.portfolio.pnl_surface([-0.1, 0.0, 0.1], [0.0, 0.05])
+        self.assertEqual(surface.shape, (3, 2))
+        self.assertAlmostEqual(surface[1, 0], self.portfolio.totals["PnL"])
+        expected = self.expected_totals([110] * 3, [0.25] * 3, 0.05)["PnL"]
+        self.assertAlmostEqual(surface[2, 1], expected)
+
+    def test_pnl_surface_floors_vol_like_scenario_engine(self):
+        vol_moves = [-0.3, -0.2, 0.0]  # the first two wipe out all the vol
+        surface = self.portfolio.pnl_surface([-0.1, 0.1], vol_moves)
+        self.assertFalse(np.any(np.isnan(surface)))
+        np.testing.assert_allclose(
+            surface, run_scenarios(self.portfolio, [-0.1, 0.1], vol_moves,
+                                   max_workers=1)[:, :, 0, 0])
+        np.testing.assert_allclose(surface[:, 0], surface[:, 1])
+
+    def test_csv_round_trip(self):
+        buffer = io.StringIO(self.portfolio.to_frame().to_csv(index=False))
+        reloaded = Portfolio.from_csv(buffer, r=0.05)
+        self.assertEqual(len(reloaded), 3)
+        self.assertAlmostEqual(reloaded.totals["PnL"],
+                               self.portfolio.totals["PnL"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+import numpy as np
+from src import batch_pricer
+from src.option import Option
+from src.pricing_engines import (BinomialEngine, BlackScholesEngine,
+                                 MonteCarloEngine, make_engine)
+from src.surface import price_surfaces
+from src.vol_surface import VolSurface
+
+
+class TestPricingEngines(unittest.TestCase):
+
+    def setUp(self):
+        self.K = np.array([80.0, 100.0, 120.0])
+        self.calls = batch_pricer.black_scholes_price(100, self.K, 1.0, 0.05,
+                                                      0.2, "call")
+        self.puts = batch_pricer.black_scholes_price(100, self.K, 1.0, 0.05,
+                                                     0.2, "put")
+
+    def test_black_scholes_engine(self):
+        prices = BlackScholesEngine().price(100, self.K[:, None], 1.0, 0.05,
+                                            0.2, ["call", "put"])
+        np.testing.assert_allclose(prices[:, 0], self.calls)
+        np.testing.assert_allclose(prices[:, 1], self.puts)
+
+    def test_binomial_european_converges(self):
+        engine = BinomialEngine(steps=1000)
+        np.testing.assert_allclose(
+            engine.price(100, self.K, 1.0, 0.05, 0.2, "call"), self.calls,
+            atol=5e-3)
+        np.testing.assert_allclose(
+            engine.price(100, self.K, 1.0, 0.05, 0.2, "put"), self.puts,
+            atol=5e-3)
+
+    def test_binomial_american(self):
+        engine = BinomialEngine(steps=1000, exercise="american")
+        # no dividends: early exercise of a call is never optimal
+        np.testing.assert_allclose(
+            engine.price(100, self.K, 1.0, 0.05, 0.2, "call"), self.calls,
+            atol=5e-3)
+        puts = engine.price(100, self.K, 1.0, 0.05, 0.2, "put")
+        self.assertTrue(np.all(puts > self.puts))
+        self.assertTrue(np.all(puts >= np.maximum(self.K - 100, 0)))
+        # reference value of the at-the-money American put
+        self.assertAlmostEqual(puts[1], 6.09, places=2)
+        # expired contracts take their intrinsic value
+        self.assertEqual(engine.price(90, 100, 0.0, 0.05, 0.2, "put"), 10.0)
+
+    def test_monte_carlo_matches_closed_form(self):
+        engine = MonteCarloEngine(num_paths=200_000, seed=7)
+        for option_type, expected in (("call", self.calls),
+                                      ("put", self.puts)):
+            prices, errors = engine.price_and_error(100, self.K, 1.0, 0.05,
+                                                    0.2, option_type)
+            self.assertTrue(np.all(np.abs(prices - expected) < 4 * errors))
+            self.assertTrue(np.all(errors < 0.01))
+
+    def test_variance_reduction(self):
+        plain = MonteCarloEngine(num_paths=50_000, antithetic=False,
+                                 control_variate=False, seed=1)
+        reduced = MonteCarloEngine(num_paths=50_000, seed=1)
+        _, plain_errors = plain.price_and_error(100, self.K, 1.0, 0.05, 0.2)
+        _, errors = reduced.price_and_error(100, self.K, 1.0, 0.05, 0.2)
+        self.assertTrue(np.all(errors < plain_errors / 3))
+
+    def test_seeded_results_do_not_depend_on_workers(self):
+        serial = MonteCarloEngine(num_paths=40_000, chunk_paths=8192, seed=3)
+        pooled = MonteCarloEngine(num_paths=40_000, chunk_paths=8192, seed=3,
+                                  max_workers=2)
+        np.testing.assert_array_equal(
+            serial.price(100, self.K, 1.0, 0.05, 0.2),
+            pooled.price(100, self.K, 1.0, 0.05, 0.2))
+
+    def test_asian_payoff(self):
+        engine = MonteCarloEngine(num_paths=100_000, payoff="asian", seed=5)
+        prices, errors = engine.price_and_error(100, 100, 1.0, 0.05, 0.2)
+        # averaging lowers the volatility of the fixing
+        self.assertLess(prices, self.calls[1])
+        # geometric-average closed form (52 fixings) bounds it from below
+        n = 52
+        vol_g = 0.2 * np.sqrt((n + 1) * (2 * n + 1) / (6 * n ** 2))
+        drift_g = 0.5 * (0.05 - 0.5 * 0.2 ** 2) * (n + 1) / n \
+            + 0.5 * vol_g ** 2
+        geometric = np.exp(-0.05) * batch_pricer.black_scholes_price(
+            100 * np.exp(drift_g), 100, 1.0, 0.0, vol_g)
+        self.assertGreater(prices, geometric)
+        self.assertLess(prices - geometric, 0.5)
+
+    def test_option_and_surfaces_accept_engines(self):
+        option = Option(100, 100, 1.0, 0.05, 0.2, "put")
+        engine = BinomialEngine(steps=200, exercise="american")
+        self.assertEqual(option.price(), option.black_scholes_price())
+        self.assertIsInstance(option.price(engine), float)
+        self.assertGreater(option.price(engine), option.price())
+
+        S_range = np.linspace(80, 120, 5)
+        K_range = np.linspace(90, 110, 3)
+        smile = VolSurface([90, 110], [0.5, 1.0], [[0.25, 0.2], [0.24, 0.2]])
+        calls, puts = price_surfaces(S_range, K_range, [0.5, 1.0], 0.05,
+                                     smile, engine=engine)
+        self.assertEqual(puts.shape, (2, 5, 3))
+        self.assertAlmostEqual(
+            puts[1, 2, 1], Option(100, 100, 1.0, 0.05, smile, "put")
+            .price(engine))
+        expected, _ = price_surfaces(S_range, K_range, [0.5, 1.0], 0.05,
+                                     smile)
+        np.testing.assert_allclose(calls, expected, atol=0.02)
+
+    def test_expired_contracts_are_intrinsic(self):
+        T = np.array([-0.5, 0.0])
+        expected = np.maximum(self.K[:, None] - 100, 0.0)
+        prices, errors = MonteCarloEngine(num_paths=1000, seed=1) \
+            .price_and_error(100, self.K[:, None], T, 0.05, 0.2, "put")
+        np.testing.assert_allclose(prices, np.broadcast_to(expected, (3, 2)))
+        np.testing.assert_array_equal(errors, 0.0)
+        np.testing.assert_allclose(
+            BinomialEngine(50).price(100, self.K[:, None], T, 0.05, 0.2,
+                                     "put"), prices)
+
+    def test_invalid_engines(self):
+        with self.assertRaises(ValueError):
+            make_engine("trinomial")
+        with self.assertRaises(ValueError):
+            make_engine("binomial", exercise="bermudan")
+        with self.assertRaises(ValueError):
+            MonteCarloEngine(payoff="barrier")
+        with self.assertRaises(ValueError):
+            BinomialEngine().price(100, 100, 1.0, 0.05, 0.2, "straddle")
+        # exp(r * dt) above up: the tree would price this at -26940.9
+        with self.assertRaisesRegex(ValueError, "at least 2500 steps"):
+            BinomialEngine(5).price(100, 100, 1.0, 0.5, 0.01)
+        self.assertGreater(BinomialEngine(2500).price(100, 100, 1.0, 0.5,
+                                                      0.01), 0)
+        with self.assertRaises(ValueError):
+            BinomialEngine().price(100, 100, 1.0, 0.05, 0.0)
+        self.assertIsInstance(make_engine("monte_carlo", seed=1),
+                              MonteCarloEngine)
+
+
+if __name__ == "__main__":
+    unittest.main()
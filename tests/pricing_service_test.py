@@ -0,0 +1,96 @@
+import asyncio
+import json
+import unittest
+from src.option import Option
+from src.pricing_service import (MicroBatcher, PricingClient, PricingService,
+                                 parse_contract)
+
+
+class TestPricingService(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.service = PricingService(max_batch_size=16, max_wait_ms=20)
+        self.host, self.port = await self.service.start(port=0)
+        self.client = await PricingClient.connect(self.host, self.port)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.service.stop()
+
+    async def test_concurrent_requests_are_batched(self):
+        strikes = [80.0 + i for i in range(40)]
+        replies = await asyncio.gather(*(
+            self.client.price(100.0, K, 1.0, 0.05, 0.2, "put")
+            for K in strikes))
+        for K, reply in zip(strikes, replies):
+            expected = Option(100.0, K, 1.0, 0.05, 0.2, "put")
+            self.assertAlmostEqual(reply["Price"],
+                                   expected.black_scholes_price())
+            self.assertAlmostEqual(reply["Vega"], expected.get_vega())
+        batcher = self.service.batcher
+        self.assertEqual(batcher.contracts, 40)
+        self.assertEqual(batcher.batches, 3)  # 16 + 16 + 8
+
+    async def test_invalid_requests(self):
+        with self.assertRaises(ValueError):
+            await self.client.price(100.0, 100.0, 1.0, 0.05, 0.2, "swap")
+
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(b'{"id": 7, "S": 100}\n')
+        reply = json.loads(await reader.readline())
+        writer.close()
+        self.assertEqual(reply["id"], 7)
+        self.assertIn("error", reply)
+
+    async def test_non_finite_values_are_null(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(b'{"id": 1, "S": 100, "K": 100, "T": 0, "vol": 0.2}\n'
+                     b'{"id": NaN, "S": 100, "K": 100, "T": 1, "vol": 0.2}\n')
+        lines = [await reader.readline() for _ in range(2)]
+        writer.close()
+        # strict parsers reject the bare NaN and Infinity tokens
+        replies = [json.loads(line, parse_constant=self.reject_constant)
+                   for line in lines]
+        expired = next(reply for reply in replies if reply["id"] == 1)
+        self.assertIsNone(expired["Gamma"])
+        nan_id = next(reply for reply in replies if reply["id"] is None)
+        self.assertIn("error", nan_id)
+
+    def reject_constant(self, token):
+        self.fail(f"Reply is not strict JSON: {token}")
+
+    async def test_half_closed_connection_gets_replies(self):
+        # e.g. `echo ... | nc`: the requests are followed by end of file
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        for request_id in range(3):
+            writer.write(json.dumps({
+                "id": request_id, "S": 100, "K": 90 + 10 * request_id,
+                "T": 1, "vol": 0.2}).encode() + b"\n")
+        writer.write_eof()
+        replies = [json.loads(line) for line in
+                   (await asyncio.wait_for(reader.read(), 5)).splitlines()]
+        writer.close()
+        self.assertEqual(sorted(reply["id"] for reply in replies), [0, 1, 2])
+        for reply in replies:
+            expected = Option(100, 90 + 10 * reply["id"], 1, 0.05, 0.2)
+            self.assertAlmostEqual(reply["Price"],
+                                   expected.black_scholes_price())
+
+
+class TestMicroBatcher(unittest.IsolatedAsyncioTestCase):
+
+    async def test_wait_limit_closes_partial_batches(self):
+        batcher = MicroBatcher(max_batch_size=100, max_wait_ms=1)
+        task = asyncio.create_task(batcher.run())
+        try:
+            contract = parse_contract({"S": 100, "K": 100, "T": 1,
+                                       "vol": 0.2})
+            reply = await asyncio.wait_for(batcher.price(contract), 1)
+        finally:
+            task.cancel()
+        self.assertAlmostEqual(reply["Price"], 10.4506, places=4)
+        self.assertEqual(batcher.batches, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
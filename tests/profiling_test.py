@@ -0,0 +1,113 @@
+import json
+import threading
+import unittest
+import numpy as np
+from src import profiling
+from src.profiling import Profiler
+from src.quote_provider import QuoteProvider, StaticQuoteBackend
+from src.surface import price_surfaces
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        self.now += 1_000_000  # every reading is 1 ms after the previous
+        return self.now
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = Profiler(enabled=True, timer=FakeTimer())
+
+    def test_disabled_records_nothing(self):
+        profiler = Profiler(enabled=False)
+        with profiler.stage("a"):
+            profiler.count("calls")
+        self.assertIs(profiler.stage("b"), profiling._NULL_STAGE)
+        self.assertEqual(profiler.events, [])
+        self.assertEqual(profiler.counters, {})
+
+    def test_summary_and_counters(self):
+        for _ in range(2):
+            with self.profiler.stage("outer"):
+                with self.profiler.stage("inner", cells=4):
+                    self.profiler.count("cells", 4)
+        summary = self.profiler.summary()
+        self.assertEqual(list(summary), ["inner", "outer"])
+        self.assertEqual(summary["inner"]["Calls"], 2)
+        self.assertAlmostEqual(summary["inner"]["Mean ms"], 2.0)
+        self.assertAlmostEqual(summary["outer"]["Total ms"], 8.0)
+        self.assertEqual(self.profiler.counters, {"cells": 8})
+
+        self.profiler.start_run()
+        self.assertEqual(self.profiler.summary(), {})
+
+    def test_exports(self):
+        with self.profiler.stage("fetch", tickers=2):
+            self.profiler.count("requests")
+        data = json.loads(self.profiler.export("json"))
+        self.assertEqual(data["counters"], {"requests": 1})
+        self.assertEqual(data["events"][0]["args"], {"tickers": 2})
+        self.assertAlmostEqual(data["events"][0]["duration_ms"], 2.0)
+
+        events = json.loads(self.profiler.export("chrome"))["traceEvents"]
+        phases = sorted(event["ph"] for event in events)
+        self.assertEqual(phases, ["C", "M", "X"])
+        complete = next(event for event in events if event["ph"] == "X")
+        self.assertEqual(complete["name"], "fetch")
+        self.assertAlmostEqual(complete["ts"], 1000.0)
+        self.assertAlmostEqual(complete["dur"], 2000.0)
+
+        with self.assertRaises(ValueError):
+            self.profiler.export("xml")
+
+    def test_pipeline_stages(self):
+        profiler = Profiler(enabled=True)
+        with profiling.use_profiler(profiler):
+            self.assertIs(profiling.get_profiler(), profiler)
+            price_surfaces(np.linspace(50, 150, 5), np.linspace(50, 150, 4),
+                           1.0, 0.05, 0.2)
+            provider = QuoteProvider(StaticQuoteBackend({"AAPL": 150.0}))
+            provider.get_price("AAPL")
+            provider.get_price("AAPL")
+            timed = profiling.timed("test.timed")(lambda x: 2 * x)
+            self.assertEqual(timed(3), 6)
+        self.assertIsNot(profiling.get_profiler(), profiler)
+        self.assertEqual(profiler.events[0][4], {"points": 40})
+        self.assertEqual(list(profiler.summary()),
+                         ["surface.price_surfaces", "quotes.fetch",
+                          "test.timed"])
+        self.assertEqual(profiler.counters, {"quotes.cache_hits": 1,
+                                             "quotes.cache_misses": 1})
+
+    def test_profilers_per_thread(self):
+        # e.g. two app sessions, each running its script in its own thread
+        # with profiling shown in one of them only
+        barrier = threading.Barrier(2)
+        profilers = {"a": Profiler(enabled=True), "b": Profiler()}
+
+        def session(name):
+            profiling.set_profiler(profilers[name])
+            barrier.wait(timeout=5)
+            with profiling.stage(name):
+                profiling.count(name)
+
+        default = profiling.get_profiler()
+        default_events = list(default.events)
+        threads = [threading.Thread(target=session, args=(name,))
+                   for name in profilers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(list(profilers["a"].summary()), ["a"])
+        self.assertEqual(profilers["a"].counters, {"a": 1})
+        self.assertEqual(profilers["b"].events, [])
+        self.assertIs(profiling.get_profiler(), default)
+        self.assertEqual(default.events, default_events)
+
+if __name__ == "__main__":
+    unittest.main()
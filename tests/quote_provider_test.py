@@ -0,0 +1,70 @@
+import os
+import unittest
+from src.quote_provider import (QuoteProvider, CsvQuoteBackend,
+                                StaticQuoteBackend)
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures",
+                            "quotes.csv")
+
+
+class CountingBackend(StaticQuoteBackend):
+    def __init__(self, prices):
+        super().__init__(prices)
+        self.requests = []
+
+    def fetch(self, tickers):
+        self.requests.append(list(tickers))
+        return super().fetch(tickers)
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestQuoteProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = CountingBackend({"AAPL": 150.0, "MSFT": 410.25})
+        self.timer = FakeTimer()
+        self.provider = QuoteProvider(self.backend, maxsize=2, ttl=60,
+                                      timer=self.timer)
+
+    def test_cached_until_ttl(self):
+        self.assertEqual(self.provider.get_price("aapl"), 150.0)
+        self.assertEqual(self.provider.get_price("AAPL"), 150.0)
+        self.assertEqual(self.backend.requests, [["AAPL"]])
+
+        self.timer.now = 61
+        self.provider.get_price("AAPL")
+        self.assertEqual(len(self.backend.requests), 2)
+
+    def test_batched_fetch_of_missing_tickers(self):
+        self.provider.get_price("AAPL")
+        prices = self.provider.get_prices(["MSFT", "AAPL", "MSFT"])
+        self.assertEqual(prices, {"MSFT": 410.25, "AAPL": 150.0})
+        self.assertEqual(self.backend.requests, [["AAPL"], ["MSFT"]])
+
+    def test_lru_eviction(self):
+        self.backend.prices["SPY"] = 560.5
+        self.provider.get_prices(["AAPL", "MSFT"])
+        self.provider.get_price("AAPL")
+        self.provider.get_price("SPY")  # evicts MSFT, the least recent
+        self.provider.get_price("MSFT")
+        self.assertEqual(self.backend.requests[-1], ["MSFT"])
+
+    def test_unknown_ticker(self):
+        with self.assertRaises(LookupError):
+            self.provider.get_price("ZZZZ")
+
+    def test_csv_backend(self):
+        provider = QuoteProvider(CsvQuoteBackend(FIXTURE_PATH))
+        self.assertEqual(provider.get_prices(["SPY", "MSFT"]),
+                         {"SPY": 560.5, "MSFT": 410.25})
+
+
+if __name__ == "__main__":
+    unittest.main()
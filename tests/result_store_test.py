@@ -0,0 +1,160 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock, patch
+import numpy as np
+from src import batch_pricer
+from src.export import export_bytes
+from src.portfolio import Portfolio
+from src.result_store import ResultStore, result_key
+from src.scenario_engine import run_scenarios
+from src.surface import price_surfaces
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.store = ResultStore(self.root)
+        self.axes = {"x": np.arange(3.0), "y": np.array([10.0, 20.0])}
+        self.inputs = {"scale": 2.0, "offsets": np.array([1.0, 2.0])}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def fill(self, out):
+        out[...] = np.arange(6.0).reshape(3, 2)
+
+    def test_write_and_reopen(self):
+        cube = self.store.get_or_compute("cube", self.axes, self.inputs,
+                                         self.fill)
+        self.assertIsInstance(cube, np.memmap)
+        np.testing.assert_array_equal(cube, np.arange(6.0).reshape(3, 2))
+        self.assertFalse(cube.flags.writeable)
+
+        # a new store on the same directory (e.g. after a restart) maps the
+        # result instead of recomputing it
+        store = ResultStore(self.root)
+        compute = Mock()
+        again = store.get_or_compute("cube", self.axes, dict(self.inputs),
+                                     compute)
+        compute.assert_not_called()
+        np.testing.assert_array_equal(again, cube)
+        key = result_key("cube", self.inputs)
+        info = store.info(key)
+        self.assertEqual(info["shape"], [3, 2])
+        self.assertEqual(info["inputs"], {"scale": 2.0, "offsets": {
+            "shape": [2], "dtype": "<f8"}})
+        np.testing.assert_array_equal(store.axes(key)["y"], [10.0, 20.0])
+
+    def test_keys(self):
+        key = result_key("cube", self.inputs)
+        self.assertEqual(key, result_key("cube", {
+            "offsets": np.array([1, 2.0]), "scale": 2}))
+        self.assertNotEqual(key, result_key("cube", {**self.inputs,
+                                                     "scale": 3.0}))
+        self.assertNotEqual(key, result_key("surface", self.inputs))
+        with self.assertRaises(TypeError):
+            result_key("cube", {"vol": object()})
+
+    def test_failed_write_is_not_stored(self):
+        def fail(out):
+            out[0] = 1.0
+            raise RuntimeError("worker failed")
+
+        with self.assertRaises(RuntimeError):
+            self.store.get_or_compute("cube", self.axes, self.inputs, fail)
+        key = result_key("cube", self.inputs)
+        self.assertNotIn(key, self.store)
+        self.assertEqual(os.listdir(self.root), [])
+        with self.assertRaises(KeyError):
+            self.store.open(key)
+
+    def test_concurrent_writers(self):
+        # e.g. two app sessions computing the same surfaces at once
+        barrier = threading.Barrier(2)
+        results, errors = [], []
+
+        def fill(out):
+            barrier.wait(timeout=5)
+            self.fill(out)
+
+        def write():
+            try:
+                results.append(self.store.get_or_compute(
+                    "cube", self.axes, self.inputs, fill))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        for cube in results:
+            np.testing.assert_array_equal(cube, np.arange(6.0).reshape(3, 2))
+        self.assertEqual(sorted(os.listdir(self.root)),
+                         sorted(["index.json",
+                                 f"{result_key('cube', self.inputs)}.npy"]))
+
+    def test_prune_least_recently_opened(self):
+        keys = []
+        for scale in (1.0, 2.0, 3.0):
+            inputs = {"scale": scale}
+            self.store.get_or_compute("cube", self.axes, inputs, self.fill)
+            keys.append(result_key("cube", inputs))
+        for key, mtime in zip(keys, (100, 300, 200)):
+            os.utime(self.store.path(key), (mtime, mtime))
+        size = self.store.info(keys[0])["bytes"]
+        self.assertEqual(self.store.prune(2 * size), [keys[0]])
+        self.assertEqual(sorted(self.store.index), sorted(keys[1:]))
+        self.assertFalse(os.path.exists(self.store.path(keys[0])))
+
+    def test_stored_surfaces(self):
+        S_range = np.linspace(50, 150, 21)
+        K_range = np.linspace(60, 140, 17)
+        expected = price_surfaces(S_range, K_range, [0.5, 1.0], 0.05, 0.2)
+        with patch("src.batch_pricer.black_scholes_price",
+                   wraps=batch_pricer.black_scholes_price) \
+                as pricer:
+            for _ in range(2):
+                calls, puts = price_surfaces(S_range, K_range, [0.5, 1.0],
+                                             0.05, 0.2, store=self.store)
+                np.testing.assert_allclose(calls, expected[0])
+                np.testing.assert_allclose(puts, expected[1])
+            # one (S, K) surface per option type and maturity, priced once
+            self.assertEqual(pricer.call_count, 4)
+        self.assertEqual(calls.shape, (2, 21, 17))
+        self.assertIsInstance(calls, np.memmap)
+        # stored cubes export like in-memory ones
+        data = export_bytes(calls[1], {"S": S_range, "K": K_range}, "csv")
+        self.assertEqual(data, export_bytes(expected[0][1],
+                                            {"S": S_range, "K": K_range},
+                                            "csv"))
+
+    def test_scenarios_written_by_workers(self):
+        rng = np.random.default_rng(3)
+        n = 200
+        book = Portfolio(np.where(rng.random(n) < 0.5, "call", "put"), 100,
+                         rng.uniform(70, 130, n), rng.uniform(0.1, 2, n),
+                         rng.uniform(0.1, 0.5, n), rng.integers(-5, 6, n),
+                         rng.uniform(1, 10, n), r=0.04)
+        args = (book, np.linspace(-0.2, 0.2, 5), [-0.05, 0.0, 0.05],
+                [0.0, 0.01], [0.0, 0.25])
+        expected = run_scenarios(*args, max_workers=1)
+        cube = run_scenarios(*args, max_workers=2, store=self.store)
+        np.testing.assert_allclose(cube, expected)
+        key, = self.store.index
+        np.testing.assert_array_equal(self.store.axes(key)["vol"],
+                                      [-0.05, 0.0, 0.05])
+        with patch("src.scenario_engine._price_cube") as price_cube:
+            again = run_scenarios(*args, max_workers=2, store=self.store)
+        price_cube.assert_not_called()
+        np.testing.assert_array_equal(again, cube)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+import requests
+from src import risk_free_rate_fetcher
+from src.risk_free_rate_fetcher import (CurveLoadingError, RateCurveCache,
+                                        curve_file_fetcher, fetch_rate_curve)
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures",
+                            "rate_curve.json")
+
+
+class CountingFetcher:
+    def __init__(self, fetch=curve_file_fetcher(FIXTURE_PATH)):
+        self.fetch = fetch
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.fetch()
+
+
+class TestRateCurveCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp_dir.name, "curve.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_interpolates_across_tenors(self):
+        cache = RateCurveCache(curve_file_fetcher(FIXTURE_PATH),
+                               cache_path=None)
+        self.assertAlmostEqual(cache.get_rate(1), 0.042)
+        self.assertAlmostEqual(cache.get_rate(1.5), 0.0415)
+        self.assertAlmostEqual(cache.get_rate(7.5), 0.0415)
+        self.assertAlmostEqual(cache.get_rate(0.01), 0.045)
+        self.assertAlmostEqual(cache.get_rate(30), 0.043)
+
+    def test_serves_from_memory_and_disk(self):
+        fetcher = CountingFetcher()
+        cache = RateCurveCache(fetcher, cache_path=self.cache_path)
+        for T in (0.25, 1, 3, 10):
+            cache.get_rate(T)
+        self.assertEqual(fetcher.calls, 1)
+
+        # a new cache (e.g. after a restart) reads the curve from disk
+        reopened = RateCurveCache(fetcher, cache_path=self.cache_path)
+        self.assertAlmostEqual(reopened.get_rate(2), 0.041)
+        self.assertEqual(fetcher.calls, 1)
+
+    def test_stale_curve_served_while_refreshing(self):
+        release = threading.Event()
+        fixture = curve_file_fetcher(FIXTURE_PATH)
+
+        def slow_fetch():
+            release.wait(5)
+            return {m: r + 0.01 for m, r in fixture().items()}
+
+        RateCurveCache(fixture, cache_path=self.cache_path).refresh()
+        cache = RateCurveCache(slow_fetch, cache_path=self.cache_path, ttl=0)
+
+        start = time.perf_counter()
+        self.assertAlmostEqual(cache.get_rate(1), 0.042)
+        self.assertLess(time.perf_counter() - start, 1)
+
+        release.set()
+        cache.refresh_async().join(5)
+        cache.ttl = 60
+        self.assertAlmostEqual(cache.get_rate(1), 0.052)
+
+    def test_cold_start_without_waiting(self):
+        release = threading.Event()
+        fixture = curve_file_fetcher(FIXTURE_PATH)
+
+        def slow_fetch():
+            release.wait(5)
+            return fixture()
+
+        cache = RateCurveCache(slow_fetch, cache_path=self.cache_path)
+        start = time.perf_counter()
+        with self.assertRaises(CurveLoadingError):
+            cache.get_rate(1, timeout=0)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        release.set()
+        cache.refresh_async().join(5)
+        self.assertAlmostEqual(cache.get_rate(1, timeout=0), 0.042)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["curve.json"])
+
+    def test_cold_start_error(self):
+        def failing_fetch():
+            raise ValueError("no network")
+
+        cache = RateCurveCache(failing_fetch, cache_path=self.cache_path)
+        with self.assertRaises(ValueError):
+            cache.get_rate(1)
+
+    def test_fred_timeout_keeps_stale_curve(self):
+        RateCurveCache(curve_file_fetcher(FIXTURE_PATH),
+                       cache_path=self.cache_path).refresh()
+        cache = RateCurveCache(fetch_rate_curve, cache_path=self.cache_path,
+                               ttl=0)
+        with mock.patch.object(risk_free_rate_fetcher, "get_api_key",
+                               return_value="key"), \
+                mock.patch.object(requests.Session, "get",
+                                  side_effect=requests.Timeout) as get:
+            self.assertAlmostEqual(cache.get_rate(1), 0.042)
+            cache.refresh_async().join(5)
+        self.assertEqual(get.call_args.kwargs["timeout"],
+                         risk_free_rate_fetcher.FRED_TIMEOUT)
+        self.assertIsInstance(cache.last_error, TimeoutError)
+        cache.ttl = 60
+        self.assertAlmostEqual(cache.get_rate(1), 0.042)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+from src.option import Option
+from src.portfolio import Portfolio
+from src.scenario_engine import run_scenarios, SharedArrays, attach_shared
+
+
+class TestScenarioEngine(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        n = 500
+        self.book = Portfolio(np.where(rng.random(n) < 0.5, "call", "put"),
+                              100, rng.uniform(70, 130, n),
+                              rng.uniform(0.1, 2, n), rng.uniform(0.1, 0.5, n),
+                              rng.integers(-5, 6, n), rng.uniform(1, 10, n),
+                              r=0.04)
+        self.spot = np.linspace(-0.2, 0.2, 5)
+        self.vol = np.array([-0.05, 0.0, 0.05])
+        self.rate = np.array([0.0, 0.01])
+        self.time = np.array([0.0, 0.25])
+
+    def test_matches_portfolio_surface(self):
+        cube = run_scenarios(self.book, self.spot, self.vol, max_workers=1)
+        self.assertEqual(cube.shape, (5, 3, 1, 1))
+        np.testing.assert_allclose(cube[:, :, 0, 0],
+                                   self.book.pnl_surface(self.spot, self.vol))
+
+    def test_rate_and_time_shocks(self):
+        book = Portfolio("call", 100, 100, 1, 0.2, 2, 10.0, r=0.05)
+        cube = run_scenarios(book, [0.1], [0.0], [0.01], [0.25, 1.5],
+                             max_workers=1)
+        expected = Option(110, 100, 0.75, 0.06, 0.2).black_scholes_price()
+        self.assertAlmostEqual(cube[0, 0, 0, 0], 2 * (expected - 10.0))
+        # decayed past expiry: intrinsic value of 10
+        self.assertAlmostEqual(cube[0, 0, 0, 1], 0.0)
+
+    def test_process_pool_matches_serial(self):
+        args = (self.book, self.spot, self.vol, self.rate, self.time)
+        serial = run_scenarios(*args, max_workers=1)
+        parallel = run_scenarios(*args, max_workers=2, block_size=10_000)
+        np.testing.assert_allclose(parallel, serial)
+
+    def test_shared_arrays(self):
+        with SharedArrays({"a": np.arange(5.0)}) as shared:
+            arrays, blocks = attach_shared(shared.spec)
+            arrays["a"][0] = 42
+            self.assertEqual(shared.arrays["a"][0], 42)
+            arrays.clear()
+            for block in blocks:
+                block.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import numpy as np
+from src.option import Option
+from src.surface import (price_surfaces, generate_pnl_surfaces,
+                         greeks_surfaces, finite_difference_greeks,
+                         check_greeks, time_decay_surfaces)
+
+
+class TestSurface(unittest.TestCase):
+
+    def setUp(self):
+        self.S_range = np.linspace(50, 150, 11)
+        self.K_range = np.linspace(60, 140, 9)
+
+    def test_matches_nested_loop(self):
+        call_pnl, put_pnl = generate_pnl_surfaces(
+            self.S_range, self.K_range, 1, 0.05, 0.2, 3, 10.0)
+        self.assertEqual(call_pnl.shape, (11, 9))
+        for i, S_val in enumerate(self.S_range):
+            for j, K_val in enumerate(self.K_range):
+                call = Option(S_val, K_val, 1, 0.05, 0.2, "call")
+                put = Option(S_val, K_val, 1, 0.05, 0.2, "put")
+                self.assertAlmostEqual(
+                    call_pnl[i, j], 3 * (call.black_scholes_price() - 10.0))
+                self.assertAlmostEqual(
+                    put_pnl[i, j], 3 * (put.black_scholes_price() - 10.0))
+
+    def test_third_axis(self):
+        vols = np.array([0.1, 0.2, 0.3, 0.4])
+        calls, puts = price_surfaces(self.S_range, self.K_range, 1, 0.05,
+                                     vols)
+        self.assertEqual(calls.shape, (4, 11, 9))
+        self.assertEqual(puts.shape, (4, 11, 9))
+        flat_calls, flat_puts = price_surfaces(self.S_range, self.K_range, 1,
+                                               0.05, 0.3)
+        np.testing.assert_allclose(calls[2], flat_calls)
+        np.testing.assert_allclose(puts[2], flat_puts)
+
+    def test_greeks_surfaces(self):
+        call_values, put_values = greeks_surfaces(self.S_range, self.K_range,
+                                                  1, 0.05, 0.2)
+        calls, puts = price_surfaces(self.S_range, self.K_range, 1, 0.05, 0.2)
+        np.testing.assert_allclose(call_values["Price"], calls)
+        np.testing.assert_allclose(put_values["Price"], puts)
+        self.assertEqual(call_values["Gamma"].shape, (11, 9))
+        for i, j in ((0, 0), (5, 4), (10, 8), (3, 7)):
+            for values, option_type in ((call_values, "call"),
+                                        (put_values, "put")):
+                greeks = Option(self.S_range[i], self.K_range[j], 1, 0.05,
+                                0.2, option_type).get_greeks()
+                for name, value in greeks.items():
+                    self.assertAlmostEqual(values[name][i, j], value)
+
+    def test_finite_difference_greeks(self):
+        S_range = np.linspace(50, 150, 41)
+        K_range = np.linspace(60, 140, 33)
+        analytic = greeks_surfaces(S_range, K_range, 0.5, 0.03, 0.25)
+        numeric = finite_difference_greeks(S_range, K_range, 0.5, 0.03, 0.25)
+        for exact, estimate in zip(analytic, numeric):
+            self.assertEqual(sorted(estimate), sorted(exact.keys() -
+                                                      {"Price"}))
+            for name, surface in estimate.items():
+                np.testing.assert_allclose(surface, exact[name], atol=1e-4)
+        differences = check_greeks(S_range, K_range, 0.5, 0.03, 0.25)
+        self.assertLess(max(differences.values()), 1e-4)
+        # coarse bumps show up as larger differences
+        coarse = check_greeks(S_range, K_range, 0.5, 0.03, 0.25,
+                              bumps={"S": 0.1})
+        self.assertGreater(coarse["Gamma"], 100 * differences["Gamma"])
+        with self.assertRaises(ValueError):
+            finite_difference_greeks(S_range, K_range, [0.5, 1.0], 0.03, 0.25)
+        with self.assertRaises(ValueError):
+            check_greeks(S_range, K_range, 5e-5, 0.03, 0.25)
+
+    def test_time_decay_surfaces(self):
+        maturities, calls, puts = time_decay_surfaces(
+            self.S_range, self.K_range, 1.0, 0.05, 0.2, 5)
+        np.testing.assert_allclose(maturities, [1.0, 0.75, 0.5, 0.25, 0.0])
+        self.assertEqual(calls.shape, (5, 11, 9))
+        for frame, T in enumerate(maturities[:-1]):
+            expected = price_surfaces(self.S_range, self.K_range, T, 0.05,
+                                      0.2)
+            np.testing.assert_allclose(calls[frame], expected[0])
+            np.testing.assert_allclose(puts[frame], expected[1])
+        # at expiry the options are worth their intrinsic value
+        moneyness = self.S_range[:, None] - self.K_range[None, :]
+        np.testing.assert_array_equal(calls[-1], np.maximum(moneyness, 0))
+        np.testing.assert_array_equal(puts[-1], np.maximum(-moneyness, 0))
+        with self.assertRaises(ValueError):
+            time_decay_surfaces(self.S_range, self.K_range, 1.0, 0.05, 0.2, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+from src import taylor_approx
+from src.portfolio import Portfolio
+from src.scenario_engine import run_scenarios
+from src.surface import price_surfaces
+
+
+class TestTaylorApprox(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        n = 300
+        self.book = Portfolio(np.where(rng.random(n) < 0.5, "call", "put"),
+                              100, rng.uniform(70, 130, n),
+                              rng.uniform(0.1, 2, n), rng.uniform(0.1, 0.5, n),
+                              rng.integers(-5, 6, n), rng.uniform(1, 10, n),
+                              r=0.04)
+
+    def test_higher_order_greeks_match_finite_differences(self):
+        S, K, T, r, vol, h = 105.0, 100.0, 0.7, 0.03, 0.25, 1e-4
+        greeks = taylor_approx.higher_order_greeks(S, K, T, r, vol)
+        gamma = lambda S: taylor_approx.batch_pricer.price_and_greeks(
+            S, K, T, r, vol)["Gamma"]
+        vega = lambda vol: taylor_approx.batch_pricer.price_and_greeks(
+            S, K, T, r, vol)["Vega"]
+        delta = lambda vol: taylor_approx.batch_pricer.price_and_greeks(
+            S, K, T, r, vol)["Delta"]
+        self.assertAlmostEqual(greeks["Speed"],
+                               (gamma(S + h) - gamma(S - h)) / (2 * h), 6)
+        self.assertAlmostEqual(greeks["Volga"],
+                               (vega(vol + h) - vega(vol - h)) / (2 * h), 4)
+        self.assertAlmostEqual(greeks["Vanna"],
+                               (delta(vol + h) - delta(vol - h)) / (2 * h), 6)
+
+    def test_surface_falls_back_to_exact_prices(self):
+        S_range = np.linspace(50, 150, 41)
+        K_range = np.linspace(50, 150, 41)
+        calls, puts, report = taylor_approx.price_surfaces(
+            S_range, K_range, 1.0, 0.05, 0.2, tolerance=0.01)
+        exact_calls, exact_puts = price_surfaces(S_range, K_range, 1.0, 0.05,
+                                                 0.2)
+        self.assertEqual(report["Points"], 2 * 41 * 41)
+        self.assertTrue(0 < report["Exact Points"] < report["Points"])
+        self.assertLessEqual(report["Max Estimated Error"], 0.01)
+        # the reported error is the one actually found on the sample
+        errors = np.abs(np.stack([calls - exact_calls, puts - exact_puts]))
+        self.assertLessEqual(report["Max Observed Error"], errors.max())
+        # the expansion point and the far wings are priced exactly
+        np.testing.assert_allclose(calls[20], exact_calls[20], atol=1e-12)
+        np.testing.assert_allclose(puts[0], exact_puts[0], atol=1e-12)
+
+        _, _, exact_report = taylor_approx.price_surfaces(
+            S_range, K_range, 1.0, 0.05, 0.2, tolerance=0.0)
+        self.assertEqual(exact_report["Exact Points"], 2 * 41 * 41 - 82)
+
+    def test_scenarios_close_to_exact(self):
+        args = (self.book, np.linspace(-0.02, 0.02, 9),
+                np.linspace(-0.01, 0.01, 5), [0.0, 0.01], [0.0, 0.25, 3.0])
+        cube, report = taylor_approx.run_scenarios(*args, tolerance=0.01,
+                                                   block_size=5_000)
+        exact = run_scenarios(*args, max_workers=1)
+        self.assertEqual(report["Points"], 9 * 5 * 2 * 3 * 300)
+        self.assertLess(report["Exact Points"], report["Points"] / 2)
+        self.assertGreater(report["Sampled Points"], 0)
+        self.assertLess(report["Max Observed Error"], 0.05)
+        # worst case: every leg off in the same direction by its error
+        bound = np.abs(self.book.legs["quantity"]).sum() * 0.05
+        self.assertLess(np.abs(cube - exact).max(), bound)
+        # legs past expiry (3 years of decay) are always priced exactly
+        np.testing.assert_allclose(cube[..., 2], exact[..., 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
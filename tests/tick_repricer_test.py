@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+from src.batch_pricer import price_and_greeks
+from src.portfolio import Portfolio
+from src.tick_repricer import TickRepricer
+
+
+class TestTickRepricer(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        size = 1000
+        self.K = rng.uniform(60, 140, size)
+        self.T = rng.uniform(0.1, 2, size)
+        self.vol = rng.uniform(0.1, 0.5, size)
+        self.is_call = rng.random(size) < 0.5
+        self.repricer = TickRepricer(self.is_call, 100.0, self.K, self.T,
+                                     self.vol, r=0.03)
+
+    def assert_prices(self, S, vol, r=0.03):
+        expected = price_and_greeks(S, self.K, self.T, r, vol, self.is_call)
+        for name, values in expected.items():
+            np.testing.assert_allclose(self.repricer.values[name], values,
+                                       rtol=1e-9, atol=1e-10)
+
+    def test_spot_ticks(self):
+        self.assert_prices(100.0, self.vol)
+        self.repricer.tick(S=104.5)
+        self.assert_prices(104.5, self.vol)
+
+    def test_partial_and_changed_only_ticks(self):
+        S = np.full(1000, 100.0)
+        S[[3, 500]] = [90.0, 120.0]
+        self.repricer.tick(S=S[[3, 500]], index=[3, 500])
+        self.assert_prices(S, self.vol)
+
+        S[7] = 99.0
+        before = self.repricer.values["Price"].copy()
+        self.repricer.tick(S=S, changed_only=True)
+        self.assert_prices(S, self.vol)
+        changed = np.flatnonzero(self.repricer.values["Price"] != before)
+        self.assertEqual(changed.tolist(), [7])
+
+    def test_vol_ticks_and_rate_changes(self):
+        vol = self.vol.copy()
+        mask = self.K > 120
+        vol[mask] += 0.05
+        self.repricer.tick(vol=vol[mask], index=mask)
+        self.assert_prices(100.0, vol)
+
+        self.repricer.tick(S=95.0, vol=0.25)
+        self.assert_prices(95.0, 0.25)
+
+        self.repricer.set_rate(0.06)
+        self.assert_prices(95.0, 0.25, r=0.06)
+
+    def test_totals_match_portfolio(self):
+        book = Portfolio(np.where(self.is_call, "call", "put"), 100.0,
+                         self.K, self.T, self.vol, np.arange(1000) % 7 - 3,
+                         0.0, r=0.03)
+        repricer = TickRepricer.from_portfolio(book)
+        totals = repricer.totals()
+        for name, value in totals.items():
+            self.assertAlmostEqual(value, book.totals[name], places=6)
+
+        repricer.tick(S=110.0)
+        book.update_market(S=110.0)
+        self.assertAlmostEqual(repricer.totals()["Delta"],
+                               book.totals["Delta"], places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
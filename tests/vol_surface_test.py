@@ -0,0 +1,126 @@
+import os
+import unittest
+import numpy as np
+from src import batch_pricer
+from src import kernels
+from src.option import Option
+from src.surface import price_surfaces
+from src.vol_surface import VolSurface
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures",
+                            "vol_surface.csv")
+
+
+class TestVolSurface(unittest.TestCase):
+
+    def setUp(self):
+        self.surface = VolSurface.from_csv(FIXTURE_PATH)
+
+    def test_from_csv(self):
+        np.testing.assert_array_equal(self.surface.strikes,
+                                      [80, 90, 100, 110, 120])
+        np.testing.assert_array_equal(self.surface.expiries,
+                                      [0.25, 0.5, 1.0])
+        # the quotes are reproduced at the nodes
+        K, T = np.meshgrid(self.surface.strikes, self.surface.expiries)
+        np.testing.assert_allclose(self.surface(K, T), self.surface.vols,
+                                   rtol=1e-12)
+        self.assertAlmostEqual(self.surface(100, 1.0), 0.22)
+
+    def test_interpolation(self):
+        # total variance is linear in strike and in expiry between the
+        # nodes, the vol is flat beyond the grid
+        self.assertAlmostEqual(self.surface(95, 0.5),
+                               np.sqrt(0.5 * (0.215 ** 2 + 0.21 ** 2)))
+        variance = 0.5 * (0.21 ** 2 * 0.5 + 0.22 ** 2 * 1.0)
+        self.assertAlmostEqual(self.surface(100, 0.75),
+                               np.sqrt(variance / 0.75))
+        self.assertAlmostEqual(self.surface(50, 0.1), 0.225)
+        self.assertAlmostEqual(self.surface(150, 5.0), 0.24)
+
+    def test_uniform_and_irregular_grids_agree(self):
+        irregular = VolSurface([80, 90, 95, 100, 110, 120], [0.25, 0.5, 1.0],
+                               self.surface(np.array([80, 90, 95, 100, 110,
+                                                      120])[None, :],
+                                            np.array([0.25, 0.5, 1.0])
+                                            [:, None]))
+        self.assertFalse(irregular._K.uniform)
+        rng = np.random.default_rng(0)
+        K, T = rng.uniform(70, 130, 1000), rng.uniform(0.1, 2, 1000)
+        np.testing.assert_allclose(irregular(K, T), self.surface(K, T),
+                                   rtol=1e-12)
+        self.assertEqual(irregular(K.reshape(10, 100), 0.5).shape, (10, 100))
+
+    def test_from_implied_vols(self):
+        # two expiries quoted at different strikes; NaNs are left out
+        surface = VolSurface.from_implied_vols(
+            [90, 100, 110, 95, 105, 120], [0.5, 0.5, 0.5, 1, 1, 1],
+            [0.25, 0.2, 0.22, 0.24, np.nan, 0.26])
+        np.testing.assert_array_equal(surface.strikes,
+                                      [90, 95, 100, 110, 120])
+        np.testing.assert_allclose(surface.vols[0],
+                                   [0.25, 0.225, 0.2, 0.22, 0.22])
+        np.testing.assert_allclose(surface.vols[1],
+                                   [0.24, 0.24, 0.244, 0.252, 0.26])
+        # single expiry: constant across maturities
+        smile = VolSurface.from_implied_vols([90, 110], 1.0, [0.3, 0.2])
+        self.assertAlmostEqual(smile(100, 0.1),
+                               np.sqrt(0.5 * (0.3 ** 2 + 0.2 ** 2)))
+
+    def test_from_chain(self):
+        K = np.array([80.0, 100.0, 120.0, 80.0, 100.0, 120.0])
+        T = np.array([0.5, 0.5, 0.5, 1.0, 1.0, 1.0])
+        vols = np.array([0.3, 0.25, 0.28, 0.29, 0.24, 0.27])
+        prices = batch_pricer.black_scholes_price(100.0, K, T, 0.05, vols)
+        surface = VolSurface.from_chain(prices, 100.0, K, T, 0.05)
+        np.testing.assert_allclose(surface(K, T), vols, rtol=1e-6)
+
+    def test_pricers_accept_surface(self):
+        K = np.array([85.0, 100.0, 115.0])
+        vols = self.surface(K, 0.75)
+        expected = batch_pricer.price_and_greeks(100.0, K, 0.75, 0.05, vols,
+                                                 "put")
+        for results in (
+                batch_pricer.price_and_greeks(100.0, K, 0.75, 0.05,
+                                              self.surface, "put"),
+                kernels.price_and_greeks(100.0, K, 0.75, 0.05,
+                                         self.surface, "put")):
+            for name, values in expected.items():
+                np.testing.assert_allclose(results[name], values)
+        option = Option(100.0, 115.0, 0.75, 0.05, self.surface, "put")
+        self.assertAlmostEqual(option.vol, vols[2])
+        self.assertAlmostEqual(option.black_scholes_price(),
+                               expected["Price"][2])
+
+    def test_smile_price_surfaces(self):
+        S_range = np.linspace(50, 150, 11)
+        K_range = np.linspace(60, 140, 9)
+        calls, puts = price_surfaces(S_range, K_range, 1.0, 0.05,
+                                     self.surface)
+        for j, K in enumerate(K_range):
+            vol = self.surface(K, 1.0)
+            expected = batch_pricer.black_scholes_price(S_range, K, 1.0,
+                                                        0.05, vol)
+            np.testing.assert_allclose(calls[:, j], expected)
+        # a leading time axis looks the surface up at every expiry
+        calls, _ = price_surfaces(S_range, K_range, [0.5, 1.0], 0.05,
+                                  self.surface)
+        self.assertEqual(calls.shape, (2, 11, 9))
+        self.assertAlmostEqual(
+            calls[0, 5, 4],
+            Option(S_range[5], K_range[4], 0.5, 0.05, self.surface)
+            .black_scholes_price())
+
+    def test_invalid_surface(self):
+        with self.assertRaises(ValueError):
+            VolSurface([100, 90], [1.0], [[0.2, 0.2]])
+        with self.assertRaises(ValueError):
+            VolSurface([90, 100], [0.0, 1.0], [[0.2, 0.2], [0.2, 0.2]])
+        with self.assertRaises(ValueError):
+            VolSurface([90, 100], [1.0], [[0.2]])
+        with self.assertRaises(ValueError):
+            VolSurface.from_implied_vols([90, 100], 1.0, [np.nan, -1.0])
+
+
+if __name__ == "__main__":
+    unittest.main()